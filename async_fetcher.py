@@ -0,0 +1,265 @@
+import asyncio
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    requests = None
+
+from bar_store import BAR_STORE
+from fetch_scheduler import SCHEDULER, current_priority, set_fetch_priority
+
+# Chart API root; point it at stub_server.py to benchmark offline
+CHART_URL = os.environ.get('STOCKPRO_CHART_URL', 'https://query1.finance.yahoo.com')
+
+# HTTP requests in flight (one pooled connection each) and chunks in flight
+FETCH_CONCURRENCY = int(os.environ.get('STOCKPRO_FETCH_CONCURRENCY', 8))
+CHUNK_CONCURRENCY = int(os.environ.get('STOCKPRO_CHUNK_CONCURRENCY', 4))
+
+# Retries per symbol, with full-jitter exponential backoff between attempts
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+HEADERS = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'}
+
+
+class ChartError(Exception):
+    pass
+
+
+class ChartNotFound(ChartError):
+    """The symbol is unknown upstream (HTTP 404); not worth retrying."""
+
+
+def _epoch(value):
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize('UTC')
+    return int(ts.timestamp())
+
+
+def parse_chart(payload, interval='1d', adjusted=True):
+    """Flat OHLCV frame from a v8 chart response, indexed like yfinance.
+
+    Daily bars get a naive date index (exchange-local date), intraday bars
+    an exchange-timezone index. ``adjusted`` scales OHLC by adjclose/close
+    as yfinance's ``auto_adjust`` does.
+    """
+    chart = payload.get('chart') or {}
+    if chart.get('error') or not chart.get('result'):
+        raise ChartError(str(chart.get('error') or 'empty chart result'))
+    result = chart['result'][0]
+    timestamps = result.get('timestamp') or []
+    if not timestamps:
+        return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+
+    quote = result['indicators']['quote'][0]
+    df = pd.DataFrame({
+        'Open': quote.get('open'), 'High': quote.get('high'), 'Low': quote.get('low'),
+        'Close': quote.get('close'), 'Volume': quote.get('volume'),
+    }, dtype='float64')
+    tz = result.get('meta', {}).get('exchangeTimezoneName') or 'UTC'
+    index = pd.to_datetime(np.asarray(timestamps, dtype='int64') * 10**9, utc=True).tz_convert(tz)
+    if interval[-1] in 'mh':
+        index.name = 'Datetime'
+    else:
+        index = index.tz_localize(None).normalize()
+        index.name = 'Date'
+    df.index = index
+
+    adjclose = (result['indicators'].get('adjclose') or [{}])[0].get('adjclose')
+    if adjusted and adjclose is not None:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ratio = np.asarray(adjclose, dtype='float64') / df['Close'].to_numpy()
+        for col in ('Open', 'High', 'Low', 'Close'):
+            df[col] = df[col] * ratio
+    df = df.dropna(subset=['Close'])
+    return df[~df.index.duplicated(keep='last')]
+
+
+class AsyncChartFetcher:
+    """Concurrent chart downloads driven by asyncio.
+
+    Symbols are grouped into chunks; at most ``chunk_concurrency`` chunks
+    are in flight and at most ``concurrency`` HTTP requests overall, each on
+    a pooled keep-alive ``requests`` session. Failed requests (connection
+    errors, 429/5xx) are retried with jittered exponential backoff. With
+    ``throttle`` every request also takes a slot from the global fetch
+    scheduler at the caller's priority. Per-chunk latency and retry counts
+    are collected in ``metrics``.
+    """
+
+    def __init__(self, base_url=None, concurrency=None, chunk_concurrency=None, retries=MAX_RETRIES,
+                 timeout=10.0, throttle=True):
+        if requests is None:
+            raise ImportError("The async fetch engine needs the 'requests' package")
+        # Requests go straight to the chart API, bypassing get_provider(); refuse to
+        # silently ignore a replay/record provider unless a chart root is given explicitly
+        provider = os.environ.get('STOCKPRO_DATA_PROVIDER', 'yfinance').partition(':')[0]
+        if base_url is None and provider != 'yfinance':
+            raise ValueError(f"The async fetch engine talks to the live chart API; "
+                             f"STOCKPRO_DATA_PROVIDER={provider!r} needs the batch engine")
+        self.base_url = (base_url or CHART_URL).rstrip('/')
+        self.concurrency = concurrency or FETCH_CONCURRENCY
+        self.chunk_concurrency = chunk_concurrency or CHUNK_CONCURRENCY
+        self.retries = retries
+        self.timeout = timeout
+        self.throttle = throttle
+        self.metrics = {'chunks': [], 'wall_s': 0.0}
+
+    def _session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update(HEADERS)
+        return session
+
+    def _get(self, session, symbol, params, priority):
+        """Blocking request, run on the executor; returns (status, payload or None)."""
+        if self.throttle:
+            set_fetch_priority(priority)
+            SCHEDULER.acquire()
+        response = session.get(f"{self.base_url}/v8/finance/chart/{symbol}", params=params, timeout=self.timeout)
+        if response.status_code != 200:
+            return response.status_code, None
+        return 200, response.json()
+
+    async def _fetch_symbol(self, loop, executor, sessions, symbol, window, interval, adjusted, priority):
+        """(frame, retries) for one symbol; raises after the last failed attempt."""
+        params = {'period1': _epoch(window[0]), 'period2': _epoch(window[1]), 'interval': interval,
+                  'includePrePost': 'false', 'events': 'div,splits'}
+        session = await sessions.get()
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    status, payload = await loop.run_in_executor(executor, self._get, session, symbol, params, priority)
+                    if status == 200:
+                        return parse_chart(payload, interval, adjusted), attempt
+                    error = (ChartNotFound if status == 404 else ChartError)(f"HTTP {status}")
+                    if status not in RETRY_STATUS:
+                        raise error
+                except (requests.RequestException, ValueError) as e:
+                    error = e
+                if attempt < self.retries:
+                    await asyncio.sleep(random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)))
+            raise error
+        finally:
+            sessions.put_nowait(session)
+
+    async def _fetch_chunk(self, number, chunk, windows, interval, adjusted, shared):
+        loop, executor, sessions, chunk_slots, priority = shared
+        async with chunk_slots:
+            started = time.monotonic()
+            outcomes = await asyncio.gather(*[
+                self._fetch_symbol(loop, executor, sessions, symbol, windows[symbol], interval, adjusted, priority)
+                for symbol in chunk
+            ], return_exceptions=True)
+            frames, retries, failed = {}, 0, []
+            for symbol, outcome in zip(chunk, outcomes):
+                if isinstance(outcome, BaseException):
+                    failed.append(symbol)
+                    if isinstance(outcome, ChartNotFound):
+                        frames[symbol] = None
+                    continue
+                df, attempts = outcome
+                retries += attempts
+                frames[symbol] = df
+            self.metrics['chunks'].append({
+                'chunk': number, 'symbols': len(chunk), 'ok': len(chunk) - len(failed), 'failed': len(failed),
+                'retries': retries, 'latency_s': time.monotonic() - started,
+            })
+            if failed:
+                print(f"Chunk {number}: {len(failed)} symbols failed ({', '.join(failed[:5])})")
+            return frames
+
+    async def fetch_many_async(self, windows, interval='1d', adjusted=True, chunk_size=50):
+        """{ticker: frame} for ``windows`` ({ticker: (start, end)}).
+
+        Tickers with no bars in their window get an empty frame and ones
+        unknown upstream None; tickers that failed otherwise are left out.
+        """
+        tickers = list(windows)
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        sessions = asyncio.Queue()
+        for _ in range(self.concurrency):
+            sessions.put_nowait(self._session())
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        shared = (loop, executor, sessions, asyncio.Semaphore(self.chunk_concurrency), current_priority())
+        chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+        try:
+            parts = await asyncio.gather(*[
+                self._fetch_chunk(n, chunk, windows, interval, adjusted, shared) for n, chunk in enumerate(chunks)
+            ])
+        finally:
+            executor.shutdown(wait=False)
+            while not sessions.empty():
+                sessions.get_nowait().close()
+        self.metrics['wall_s'] += time.monotonic() - started
+        frames = {}
+        for part in parts:
+            frames.update(part)
+        return frames
+
+    def fetch_many(self, tickers, start, end, interval='1d', adjusted=True, chunk_size=50):
+        """Blocking entry point (call from a thread without a running event loop)."""
+        windows = tickers if isinstance(tickers, dict) else {t: (start, end) for t in tickers}
+        return asyncio.run(self.fetch_many_async(windows, interval, adjusted, chunk_size))
+
+    def summary(self):
+        """Totals and chunk latency percentiles over every fetch_many call so far."""
+        chunks = self.metrics['chunks']
+        if not chunks:
+            return {'chunks': 0, 'symbols': 0, 'ok': 0, 'failed': 0, 'retries': 0, 'wall_s': self.metrics['wall_s']}
+        latency = np.array([c['latency_s'] for c in chunks])
+        ok = sum(c['ok'] for c in chunks)
+        wall = self.metrics['wall_s']
+        return {
+            'chunks': len(chunks),
+            'symbols': sum(c['symbols'] for c in chunks),
+            'ok': ok,
+            'failed': sum(c['failed'] for c in chunks),
+            'retries': sum(c['retries'] for c in chunks),
+            'wall_s': wall,
+            'symbols_per_s': ok / wall if wall > 0 else 0.0,
+            'chunk_p50_s': float(np.percentile(latency, 50)),
+            'chunk_p95_s': float(np.percentile(latency, 95)),
+            'chunk_max_s': float(latency.max()),
+        }
+
+
+def load_bars_many_async(tickers, start, end, interval='1d', adjusted=True, store=None, fetcher=None, chunk_size=50):
+    """bar_store.load_bars_many with the async engine.
+
+    Only tickers whose stored bars are missing or stale are requested, each
+    for its own missing window; downloads are merged into the store (empty
+    and not-found answers too, so idle tickers are not refetched every
+    cycle) and the result is read back from it. Returns {ticker: frame}.
+    """
+    store = store or BAR_STORE
+    fetcher = fetcher or AsyncChartFetcher()
+    tickers = list(tickers)
+    plans = {t: store.plan(t, interval, start, end, adjusted) for t in tickers}
+    stale = {t: window for t, window in plans.items() if window is not None}
+    if stale:
+        frames = fetcher.fetch_many(stale, None, None, interval, adjusted, chunk_size)
+        for ticker, window in stale.items():
+            if ticker in frames:
+                store.update(ticker, interval, frames[ticker], window[0], window[1], adjusted)
+
+    result = {}
+    for ticker in tickers:
+        df = store.read(ticker, interval, start, end, adjusted)
+        if df is not None and not df.empty:
+            result[ticker] = df
+    return result
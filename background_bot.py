@@ -2,11 +2,13 @@
 import time
 import json
 import os
-import yfinance as yf
 import pytz
 from datetime import datetime, date, timedelta
+from data_provider import get_provider
+from fetch_scheduler import TRADING, set_fetch_priority
 from paper_trader import PaperTrader
 from stock_screener import StockScreener
+from streaming_indicators import IndicatorBook
 
 # Version to help UI identify updated bots
 BOT_VERSION = "2.1-IST-FIX"
@@ -60,7 +62,11 @@ def is_market_open():
 def run_bot():
     """Background loop with IST enforcement and status heartbeat."""
     print(f"[{datetime.now()}] AI Background Bot {BOT_VERSION} Starting...")
+    # Bot fetches yield to interactive dashboard requests
+    set_fetch_priority(TRADING)
     trader = PaperTrader(initial_balance=10000.0)
+    # Streaming RSI/SMA/volume state per ticker, checkpointed between cycles and restarts
+    indicator_book = IndicatorBook()
     ist = pytz.timezone('Asia/Kolkata')
     
     while True:
@@ -92,13 +98,12 @@ def run_bot():
                     "SUNPHARMA.NS": "SUN PHARMA", "LT.NS": "L&T", "HCLTECH.NS": "HCL TECH",
                     "AXISBANK.NS": "AXIS BANK", "ASIANPAINT.NS": "ASIAN PAINT", "KOTAKBANK.NS": "KOTAK BANK"
                 }
-                m_data = yf.download(list(marquee_symbols.keys()), period="2d", interval="1d", progress=False, group_by='ticker')
+                m_data = get_provider().history_many(list(marquee_symbols.keys()), period="2d", interval="1d")
                 marquee_results = []
                 for sym, name in marquee_symbols.items():
                     try:
-                        df = m_data[sym] if len(marquee_symbols) > 1 else m_data
-                        df = df.dropna(subset=['Close'])
-                        if not df.empty:
+                        df = m_data.get(sym)
+                        if df is not None and not df.empty:
                             lp = float(df['Close'].iloc[-1])
                             prev = float(df['Close'].iloc[-2]) if len(df) > 1 else lp
                             chg = ((lp - prev) / prev) * 100 if prev != 0 else 0
@@ -116,7 +121,7 @@ def run_bot():
 
             # --- Trading Logic ---
             screener = StockScreener(POPULAR_STOCKS)
-            top_scalps = screener.screen_intraday()
+            top_scalps = screener.screen_intraday_streaming(indicator_book)
             
             current_prices = {}
             if trader.positions:
@@ -127,7 +132,7 @@ def run_bot():
                             if s['ticker'] == ticker:
                                 current_prices[ticker] = s['price']; found = True; break
                         if not found:
-                            d = yf.download(ticker, period="1d", interval="1m", progress=False)
+                            d = get_provider().history(ticker, period="1d", interval="1m")
                             if not d.empty: current_prices[ticker] = d['Close'].iloc[-1]
                     except: pass
             
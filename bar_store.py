@@ -0,0 +1,296 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data_provider import OHLCV, get_provider, normalize_ohlcv
+from resample import resample_ohlcv
+
+# How long (seconds) a stored series counts as current before it is refetched
+FRESHNESS = {
+    '1m': 60, '2m': 120, '5m': 300, '15m': 900, '30m': 900, '60m': 900, '1h': 900,
+    '1d': 3600, '5d': 3600, '1wk': 6 * 3600, '1mo': 24 * 3600,
+}
+
+# Intervals that are always built from a stored base series instead of downloaded
+BASE_INTERVAL = {'1wk': '1d', '1mo': '1d'}
+
+# Finer stored series that can stand in for an intraday interval when already current
+FINER_SOURCES = {'15m': ['5m', '1m'], '30m': ['5m', '1m'], '1h': ['5m', '1m'], '60m': ['5m', '1m']}
+
+# Full re-download interval (seconds) for split/dividend-adjusted series
+REBASE_AFTER = 7 * 24 * 3600
+
+# Seconds before a symbol that returned no bars at all (delisted/unknown) is asked for again
+MISSING_TTL = int(os.environ.get('STOCKPRO_MISSING_TTL', 24 * 3600))
+
+
+def _to_timestamp(value):
+    """Naive pandas Timestamp for a date/datetime/str boundary."""
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_localize(None)
+    return ts
+
+
+def _to_epoch(value, tz):
+    """Epoch seconds for a boundary, interpreted in the series' own timezone."""
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize(tz or 'UTC')
+    return ts.timestamp()
+
+
+def _index_to_epoch(index):
+    index = pd.DatetimeIndex(index)
+    utc = index.tz_convert('UTC') if index.tz is not None else index.tz_localize('UTC')
+    return np.asarray((utc - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1), dtype='float64')
+
+
+class BarStore:
+    """Persistent OHLCV bars, one columnar block per (ticker, interval).
+
+    Each series is a single Fortran-ordered ``.npy`` file holding
+    ``[epoch_seconds, Open, High, Low, Close, Volume]`` so every column is
+    contiguous and the whole file can be memory-mapped. A small JSON sidecar
+    records the requested range and when it was last fetched.
+    """
+
+    def __init__(self, root='bar_store'):
+        base_path = os.path.dirname(os.path.abspath(__file__))
+        self.root = os.path.join(base_path, root)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _paths(self, ticker, interval, adjusted=True):
+        folder = os.path.join(self.root, interval if adjusted else f"{interval}-raw")
+        return os.path.join(folder, f"{ticker}.npy"), os.path.join(folder, f"{ticker}.json")
+
+    def _lock(self, ticker, interval, adjusted=True):
+        key = (ticker, interval, adjusted)
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def load_meta(self, ticker, interval, adjusted=True):
+        npy_path, meta_path = self._paths(ticker, interval, adjusted)
+        if not (os.path.exists(npy_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path, "r") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def read(self, ticker, interval, start=None, end=None, adjusted=True):
+        """Returns stored bars in [start, end) or None if the series is unknown."""
+        npy_path, _ = self._paths(ticker, interval, adjusted)
+        meta = self.load_meta(ticker, interval, adjusted)
+        if meta is None:
+            return None
+
+        tz = meta.get('tz')
+        block = np.load(npy_path, mmap_mode='r')
+        ts = block[:, 0]
+        lo = int(np.searchsorted(ts, _to_epoch(start, tz), 'left')) if start is not None else 0
+        hi = int(np.searchsorted(ts, _to_epoch(end, tz), 'left')) if end is not None else len(ts)
+        rows = np.array(block[lo:hi])
+        del block
+
+        # Nanosecond resolution, same as yfinance frames
+        index = pd.to_datetime(rows[:, 0].astype('int64') * 10**9, utc=True)
+        index = index.tz_convert(tz) if tz else index.tz_localize(None)
+        index.name = meta.get('index_name', 'Date')
+        return pd.DataFrame(rows[:, 1:], index=index, columns=OHLCV)
+
+    def write(self, ticker, interval, df, meta, adjusted=True):
+        """Atomically replaces a series (temp file + rename) and its sidecar."""
+        npy_path, meta_path = self._paths(ticker, interval, adjusted)
+        os.makedirs(os.path.dirname(npy_path), exist_ok=True)
+
+        df = df[~df.index.duplicated(keep='last')].sort_index()
+        block = np.empty((len(df), 1 + len(OHLCV)), dtype='float64', order='F')
+        block[:, 0] = _index_to_epoch(df.index)
+        block[:, 1:] = df[OHLCV].to_numpy(dtype='float64')
+
+        meta = dict(meta)
+        meta['tz'] = str(df.index.tz) if df.index.tz is not None else None
+        meta['index_name'] = df.index.name or ('Date' if meta['tz'] is None else 'Datetime')
+        meta['rows'] = len(df)
+        meta['last_ts'] = float(block[-1, 0]) if len(df) else None
+
+        tmp_path = npy_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, block)
+        os.replace(tmp_path, npy_path)
+        self._write_meta(ticker, interval, meta, adjusted)
+
+    def _write_meta(self, ticker, interval, meta, adjusted=True):
+        _, meta_path = self._paths(ticker, interval, adjusted)
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def is_current(self, meta, interval, start, end):
+        """True if the stored range covers [start, end) and is recent enough."""
+        if meta is None:
+            return False
+        if _to_timestamp(start) < _to_timestamp(meta['start']) or _to_timestamp(end) > _to_timestamp(meta['end']):
+            return False
+        # Ranges that closed before the last fetch day cannot change any more
+        fetched_day = pd.Timestamp(datetime.fromtimestamp(meta['fetched_at']).date())
+        if _to_timestamp(end) <= fetched_day:
+            return True
+        ttl = FRESHNESS.get(interval, 900)
+        if not meta.get('rows'):
+            # Tombstone of a symbol that has never returned bars
+            ttl = max(ttl, MISSING_TTL)
+        return time.time() - meta['fetched_at'] < ttl
+
+    def plan(self, ticker, interval, start, end, adjusted=True):
+        """Range that must be downloaded to serve [start, end), or None if stored data suffices.
+
+        When the stored series already reaches back far enough only the tail
+        is requested, starting at the last stored bar so a partial bar gets
+        refreshed; older gaps or a due rebase fall back to a full window.
+        """
+        meta = self.load_meta(ticker, interval, adjusted)
+        if self.is_current(meta, interval, start, end):
+            return None
+        if meta is None or meta.get('last_ts') is None:
+            return start, end
+        end = max(_to_timestamp(end), _to_timestamp(meta['end']))
+        if _to_timestamp(start) < _to_timestamp(meta['start']) or self._rebase_due(meta, adjusted):
+            return min(_to_timestamp(start), _to_timestamp(meta['start'])), end
+
+        last_bar = pd.Timestamp(meta['last_ts'], unit='s', tz='UTC')
+        if meta.get('tz'):
+            return last_bar.tz_convert(meta['tz']), end
+        return last_bar.tz_localize(None).normalize(), end
+
+    def _rebase_due(self, meta, adjusted):
+        # Adjusted history is rewritten by dividends/splits, so re-download it now and then
+        return adjusted and time.time() - meta.get('based_at', 0) > REBASE_AFTER
+
+    def update(self, ticker, interval, df, start, end, adjusted=True):
+        """Merges freshly downloaded bars covering [start, end) into the store.
+
+        The download is authoritative from its first bar onwards; stored bars
+        before that are kept. An empty download still records the fetch so an
+        idle market does not trigger a refetch on every call; for a series
+        never stored before it writes an empty tombstone, so symbols unknown
+        upstream are only asked for again after MISSING_TTL.
+        """
+        df = normalize_ohlcv(df)
+        with self._lock(ticker, interval, adjusted):
+            meta = self.load_meta(ticker, interval, adjusted)
+            full = meta is None or _to_timestamp(start) <= _to_timestamp(meta['start'])
+            if df.empty:
+                if meta is None:
+                    self.write(ticker, interval, pd.DataFrame(columns=OHLCV, index=pd.DatetimeIndex([]), dtype='float64'), {
+                        'start': _to_timestamp(start).isoformat(),
+                        'end': _to_timestamp(end).isoformat(),
+                        'fetched_at': time.time(),
+                        'based_at': time.time(),
+                    }, adjusted)
+                    return False
+                meta['end'] = max(_to_timestamp(end), _to_timestamp(meta['end'])).isoformat()
+                meta['fetched_at'] = time.time()
+                self._write_meta(ticker, interval, meta, adjusted)
+                return False
+
+            existing = self.read(ticker, interval, adjusted=adjusted) if meta else None
+            if existing is not None and not existing.empty and (existing.index.tz is None) == (df.index.tz is None):
+                df = pd.concat([existing[existing.index < df.index[0]], df])
+                start = min(_to_timestamp(start), _to_timestamp(meta['start']))
+                end = max(_to_timestamp(end), _to_timestamp(meta['end']))
+            else:
+                full = True
+            self.write(ticker, interval, df, {
+                'start': _to_timestamp(start).isoformat(),
+                'end': _to_timestamp(end).isoformat(),
+                'fetched_at': time.time(),
+                'based_at': time.time() if full else meta.get('based_at', 0),
+            }, adjusted)
+        return True
+
+    def get_or_fetch(self, ticker, interval, start, end, fetch, adjusted=True):
+        """Serves [start, end) from disk, calling ``fetch(start, end)`` only when needed."""
+        with self._lock(ticker, interval, adjusted):
+            window = self.plan(ticker, interval, start, end, adjusted)
+        if window is not None:
+            self.update(ticker, interval, fetch(*window), window[0], window[1], adjusted)
+        df = self.read(ticker, interval, start, end, adjusted)
+        return df if df is not None else pd.DataFrame(columns=OHLCV)
+
+
+BAR_STORE = BarStore(os.environ.get('STOCKPRO_BAR_STORE', 'bar_store'))
+
+
+def load_bars(ticker, start, end, interval='1d', adjusted=True, store=None):
+    """Reads bars through the shared store, asking the data provider on a miss.
+
+    Weekly/monthly bars are aggregated from the stored daily series, and
+    intraday intervals are aggregated from a finer stored series when one
+    is already current, so switching chart presets needs no extra download.
+    """
+    store = store or BAR_STORE
+
+    base = BASE_INTERVAL.get(interval)
+    if base is not None:
+        # Start on a Monday / month start so the first aggregated bar is complete
+        first = _to_timestamp(start)
+        first = first - pd.Timedelta(days=first.weekday()) if interval == '1wk' else first.replace(day=1)
+        meta = store.load_meta(ticker, base, adjusted)
+        if meta is not None and first < _to_timestamp(meta['start']) <= _to_timestamp(start):
+            # Rounding down must not reach before the stored daily series, or it is all downloaded again
+            first = _to_timestamp(meta['start'])
+        return resample_ohlcv(load_bars(ticker, first, end, base, adjusted, store), interval)
+
+    for source in FINER_SOURCES.get(interval, []):
+        meta = store.load_meta(ticker, source, adjusted)
+        # A tombstone (no bars) says nothing about the coarser series
+        if meta is not None and meta.get('rows') and store.is_current(meta, source, start, end):
+            return resample_ohlcv(store.read(ticker, source, start, end, adjusted), interval)
+
+    def fetch(s, e):
+        return get_provider().history_range(ticker, s, e, interval=interval, auto_adjust=adjusted)
+
+    return store.get_or_fetch(ticker, interval, start, end, fetch, adjusted)
+
+
+def load_bars_many(tickers, start, end, interval='1d', adjusted=True, store=None, batch_size=50):
+    """Batched load_bars: stale tickers are downloaded together, ``batch_size`` per request.
+
+    Returns {ticker: frame} for every ticker with stored bars in [start, end).
+    """
+    store = store or BAR_STORE
+    tickers = list(tickers)
+    plans = {t: store.plan(t, interval, start, end, adjusted) for t in tickers}
+    stale = [t for t in tickers if plans[t] is not None]
+
+    for i in range(0, len(stale), batch_size):
+        chunk = stale[i:i + batch_size]
+        fetch_start = min(_to_timestamp(plans[t][0]) for t in chunk)
+        fetch_end = max(_to_timestamp(plans[t][1]) for t in chunk)
+        try:
+            frames = get_provider().history_many(chunk, start=fetch_start, end=fetch_end,
+                                                 interval=interval, auto_adjust=adjusted)
+        except Exception as e:
+            print(f"Batch fetch failed: {e}")
+            continue
+        for ticker in chunk:
+            store.update(ticker, interval, frames.get(ticker), fetch_start, fetch_end, adjusted)
+
+    results = {}
+    for ticker in tickers:
+        df = store.read(ticker, interval, start, end, adjusted)
+        if df is not None and not df.empty:
+            results[ticker] = df
+    return results
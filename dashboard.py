@@ -7,10 +7,12 @@ import time
 import importlib
 import json
 import os
-import yfinance as yf
 import stock_screener
+import fetch_market_data
+import market_snapshot
 from stock_screener import StockScreener
-from stock_analyzer import StockAnalyzer
+from stock_analyzer import run_deep_analysis
+from data_provider import get_provider
 import threading
 
 # --- Page Configuration (MUST be first Streamlit command) ---
@@ -262,7 +264,7 @@ def get_footfall():
 def get_market_sentiment():
     """Fetches Nifty 50 to gauge overall mood."""
     try:
-        nifty = yf.download("^NSEI", period="2d", progress=False)
+        nifty = get_provider().history("^NSEI", period="2d")
         if nifty.empty or len(nifty) < 2: 
             return "MARKET NEUTRAL ⚖️", 0, "rgba(255,255,255,0.1)", ""
         
@@ -334,20 +336,14 @@ def render_market_data_bar():
     missing_syms = [idx['sym'] for idx in indices_config if idx['name'] not in results]
     if missing_syms:
         try:
-            d = yf.download(missing_syms, period="2d", progress=False)
-            if not d.empty:
-                # Normalize column access for both single and multi-symbol results
-                close_prices = d['Close']
+            d = get_provider().history_many(missing_syms, period="2d")
+            if d:
                 for idx in indices_config:
                     if idx['name'] in results: continue
                     sym = idx['sym']
                     
                     try:
-                        # Extract ticker data from DataFrame or Series
-                        if len(missing_syms) == 1:
-                            valid_p = close_prices.dropna()
-                        else:
-                            valid_p = close_prices[sym].dropna() if sym in close_prices else None
+                        valid_p = d[sym]['Close'].dropna() if sym in d else None
                         
                         if valid_p is not None and not valid_p.empty:
                             lp = float(valid_p.iloc[-1])
@@ -763,44 +759,40 @@ if page == "Home":
     month_stars = []
     data_source = "Live Scan"
 
-    # Try to load from cache first
-    cache_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "market_cache.json")
+    # Try the market snapshot first (parsed once per generation)
     loaded_from_cache = False
+    snapshot = market_snapshot.load_snapshot()
     
-    if os.path.exists(cache_path):
+    if snapshot is not None and len(snapshot):
         try:
-            with open(cache_path, "r") as f:
-                cache_data = json.load(f)
-                
-            # Parse Day Stars
-            for item in cache_data.get("top_gainers_1d", [])[:4]:
-                day_stars.append({
-                    'ticker': item['ticker'],
-                    'price': item['price'],
-                    'change': item['change_1d']
-                })
-                
-            # Parse Month Stars
-            for item in cache_data.get("top_gainers_30d", [])[:3]:
-                month_stars.append({
-                    'ticker': item['ticker'],
-                    'price': item['price'],
-                    'change': item['change_30d']
-                })
+            day_stars = [{'ticker': item['ticker'], 'price': item['price'], 'change': item['change_1d']}
+                         for item in snapshot.top('change_1d', 4)]
+            month_stars = [{'ticker': item['ticker'], 'price': item['price'], 'change': item['change_30d']}
+                           for item in snapshot.top('change_30d', 3)]
             
             if day_stars and month_stars:
                 loaded_from_cache = True
-                data_source = f"Cached ({cache_data.get('last_updated', '')[:16].replace('T', ' ')})"
+                data_source = f"Cached ({snapshot.last_updated[:16].replace('T', ' ')})"
+                # Stale snapshot: keep showing it while a fresh one is built
+                age = datetime.now() - datetime.fromisoformat(snapshot.last_updated)
+                if age > timedelta(hours=fetch_market_data.SNAPSHOT_MAX_AGE_HOURS):
+                    fetch_market_data.refresh_cache_async()
         except Exception as e:
             pass
             
     if not loaded_from_cache:
-        with st.spinner("Scanning popular stocks for top performers..."):
-            screener = StockScreener(POPULAR_STOCKS)
-            day_stars, month_stars = screener.get_market_stars()
+        # Ranked from stored bars only; never waits on downloads
+        screener = StockScreener(POPULAR_STOCKS)
+        day_stars, month_stars = screener.get_market_stars()
+        fetch_market_data.refresh_cache_async()
+        data_source = "Stored bars"
             
-    if loaded_from_cache:
+    if fetch_market_data.refresh_running():
+        st.caption(f"⚡ Data: {data_source} • 🔄 refreshing market snapshot in the background")
+    elif loaded_from_cache:
         st.caption(f"⚡ Data: {data_source}")
+    if not day_stars and not month_stars:
+        st.caption("Market leaders will appear once the market snapshot has been built.")
 
     # --- Line 1: Stars of the Month (Compact 4-col) ---
     st.markdown("**🏆 Leaderboard (Month / Day)**")
@@ -897,20 +889,94 @@ elif page == "💎 Potential Multibaggers":
     st.info(strat_info[selected_strat])
     
     with strat_col3:
-        st.write("") # Spacer
-        if st.button("🚀 Run Strategy Scan", type="primary", use_container_width=True):
-            with st.spinner(f"Executing {selected_strat} on {selected_universe}..."):
-                # Determine tickers to scan based on universe
-                if "Nifty 500" in selected_universe:
-                    tickers_to_scan = fetch_nifty_500()
-                else:
-                    tickers_to_scan = [f"{s['symbol']}.NS" for s in TICKER_DB]
-                
-                screener = StockScreener(tickers_to_scan)
-                candidates = screener.get_multibagger_candidates(limit=10, strategy=selected_strat)
-                st.session_state['multibagger_results'] = candidates
-                st.session_state['last_multibagger_strat'] = selected_strat
+        scan_budget = st.select_slider(
+            "⏱️ Time Budget",
+            options=["5 s", "10 s", "30 s", "60 s", "Full scan"],
+            value="10 s",
+            help="Show the best results found within this time; the scan keeps refining them in the background."
+        )
+        run_scan = st.button("🚀 Run Strategy Scan", type="primary", use_container_width=True)
+    if run_scan:
+        # Determine tickers to scan based on universe
+        if "Nifty 500" in selected_universe:
+            tickers_to_scan = fetch_nifty_500()
+        else:
+            tickers_to_scan = [f"{s['symbol']}.NS" for s in TICKER_DB]
+        
+        previous = st.session_state.get('multibagger_scan')
+        if previous is not None:
+            previous.cancel()
+        st.session_state['multibagger_scan'] = None
+        
+        screener = StockScreener(tickers_to_scan)
+        # Same strategy and universe already scanned on the latest bar (by any session)
+        candidates = screener.cached_multibagger_candidates(limit=10, strategy=selected_strat)
+        if candidates is not None:
+            st.toast("⚡ Served from the shared scan cache")
+        else:
+            # Runs on a background thread; this request only waits for the time budget
+            scan = screener.start_multibagger_scan(limit=10, strategy=selected_strat)
+            deadline = None if scan_budget == "Full scan" else time.time() + float(scan_budget.split()[0])
+            scan_bar = st.progress(0, text=f"Executing {selected_strat} on {selected_universe}...")
+            leaders = st.empty()
+            while not scan.done and (deadline is None or time.time() < deadline):
+                update = scan.wait(0.25)
+                if update:
+                    scan_bar.progress(update['coverage'],
+                                      text=f"{selected_strat}: {update['coverage']:.0%} of universe covered")
+                    if update['top']:
+                        leaders.caption("Leaders so far: " + ", ".join(f"{c['ticker']} ({c['score']})" for c in update['top']))
+            scan_bar.empty()
+            leaders.empty()
+            st.session_state['multibagger_scan'] = scan
+            candidates = scan.latest['top'] if scan.latest else []
+        st.session_state['multibagger_results'] = candidates
+        st.session_state['multibagger_counts'] = screener.scan_counts
+        st.session_state['last_multibagger_strat'] = selected_strat
+        st.session_state['last_multibagger_universe'] = selected_universe
+
+    # Custom screens run against a universe panel kept in the session, so edits re-evaluate instantly
+    with st.expander("🧮 Custom Screen", expanded=False):
+        custom_expr = st.text_input(
+            "Screen expression",
+            value="close > sma(50) > sma(200) and rsi(14) between 40 and 70 and vol / sma(vol,20) > 1.5",
+            help="Fields: open, high, low, close, vol, price. Functions: sma, ema, rsi, std, max, min, change "
+                 "(e.g. sma(50), sma(vol, 20), change(5)). Combine with and / or / not / between."
+        )
+        if st.button("▶️ Run Custom Screen", use_container_width=True):
+            try:
+                plan = stock_screener.compile_screen(custom_expr)
+                cached = st.session_state.get('screen_panel')
+                if not cached or cached['universe'] != selected_universe or time.time() - cached['built'] > 900:
+                    with st.spinner(f"Loading {selected_universe} panel..."):
+                        if "Nifty 500" in selected_universe:
+                            tickers_to_scan = fetch_nifty_500()
+                        else:
+                            tickers_to_scan = [f"{s['symbol']}.NS" for s in TICKER_DB]
+                        features = StockScreener(tickers_to_scan).universe_features()
+                    cached = {'universe': selected_universe, 'built': time.time(), 'features': features}
+                    st.session_state['screen_panel'] = cached
+                st.session_state['multibagger_results'] = StockScreener([]).run_custom_screen(plan, features=cached['features'])
+                st.session_state['multibagger_counts'] = None
+                st.session_state['multibagger_scan'] = None
+                st.session_state['last_multibagger_strat'] = f"Custom: {custom_expr}"
                 st.session_state['last_multibagger_universe'] = selected_universe
+            except ValueError as e:
+                st.error(f"Screen error: {e}")
+
+    # A scan cut off by its time budget keeps refining; pick up its latest results on every rerun
+    bg_scan = st.session_state.get('multibagger_scan')
+    if bg_scan is not None and bg_scan.latest:
+        st.session_state['multibagger_results'] = bg_scan.latest['top']
+        st.session_state['multibagger_counts'] = bg_scan.latest['counts']
+        if bg_scan.coverage < 1:
+            state = "refining in background" if not bg_scan.done else "stopped"
+            cov_col1, cov_col2 = st.columns([3, 1])
+            with cov_col1:
+                st.warning(f"⏳ Partial results: {bg_scan.coverage:.0%} of the universe covered, scan {state}.")
+            with cov_col2:
+                if not bg_scan.done and st.button("🔄 Refresh Results", use_container_width=True):
+                    st.rerun()
 
     if st.session_state.get('multibagger_results'):
         candidates = st.session_state['multibagger_results']
@@ -918,6 +984,15 @@ elif page == "💎 Potential Multibaggers":
         current_univ = st.session_state.get('last_multibagger_universe', "Market")
         
         st.markdown(f"### 💎 {current_univ} • {current_strat}")
+        counts = st.session_state.get('multibagger_counts')
+        if counts:
+            pruned = ", ".join(f"{n} {reason}" for reason, n in counts['snapshot_pruned'].items() if n)
+            failed = counts.get('failed', 0)
+            st.caption(
+                f"🔎 {counts['universe']} symbols → {counts['history_requested']} after snapshot prefilter"
+                f"{f' ({pruned})' if pruned else ''} → {counts['scored']} with full history"
+                f" → {counts['candidates']} candidates{f' • {failed} failed to load' if failed else ''}"
+            )
         st.markdown("---")
         
         # Ultra-compact Table Header
@@ -960,6 +1035,9 @@ elif page == "💎 Potential Multibaggers":
         st.success(f"Scanning complete. Found {len(candidates)} candidates.")
             
         if st.button("🗑️ Clear Results"):
+            if st.session_state.get('multibagger_scan') is not None:
+                st.session_state['multibagger_scan'].cancel()
+                st.session_state['multibagger_scan'] = None
             del st.session_state['multibagger_results']
             st.rerun()
     else:
@@ -1080,21 +1158,14 @@ elif page == "🔍 Deep Analyzer":
 
     if st.button("🚀 Run Analysis & Forecast", type="primary", use_container_width=True) or auto_click:
         with st.spinner(f"Fetching data for {ticker_input}..."):
-            analyzer = StockAnalyzer(ticker_input)
-            # 1. Main Fetch for Chart
-            success = analyzer.fetch_data(start=start_date, end=end_date, interval=interval_code)
+            # Chart, 5Y daily for AI (always fetched for projection stability),
+            # fundamentals and news all run concurrently
+            analyzer, ai_analyzer, stage_status = run_deep_analysis(ticker_input, start_date, end_date, interval_code)
             
-            # 2. Background Fetch for AI (Always at least 1Y Daily)
-            if success:
-                ai_analyzer = StockAnalyzer(ticker_input)
-                # Always fetch 5 years for AI to ensure maximum projection stability
-                ai_days = 365 * 5
-                ai_start = end_date - timedelta(days=ai_days)
-                ai_analyzer.fetch_data(start=ai_start, end=end_date, interval='1d')
-                
-                # Fetch balance
-                analyzer.fetch_fundamentals()
-                analyzer.get_news()
+            if analyzer is not None:
+                slow = [name for name, state in stage_status.items() if state in ('timeout', 'error')]
+                if slow:
+                    st.caption(f"⏳ Still loading: {', '.join(slow)}")
                 
                 st.session_state['data'] = analyzer.data
                 st.session_state['analyzer'] = analyzer
@@ -1178,9 +1249,13 @@ elif page == "🔍 Deep Analyzer":
         vol_colors = ['red' if df['Open'].iloc[i] > df['Close'].iloc[i] else 'green' for i in range(len(df))]
         fig.add_trace(go.Bar(x=df.index, y=df['Volume'], name="Volume", marker_color=vol_colors, opacity=0.5), row=2, col=1)
 
-        # Ensure indicators exist (Recalculate if missing)
-        if (show_bb or show_emas or show_macd) and 'MA20' not in df.columns:
-             analyzer.calculate_indicators()
+        # Resolve only the indicators the enabled toggles draw
+        needed = (['Upper_Band', 'Lower_Band'] if show_bb else []) \
+                 + (['EMA20', 'EMA50', 'EMA200'] if show_emas else []) \
+                 + (['MACD', 'Signal_Line', 'MACD_Hist'] if show_macd else [])
+        missing = [c for c in needed if c not in df.columns]
+        if missing:
+             analyzer.calculate_indicators(only=missing)
              df = analyzer.data
              st.session_state['data'] = df
 
@@ -1419,11 +1494,19 @@ elif page == "🚀 Trending Picks (Top 5)":
         
         progress_text = "Scanning market leaders... Please wait."
         my_bar = st.progress(0, text=progress_text)
+        leaders = st.empty()
         
-        with st.spinner("Analyzing price action, volume, and momentum..."):
-            top_picks = screener.screen_market()
-            st.session_state['market_picks_global'] = top_picks
-            my_bar.progress(100, text="Scan Complete!")
+        top_picks = []
+        # Progress and partial leaders update as each chunk is scored
+        for update in screener.iter_screen_market(limit=5):
+            top_picks = update['top']
+            my_bar.progress(update['done'] / update['total'],
+                            text=f"Scanned {update['done']}/{update['total']} stocks...")
+            if top_picks:
+                leaders.caption("Leaders so far: " + ", ".join(f"{p['ticker']} ({p['score']})" for p in top_picks))
+        leaders.empty()
+        st.session_state['market_picks_global'] = top_picks
+        my_bar.progress(1.0, text="Scan Complete!")
             
     # Persistent Results Display
     top_picks = st.session_state.get('market_picks_global', [])
@@ -0,0 +1,473 @@
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+try:
+    import yfinance as yf
+except ImportError:
+    yf = None
+
+OHLCV = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Recorded intraday bars are replayed in NSE local time
+REPLAY_TZ = 'Asia/Kolkata'
+
+# Calendar periods understood by the replay provider ("Nd" is handled as N sessions)
+PERIODS = {
+    '1mo': pd.DateOffset(months=1), '3mo': pd.DateOffset(months=3), '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1), '2y': pd.DateOffset(years=2), '5y': pd.DateOffset(years=5),
+    '10y': pd.DateOffset(years=10),
+}
+
+
+# Yahoo only serves intraday bars this many days back ...
+MAX_LOOKBACK_DAYS = {'1m': 30, '2m': 60, '5m': 60, '15m': 60, '30m': 60, '90m': 60, '60m': 730, '1h': 730}
+
+# ... and only this many days per request
+MAX_SPAN_DAYS = {'1m': 7, '2m': 30, '5m': 30, '15m': 30, '30m': 30, '90m': 30, '60m': 365, '1h': 365}
+
+
+def normalize_ohlcv(df):
+    """Flattens a yfinance frame into plain Open/High/Low/Close/Volume columns."""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=OHLCV)
+
+    # --- FIX: yfinance MultiIndex columns ---
+    if isinstance(df.columns, pd.MultiIndex):
+        if 'Ticker' in df.columns.names:
+            df.columns = df.columns.droplevel('Ticker')
+        else:
+            df.columns = df.columns.get_level_values(-1)
+
+    df = df.loc[:, ~df.columns.duplicated()].copy()
+    if not all(c in df.columns for c in OHLCV):
+        return pd.DataFrame(columns=OHLCV)
+    return df[OHLCV].dropna(subset=['Close'])
+
+
+def split_batch(df, tickers):
+    """Splits a ``group_by='ticker'`` download into per-ticker frames.
+
+    Frames are selected by ticker label only, never by position. Returns
+    ``(frames, suspect)``: ``suspect`` lists tickers whose frame cannot be
+    trusted, i.e. the batch contained columns for tickers that were not
+    requested, or two tickers came back with identical price series (the
+    yfinance data mixing bug). Those should be refetched one by one.
+    """
+    tickers = list(tickers)
+    if df is None or df.empty:
+        return {}, []
+
+    if not isinstance(df.columns, pd.MultiIndex):
+        if len(tickers) == 1:
+            stock_df = normalize_ohlcv(df)
+            return ({tickers[0]: stock_df} if not stock_df.empty else {}), []
+        return {}, tickers
+
+    returned = set(df.columns.get_level_values(0))
+    if not returned <= set(tickers):
+        return {}, tickers
+
+    frames = {}
+    owners = {}
+    suspect = set()
+    for ticker in tickers:
+        if ticker not in returned:
+            continue
+        stock_df = normalize_ohlcv(df[ticker])
+        if stock_df.empty:
+            continue
+        fingerprint = (len(stock_df), hash(stock_df[['Open', 'Close', 'Volume']].to_numpy().tobytes()))
+        if fingerprint in owners:
+            suspect.update([ticker, owners[fingerprint]])
+        owners[fingerprint] = ticker
+        frames[ticker] = stock_df
+
+    for ticker in suspect:
+        frames.pop(ticker, None)
+    return frames, sorted(suspect)
+
+
+class DataProvider(ABC):
+    """Source of bars, fundamentals and news.
+
+    Scoring and UI code talk to this interface only, so the upstream
+    (yfinance today) can be swapped for a recorded or bulk source.
+    """
+
+    @abstractmethod
+    def history(self, ticker, start=None, end=None, interval='1d', period=None, auto_adjust=True):
+        """Returns a flat OHLCV frame (possibly empty) for one ticker."""
+
+    def history_range(self, ticker, start, end, interval='1d', auto_adjust=True, max_workers=4):
+        """history() for an arbitrary [start, end) range.
+
+        Intraday ranges are clamped to what the provider still serves, split
+        into provider-sized windows fetched concurrently, then stitched and
+        de-duplicated. Other intervals go straight to history().
+        """
+        span = MAX_SPAN_DAYS.get(interval)
+        if span is None or start is None or end is None:
+            return self.history(ticker, start, end, interval, auto_adjust=auto_adjust)
+
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if (start.tzinfo is None) != (end.tzinfo is None):
+            tz = start.tzinfo or end.tzinfo
+            start = start.tz_localize(tz) if start.tzinfo is None else start
+            end = end.tz_localize(tz) if end.tzinfo is None else end
+        earliest = pd.Timestamp.now(tz=start.tzinfo).normalize() - pd.Timedelta(days=MAX_LOOKBACK_DAYS[interval] - 1)
+        if start < earliest:
+            print(f"{ticker}: {interval} bars only go back {MAX_LOOKBACK_DAYS[interval]} days, range clamped.")
+            start = earliest
+        if start >= end:
+            return pd.DataFrame(columns=OHLCV)
+
+        windows = []
+        cursor = start
+        while cursor < end:
+            windows.append((cursor, min(cursor + pd.Timedelta(days=span), end)))
+            cursor = windows[-1][1]
+        if len(windows) == 1:
+            return self.history(ticker, start, end, interval, auto_adjust=auto_adjust)
+
+        from fetch_scheduler import current_priority, set_fetch_priority
+        priority = current_priority()
+
+        def fetch(window):
+            set_fetch_priority(priority)
+            return self.history(ticker, window[0], window[1], interval, auto_adjust=auto_adjust)
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(windows))) as executor:
+            parts = [p for p in executor.map(fetch, windows) if not p.empty]
+        if not parts:
+            return pd.DataFrame(columns=OHLCV)
+        df = pd.concat(parts)
+        return df[~df.index.duplicated(keep='last')].sort_index()
+
+    @abstractmethod
+    def history_many(self, tickers, start=None, end=None, interval='1d', period=None, auto_adjust=True):
+        """Returns {ticker: flat OHLCV frame} for the tickers that had data."""
+
+    @abstractmethod
+    def info(self, ticker):
+        """Returns the raw fundamentals dict (yfinance ``.info`` keys)."""
+
+    @abstractmethod
+    def news(self, ticker):
+        """Returns a list of news item dicts."""
+
+
+class YFinanceProvider(DataProvider):
+    """Live data from Yahoo Finance via yfinance."""
+
+    def history(self, ticker, start=None, end=None, interval='1d', period=None, auto_adjust=True):
+        df = yf.download(ticker, start=start, end=end, period=period, interval=interval,
+                         progress=False, auto_adjust=auto_adjust, threads=False)
+        return normalize_ohlcv(df)
+
+    def history_many(self, tickers, start=None, end=None, interval='1d', period=None, auto_adjust=True):
+        tickers = list(tickers)
+        if not tickers:
+            return {}
+        df = yf.download(tickers, start=start, end=end, period=period, interval=interval,
+                         group_by='ticker', progress=False, auto_adjust=auto_adjust, threads=True)
+        frames, suspect = split_batch(df, tickers)
+        # Anything that failed the cross-check is fetched on its own
+        for ticker in suspect:
+            stock_df = self.history(ticker, start, end, interval, period, auto_adjust)
+            if not stock_df.empty:
+                frames[ticker] = stock_df
+        return frames
+
+    def info(self, ticker):
+        return yf.Ticker(ticker).info
+
+    def news(self, ticker):
+        return yf.Ticker(ticker).news
+
+
+class ReplayProvider(DataProvider):
+    """Serves previously recorded files, no network needed.
+
+    Layout under ``root``: ``<interval>[-raw]/<ticker>.csv`` for bars and
+    ``info/<ticker>.json`` / ``news/<ticker>.json`` for the rest (see
+    RecordingProvider). With ``align_to_today`` the recording is shifted by
+    whole weeks so its last bar lands in the current week, which lets
+    callers that compute windows from ``date.today()`` replay old captures.
+    """
+
+    def __init__(self, root, align_to_today=True):
+        self.root = root
+        self.align_to_today = align_to_today
+        self._frames = {}
+
+    def _load(self, ticker, interval, auto_adjust):
+        key = (ticker, interval, auto_adjust)
+        if key not in self._frames:
+            folder = interval if auto_adjust else f"{interval}-raw"
+            path = os.path.join(self.root, folder, f"{ticker}.csv")
+            df = pd.DataFrame(columns=OHLCV)
+            if os.path.exists(path):
+                df = pd.read_csv(path, index_col=0)
+                intraday = interval[-1] in 'mh'
+                df.index = pd.to_datetime(df.index, utc=intraday)
+                if intraday:
+                    df.index = df.index.tz_convert(REPLAY_TZ)
+                df = normalize_ohlcv(df)
+                if self.align_to_today and not df.empty:
+                    last_day = df.index[-1].tz_localize(None).normalize() if df.index.tz is not None else df.index[-1].normalize()
+                    weeks = (pd.Timestamp.today().normalize() - last_day).days // 7
+                    df.index = df.index + pd.Timedelta(weeks=weeks)
+            self._frames[key] = df
+        return self._frames[key]
+
+    def history(self, ticker, start=None, end=None, interval='1d', period=None, auto_adjust=True):
+        df = self._load(ticker, interval, auto_adjust)
+        if df.empty:
+            return df.copy()
+        tz = df.index.tz
+        if period is not None:
+            if period == 'max':
+                return df.copy()
+            days = df.index.normalize()
+            if period.endswith('d'):
+                # Like yfinance, "Nd" means the last N sessions
+                sessions = days.unique()[-int(period[:-1]):]
+                return df[days.isin(sessions)].copy()
+            start = (days[-1] - PERIODS[period]) + pd.Timedelta(days=1)
+            return df[df.index >= start].copy()
+        if start is not None:
+            start = pd.Timestamp(start)
+            start = start.tz_localize(tz) if tz is not None and start.tzinfo is None else start
+            df = df[df.index >= start]
+        if end is not None:
+            end = pd.Timestamp(end)
+            end = end.tz_localize(tz) if tz is not None and end.tzinfo is None else end
+            df = df[df.index < end]
+        return df.copy()
+
+    def history_many(self, tickers, start=None, end=None, interval='1d', period=None, auto_adjust=True):
+        frames = {}
+        for ticker in tickers:
+            df = self.history(ticker, start, end, interval, period, auto_adjust)
+            if not df.empty:
+                frames[ticker] = df
+        return frames
+
+    def _load_json(self, kind, ticker, default):
+        path = os.path.join(self.root, kind, f"{ticker}.json")
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                return json.load(f)
+        return default
+
+    def info(self, ticker):
+        return self._load_json("info", ticker, {})
+
+    def news(self, ticker):
+        return self._load_json("news", ticker, [])
+
+
+class RecordingProvider(DataProvider):
+    """Passes calls through to ``inner`` and saves the answers for ReplayProvider."""
+
+    def __init__(self, inner, root):
+        self.inner = inner
+        self.root = root
+
+    def _save_bars(self, ticker, interval, auto_adjust, df):
+        if df.empty:
+            return
+        folder = os.path.join(self.root, interval if auto_adjust else f"{interval}-raw")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{ticker}.csv")
+        if os.path.exists(path):
+            old = pd.read_csv(path, index_col=0)
+            old.index = pd.to_datetime(old.index, utc=df.index.tz is not None)
+            if df.index.tz is not None:
+                old.index = old.index.tz_convert(df.index.tz)
+            df = pd.concat([old[old.index < df.index[0]], df])
+        df.to_csv(path)
+
+    def _save_json(self, kind, ticker, payload):
+        folder = os.path.join(self.root, kind)
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"{ticker}.json"), "w") as f:
+            json.dump(payload, f, default=str)
+
+    def history(self, ticker, start=None, end=None, interval='1d', period=None, auto_adjust=True):
+        df = self.inner.history(ticker, start, end, interval, period, auto_adjust)
+        self._save_bars(ticker, interval, auto_adjust, df)
+        return df
+
+    def history_many(self, tickers, start=None, end=None, interval='1d', period=None, auto_adjust=True):
+        frames = self.inner.history_many(tickers, start, end, interval, period, auto_adjust)
+        for ticker, df in frames.items():
+            self._save_bars(ticker, interval, auto_adjust, df)
+        return frames
+
+    def info(self, ticker):
+        payload = self.inner.info(ticker)
+        self._save_json("info", ticker, payload)
+        return payload
+
+    def news(self, ticker):
+        payload = self.inner.news(ticker)
+        self._save_json("news", ticker, payload)
+        return payload
+
+
+def _share(result):
+    """Private copy of a shared result so one waiter's edits don't leak into another's."""
+    if isinstance(result, pd.DataFrame):
+        return result.copy()
+    if isinstance(result, dict):
+        return {k: _share(v) for k, v in result.items()}
+    if isinstance(result, list):
+        return list(result)
+    return result
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.priority = None
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers with the same key wait and share it.
+
+    Each call carries the most urgent (lowest) priority of everyone
+    waiting on it. ``on_boost`` is invoked when a joining caller raises
+    that priority, so whatever the leader is queued on can re-check it.
+    """
+
+    def __init__(self, on_boost=None):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.on_boost = on_boost
+        self.stats = {'calls': 0, 'shared': 0}
+
+    def priority(self, key):
+        """Current priority of the call in flight for ``key`` (None when idle)."""
+        with self._lock:
+            call = self._calls.get(key)
+            return None if call is None else call.priority
+
+    def do(self, key, fn, priority=None):
+        boosted = False
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                call.priority = priority
+                self.stats['calls'] += 1
+            else:
+                self.stats['shared'] += 1
+                if priority is not None and (call.priority is None or priority < call.priority):
+                    call.priority = priority
+                    boosted = True
+
+        if boosted and self.on_boost is not None:
+            self.on_boost()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return _share(call.result)
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return _share(call.result)
+
+
+class CoalescingProvider(DataProvider):
+    """Merges identical in-flight requests (same ticker(s), interval and range) into one upstream call.
+
+    With a ``scheduler`` (fetch_scheduler.FetchScheduler) only the leader
+    of a coalesced call takes a rate-limit slot; callers that join it are
+    free. The leader queues at the most urgent priority among everyone
+    waiting on the call, so an interactive caller joining a queued
+    background fetch promotes it instead of waiting behind it.
+    """
+
+    def __init__(self, inner, scheduler=None):
+        self.inner = inner
+        self.scheduler = scheduler
+        self.flight = SingleFlight(on_boost=scheduler.wake if scheduler is not None else None)
+
+    def _do(self, key, fn, cost=1):
+        if self.scheduler is None:
+            return self.flight.do(key, fn)
+        from fetch_scheduler import current_priority
+
+        def lead():
+            self.scheduler.acquire(priority=lambda: self.flight.priority(key), cost=cost)
+            return fn()
+        return self.flight.do(key, lead, priority=current_priority())
+
+    def history(self, ticker, start=None, end=None, interval='1d', period=None, auto_adjust=True):
+        key = ('history', ticker, str(start), str(end), interval, period, auto_adjust)
+        return self._do(key, lambda: self.inner.history(ticker, start, end, interval, period, auto_adjust))
+
+    def history_many(self, tickers, start=None, end=None, interval='1d', period=None, auto_adjust=True):
+        tickers = list(tickers)
+        key = ('history_many', tuple(tickers), str(start), str(end), interval, period, auto_adjust)
+        return self._do(key, lambda: self.inner.history_many(tickers, start, end, interval, period, auto_adjust),
+                        cost=max(1, len(tickers)))
+
+    def info(self, ticker):
+        return self._do(('info', ticker), lambda: self.inner.info(ticker))
+
+    def news(self, ticker):
+        return self._do(('news', ticker), lambda: self.inner.news(ticker))
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    """Process-wide provider, chosen by STOCKPRO_DATA_PROVIDER.
+
+    ``yfinance`` (default), ``replay:<dir>`` or ``record:<dir>``. The
+    source is wrapped so concurrent identical requests from the dashboard
+    sessions and the bot thread share one upstream call, and network
+    sources are rate limited by the global fetch scheduler. Only the
+    leader of a coalesced call spends a slot, at the most urgent priority
+    of the callers sharing it, so an interactive request never waits
+    behind a queued background one.
+    """
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            from fetch_scheduler import SCHEDULER
+            spec = os.environ.get('STOCKPRO_DATA_PROVIDER', 'yfinance')
+            kind, _, root = spec.partition(':')
+            if kind == 'replay':
+                _provider = CoalescingProvider(ReplayProvider(root))
+            elif kind == 'record':
+                _provider = CoalescingProvider(RecordingProvider(YFinanceProvider(), root), SCHEDULER)
+            else:
+                _provider = CoalescingProvider(YFinanceProvider(), SCHEDULER)
+    return _provider
+
+
+def set_provider(provider):
+    """Installs ``provider`` for the whole process (tests, benchmarks)."""
+    global _provider
+    _provider = provider
@@ -1,16 +1,185 @@
 import json
 import os
+import threading
 import time
-import yfinance as yf
+import numpy as np
 import pandas as pd
 from datetime import date, timedelta, datetime
+from bar_store import BAR_STORE, load_bars_many
+from market_snapshot import SNAPSHOT_PATH, Snapshot, load_snapshot, write_json_export, write_snapshot
+from fetch_scheduler import BACKGROUND, fetch_priority
+from scan_cache import MARKET_TZ, SESSION_CLOSE, SESSION_OPEN, last_completed_bar
+
+# Universe refresh engine: 'batch' (yfinance batches, one after another) or 'async'
+FETCH_ENGINE = os.environ.get('STOCKPRO_FETCH_ENGINE', 'batch')
+
+# Snapshots older than this are not trusted for prefiltering scans
+SNAPSHOT_MAX_AGE_HOURS = float(os.environ.get('STOCKPRO_SNAPSHOT_MAX_AGE_HOURS', 24))
+
+
+def load_universe_stats(cache_path='market_cache.json', max_age_hours=SNAPSHOT_MAX_AGE_HOURS):
+    """{ticker: stats} from the snapshot written by update_cache.
+
+    Reads the binary snapshot (or the ``all_stats`` of the JSON export
+    ``cache_path`` when there is none). Returns {} when it is missing,
+    unreadable or older than ``max_age_hours`` (None disables the age check).
+    """
+    snapshot = load_snapshot(json_path=cache_path)
+    if snapshot is None:
+        return {}
+    try:
+        if max_age_hours is not None:
+            age = datetime.now() - datetime.fromisoformat(snapshot.last_updated)
+            if age > timedelta(hours=max_age_hours):
+                return {}
+    except (TypeError, ValueError) as e:
+        print(f"Could not read market snapshot: {e}")
+        return {}
+    return snapshot.by_ticker()
+
+
+def snapshot_is_current(snapshot=None, now=None):
+    """True if the market snapshot was taken after the close of the session a scan run ``now`` prices from.
+
+    During the session live prices keep moving away from any snapshot, so
+    it is never current then.
+    """
+    snapshot = load_snapshot() if snapshot is None else snapshot
+    if snapshot is None:
+        return False
+    now = pd.Timestamp.now(tz=MARKET_TZ) if now is None else pd.Timestamp(now).tz_convert(MARKET_TZ)
+    day = now.normalize()
+    if day.weekday() < 5 and day + SESSION_OPEN <= now < day + SESSION_CLOSE:
+        return False
+    session_close = pd.Timestamp(last_completed_bar(now), tz=MARKET_TZ) + SESSION_CLOSE
+    try:
+        taken = datetime.fromisoformat(snapshot.last_updated).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return taken >= session_close.timestamp()
+
+
+def row_stats(symbol, stock_df):
+    """Snapshot row (price, 1d/5d/30d change, volume) from about a month of daily bars, or None."""
+    # Check we have enough data
+    stock_df = stock_df.dropna(subset=['Close'])
+    if len(stock_df) < 2:
+        return None
+        
+    last_close = float(stock_df['Close'].iloc[-1])
+    prev_close = float(stock_df['Close'].iloc[-2])
+    
+    # 1-Day Change
+    change_1d = ((last_close - prev_close) / prev_close) * 100
+    volume = int(stock_df['Volume'].iloc[-1]) if 'Volume' in stock_df.columns else 0
+    
+    # We could calculate more metrics here (e.g. 5-day change)
+    change_5d = 0
+    change_30d = 0
+    if len(stock_df) >= 5:
+        prev_5d = float(stock_df['Close'].iloc[-5])
+        change_5d = ((last_close - prev_5d) / prev_5d) * 100
+    if len(stock_df) >= 20: # Approx 1 month trading days
+        prev_30d = float(stock_df['Close'].iloc[0]) # Start of the 1mo period
+        change_30d = ((last_close - prev_30d) / prev_30d) * 100
+
+    return {
+        'ticker': symbol,
+        'price': last_close,
+        'change_1d': change_1d,
+        'change_5d': change_5d,
+        'change_30d': change_30d,
+        'volume': volume
+    }
+
+
+def stats_from_bar_store(symbols, store=None, fresh_after=None):
+    """Snapshot rows computed from daily bars already in the bar store (never downloads).
+
+    With ``fresh_after`` (epoch seconds, e.g. when the snapshot was taken)
+    only tickers whose stored bars are current or were fetched after it
+    are returned; for the others the snapshot row is the better source.
+    """
+    store = store or BAR_STORE
+    end = date.today() + timedelta(days=1)
+    start = end - timedelta(days=31)
+    rows = []
+    for symbol in symbols:
+        try:
+            if fresh_after is not None:
+                meta = store.load_meta(symbol, '1d')
+                if meta is None or not (store.is_current(meta, '1d', start, end)
+                                        or meta.get('fetched_at', 0) > fresh_after):
+                    continue
+            df = store.read(symbol, '1d', start=start)
+            row = row_stats(symbol, df) if df is not None else None
+        except Exception:
+            row = None
+        if row is not None:
+            rows.append(row)
+    return rows
+
+
+class StatsRanking:
+    """Columnar view of snapshot rows answering "top N by field" in O(N).
+
+    Selection uses np.argpartition, so only the N winners are sorted;
+    missing values rank last.
+    """
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self._columns = {}
+
+    def column(self, field):
+        if field not in self._columns:
+            values = np.array([row.get(field, np.nan) for row in self.rows], dtype='float64')
+            self._columns[field] = np.where(np.isnan(values), -np.inf, values)
+        return self._columns[field]
+
+    def top(self, field, n):
+        values = self.column(field)
+        n = min(n, len(values))
+        if n <= 0:
+            return []
+        idx = np.argpartition(-values, n - 1)[:n] if n < len(values) else np.arange(len(values))
+        idx = idx[np.argsort(-values[idx], kind='stable')]
+        return [self.rows[i] for i in idx]
+
+
+_refresh_lock = threading.Lock()
+_refresh_thread = None
+
+
+def refresh_cache_async():
+    """Starts MarketDataFetcher().update_cache() on a daemon thread unless one is running.
+
+    Returns True if a refresh was started.
+    """
+    global _refresh_thread
+    with _refresh_lock:
+        if _refresh_thread is not None and _refresh_thread.is_alive():
+            return False
+        _refresh_thread = threading.Thread(target=lambda: MarketDataFetcher().update_cache(), daemon=True)
+        _refresh_thread.start()
+        return True
+
+
+def refresh_running():
+    return _refresh_thread is not None and _refresh_thread.is_alive()
+
 
 class MarketDataFetcher:
-    def __init__(self, db_path='ticker_db.json', cache_path='market_cache.json'):
+    def __init__(self, db_path='ticker_db.json', cache_path='market_cache.json', engine=None, fetcher=None,
+                 snapshot_path=SNAPSHOT_PATH):
         self.base_path = os.path.dirname(os.path.abspath(__file__))
         self.db_path = os.path.join(self.base_path, db_path)
         self.cache_path = os.path.join(self.base_path, cache_path)
+        self.snapshot_path = os.path.join(self.base_path, snapshot_path)
         self.symbols = self.load_symbols()
+        self.engine = engine or FETCH_ENGINE
+        # AsyncChartFetcher for the 'async' engine (created on first use)
+        self.fetcher = fetcher
 
     def load_symbols(self):
         if os.path.exists(self.db_path):
@@ -25,58 +194,42 @@ class MarketDataFetcher:
         
         all_stats = []
         
+        # Window equivalent to period="1mo", kept in the shared bar store
+        end_date = date.today() + timedelta(days=1)
+        start_date = end_date - timedelta(days=31)
+        
         # Process in batches to avoid overwhelming yfinance/network
         chunks = [self.symbols[i:i + batch_size] for i in range(0, len(self.symbols), batch_size)]
         
+        prefetched = None
+        if self.engine == 'async':
+            # All chunks downloaded concurrently up front, then summarized as below
+            try:
+                from async_fetcher import AsyncChartFetcher, load_bars_many_async
+                self.fetcher = self.fetcher or AsyncChartFetcher()
+                prefetched = load_bars_many_async(self.symbols, start_date, end_date, interval='1d',
+                                                  fetcher=self.fetcher, chunk_size=batch_size)
+                print(f"Async fetch: {self.fetcher.summary()}")
+            except Exception as e:
+                print(f"Async fetch failed, using the batch engine: {e}")
+        
         for chunk in chunks:
             try:
-                # Download last 1 month of data for the chunk (needed for monthly stats)
-                # group_by='ticker' ensures we get a structure we can iterate easily
-                df = yf.download(chunk, period="1mo", group_by='ticker', progress=False, threads=True)
-                
-                if df.empty:
-                    continue
+                # Only symbols whose stored bars are missing or stale hit the network
+                if prefetched is not None:
+                    frames = prefetched
+                else:
+                    frames = load_bars_many(chunk, start_date, end_date, interval='1d', batch_size=batch_size)
                     
                 for symbol in chunk:
                     try:
-                        # Handle case where single ticker download results in different structure
-                        if len(chunk) == 1:
-                            stock_df = df
-                        else:
-                            if symbol not in df.columns.levels[0]:
-                                continue
-                            stock_df = df[symbol]
-                        
-                        # Check we have enough data
-                        stock_df = stock_df.dropna(subset=['Close'])
-                        if len(stock_df) < 2:
+                        stock_df = frames.get(symbol)
+                        if stock_df is None:
                             continue
-                            
-                        last_close = float(stock_df['Close'].iloc[-1])
-                        prev_close = float(stock_df['Close'].iloc[-2])
                         
-                        # 1-Day Change
-                        change_1d = ((last_close - prev_close) / prev_close) * 100
-                        volume = int(stock_df['Volume'].iloc[-1]) if 'Volume' in stock_df.columns else 0
-                        
-                        # We could calculate more metrics here (e.g. 5-day change)
-                        change_5d = 0
-                        change_30d = 0
-                        if len(stock_df) >= 5:
-                            prev_5d = float(stock_df['Close'].iloc[-5])
-                            change_5d = ((last_close - prev_5d) / prev_5d) * 100
-                        if len(stock_df) >= 20: # Approx 1 month trading days
-                            prev_30d = float(stock_df['Close'].iloc[0]) # Start of the 1mo period
-                            change_30d = ((last_close - prev_30d) / prev_30d) * 100
-
-                        all_stats.append({
-                            'ticker': symbol,
-                            'price': last_close,
-                            'change_1d': change_1d,
-                            'change_5d': change_5d,
-                            'change_30d': change_30d,
-                            'volume': volume
-                        })
+                        row = row_stats(symbol, stock_df)
+                        if row is not None:
+                            all_stats.append(row)
                         
                     except Exception as e:
                         # Silently skip errors for individual tickers
@@ -88,44 +241,47 @@ class MarketDataFetcher:
         return all_stats
 
     def update_cache(self):
-        stats = self.fetch_top_performers()
+        # Universe refresh only uses capacity left over by interactive/bot fetches
+        with fetch_priority(BACKGROUND):
+            stats = self.fetch_top_performers()
         
         if not stats:
             print("No data fetched.")
             return
 
-        # Sort by 1D change
-        sorted_by_day = sorted(stats, key=lambda x: x['change_1d'], reverse=True)
-        
-        # Sort by 30D change
-        sorted_by_month = sorted(stats, key=lambda x: x['change_30d'], reverse=True)
-
-        # Sort by Volume (Trending)
-        sorted_by_volume = sorted(stats, key=lambda x: x['volume'], reverse=True)
+        snapshot = Snapshot.from_rows(stats)
         
-        # Create cache structure
-        cache_data = {
-            "last_updated": datetime.now().isoformat(),
-            "top_gainers_1d": sorted_by_day[:20],  # Store top 20
-            "top_gainers_30d": sorted_by_month[:20], 
-            "top_active_volume": sorted_by_volume[:20],
-            "all_stats": stats # Optional: store minimal stats for all if needed, but might be large.
-                               # For now, let's keep the user's specific request 'dynamic list'
-        }
-        
-        # Save to JSON
-        with open(self.cache_path, "w") as f:
-            json.dump(cache_data, f, indent=2)
+        # Binary snapshot for readers, compact JSON export (top 20 lists + all_stats) for compatibility;
+        # both temp file + rename, the dashboard may be reading them
+        write_snapshot(snapshot, self.snapshot_path)
+        write_json_export(snapshot, self.cache_path)
             
-        print(f"Cache updated at {cache_data['last_updated']}")
-        print(f"Top Gainer: {sorted_by_day[0]['ticker']} (+{sorted_by_day[0]['change_1d']:.2f}%)")
+        top_by_day = snapshot.top('change_1d', 1)
+        print(f"Cache updated at {snapshot.last_updated} (generation {snapshot.generation})")
+        print(f"Top Gainer: {top_by_day[0]['ticker']} (+{top_by_day[0]['change_1d']:.2f}%)")
 
 if __name__ == "__main__":
-    fetcher = MarketDataFetcher()
+    import argparse
+    parser = argparse.ArgumentParser(description='Background market snapshot job')
+    parser.add_argument('--engine', choices=['batch', 'async'], default=FETCH_ENGINE)
+    parser.add_argument('--base-url', default=None, help='Chart API root for the async engine (e.g. stub_server.py)')
+    parser.add_argument('--concurrency', type=int, default=None, help='Async engine HTTP requests in flight')
+    parser.add_argument('--once', action='store_true', help='Run one update cycle and exit')
+    args = parser.parse_args()
+
+    chart_fetcher = None
+    if args.engine == 'async':
+        from async_fetcher import AsyncChartFetcher
+        # A local stub is not rate limited
+        chart_fetcher = AsyncChartFetcher(base_url=args.base_url, concurrency=args.concurrency,
+                                          throttle=args.base_url is None)
+    fetcher = MarketDataFetcher(engine=args.engine, fetcher=chart_fetcher)
     # Continuous loop mode
     print("Starting Background Market Data Job...")
     while True:
         print("\n--- Starting Update Cycle ---")
         fetcher.update_cache()
+        if args.once:
+            break
         print("Sleeping for 10 minutes...")
         time.sleep(600)  # Sleep 10 minutes
@@ -0,0 +1,138 @@
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from data_provider import DataProvider
+
+# Priority classes, lower runs first
+INTERACTIVE = 0   # Deep Analyzer clicks, page renders
+TRADING = 1       # background bot scan / exits
+BACKGROUND = 2    # universe refresh, multibagger bulk scans
+
+_local = threading.local()
+
+
+def current_priority():
+    return getattr(_local, 'priority', INTERACTIVE)
+
+
+def set_fetch_priority(priority):
+    """Sets the priority class for every fetch made by the calling thread."""
+    _local.priority = priority
+
+
+@contextmanager
+def fetch_priority(priority):
+    """Temporarily runs the calling thread's fetches at ``priority``."""
+    previous = current_priority()
+    _local.priority = priority
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+class FetchScheduler:
+    """Global token bucket that hands out upstream request slots by priority.
+
+    Tokens refill at ``rate`` per second up to ``burst``. Waiters queue in
+    (priority, arrival) order and only the head of the queue may take a
+    token, so interactive fetches overtake queued bulk work. A request may
+    cost more than one token (a batch download of N tickers costs N).
+    Interactive requests go as soon as one token is there; any other
+    request waits until its whole cost is in the bucket (taken in
+    installments of at most ``burst``), so bulk work never leaves a debt
+    that the next interactive fetch would have to wait off.
+
+    ``priority`` may also be a callable; it is re-read while the request
+    waits, so a queued request can be promoted (see ``wake``).
+    """
+
+    def __init__(self, rate=20.0, burst=50):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self.stats = {'granted': [0, 0, 0], 'waited_s': [0.0, 0.0, 0.0]}
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def _head(self):
+        return min(self._queue, key=lambda entry: (entry[1](), entry[0]))
+
+    def wake(self):
+        """Makes waiters re-read their priorities after one was promoted."""
+        with self._cond:
+            self._cond.notify_all()
+
+    def acquire(self, priority=None, cost=1):
+        priority = current_priority() if priority is None else priority
+        level = priority if callable(priority) else (lambda: priority)
+        entry = (next(self._seq), level)
+        started = time.monotonic()
+        remaining = cost
+        with self._cond:
+            self._queue.append(entry)
+            while True:
+                self._refill()
+                if self._head() is entry:
+                    priority = level()
+                    need = 1 if priority == INTERACTIVE else min(remaining, self.burst)
+                    if self._tokens >= need:
+                        if priority == INTERACTIVE or remaining <= self.burst:
+                            self._queue.remove(entry)
+                            self._tokens -= remaining
+                            self.stats['granted'][priority] += 1
+                            self.stats['waited_s'][priority] += time.monotonic() - started
+                            self._cond.notify_all()
+                            return
+                        # Installment of a batch larger than the bucket; stays queued for the rest
+                        self._tokens -= need
+                        remaining -= need
+                        continue
+                    self._cond.wait((need - self._tokens) / self.rate)
+                else:
+                    self._cond.wait()
+
+
+class ThrottledProvider(DataProvider):
+    """Routes every upstream call through a FetchScheduler.
+
+    Every call spends a slot; get_provider() instead throttles inside
+    data_provider.CoalescingProvider so coalesced callers are free.
+    """
+
+    def __init__(self, inner, scheduler):
+        self.inner = inner
+        self.scheduler = scheduler
+
+    def history(self, ticker, start=None, end=None, interval='1d', period=None, auto_adjust=True):
+        self.scheduler.acquire()
+        return self.inner.history(ticker, start, end, interval, period, auto_adjust)
+
+    def history_many(self, tickers, start=None, end=None, interval='1d', period=None, auto_adjust=True):
+        tickers = list(tickers)
+        self.scheduler.acquire(cost=max(1, len(tickers)))
+        return self.inner.history_many(tickers, start, end, interval, period, auto_adjust)
+
+    def info(self, ticker):
+        self.scheduler.acquire()
+        return self.inner.info(ticker)
+
+    def news(self, ticker):
+        self.scheduler.acquire()
+        return self.inner.news(ticker)
+
+
+SCHEDULER = FetchScheduler(
+    rate=float(os.environ.get('STOCKPRO_FETCH_RATE', 20.0)),
+    burst=float(os.environ.get('STOCKPRO_FETCH_BURST', 50)),
+)
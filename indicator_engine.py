@@ -0,0 +1,169 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class Panel:
+    """A universe of OHLCV series as 2-D arrays (rows = bars, columns = tickers).
+
+    ``align='time'`` puts every ticker on the union of their timestamps.
+    ``align='last'`` right-aligns each ticker on its own bars instead, so
+    row -1 is every ticker's latest bar and a missing day for one stock
+    does not punch a hole into its rolling windows; that reproduces the
+    per-DataFrame results exactly and is what the screeners use.
+    Missing cells are NaN either way. ``rows`` keeps only the last N bars
+    of each ticker, enough when only the latest indicator values matter.
+    """
+
+    def __init__(self, tickers, fields, index=None):
+        self.tickers = list(tickers)
+        self.fields = fields
+        self.index = index
+
+    def __getitem__(self, field):
+        return self.fields[field]
+
+    def __len__(self):
+        return len(self.tickers)
+
+    @classmethod
+    def from_frames(cls, frames, tickers=None, fields=('Open', 'High', 'Low', 'Close', 'Volume'),
+                    align='last', rows=None):
+        tickers = [t for t in (tickers or frames) if t in frames and not frames[t].empty]
+        if rows:
+            frames = {t: frames[t].iloc[-rows:] for t in tickers}
+        if align == 'time':
+            index = pd.DatetimeIndex([])
+            for t in tickers:
+                index = index.union(frames[t].index)
+            arrays = {f: pd.DataFrame({t: frames[t][f] for t in tickers}, index=index).to_numpy(dtype='float64')
+                      for f in fields}
+            return cls(tickers, arrays, index)
+
+        length = max((len(frames[t]) for t in tickers), default=0)
+        arrays = {f: np.full((length, len(tickers)), np.nan) for f in fields}
+        for j, t in enumerate(tickers):
+            n = len(frames[t])
+            for f in fields:
+                arrays[f][length - n:, j] = frames[t][f].to_numpy(dtype='float64')
+        return cls(tickers, arrays)
+
+
+def shift(x, n=1):
+    """Rows moved down by ``n`` (NaN filled), like DataFrame.shift along time."""
+    out = np.full_like(x, np.nan)
+    if n < len(x):
+        out[n:] = x[:len(x) - n]
+    return out
+
+
+def _windows(x, window):
+    """(rows, columns, window) view of the trailing ``window`` values at every row, NaN padded."""
+    padded = np.concatenate([np.full((window - 1,) + x.shape[1:], np.nan), x])
+    return sliding_window_view(padded, window, axis=0)
+
+
+def _window_totals(values, window):
+    """Trailing ``window`` sums of each column, via a running cumsum (O(rows) per column)."""
+    zero_row = np.zeros((1,) + values.shape[1:])
+    totals = np.concatenate([zero_row, np.cumsum(values, axis=0)])
+    lag = np.maximum(np.arange(1, len(values) + 1) - window, 0)
+    return totals[1:] - totals[lag]
+
+
+def sma(x, window, min_periods=None):
+    """Rolling mean along time; NaN until ``min_periods`` valid values (default: full window).
+
+    Windows holding only zeros come out exactly 0 like pandas rather than
+    as a cumsum residue (the RSI of a flat stretch depends on that).
+    """
+    min_periods = window if min_periods is None else min_periods
+    valid = ~np.isnan(x)
+    counts = _window_totals(valid.astype('float64'), window)
+    sums = _window_totals(np.where(valid, x, 0.0), window)
+    sums[_window_totals((valid & (x != 0)).astype('float64'), window) == 0] = 0.0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = sums / counts
+    out[counts < min_periods] = np.nan
+    return out
+
+
+def rolling_std(x, window, min_periods=None, ddof=1):
+    """Rolling sample standard deviation along time."""
+    min_periods = window if min_periods is None else min_periods
+    windows = _windows(x, window)
+    counts = np.sum(~np.isnan(windows), axis=-1)
+    with warnings.catch_warnings():
+        # All-NaN warmup windows are masked below anyway
+        warnings.simplefilter('ignore', RuntimeWarning)
+        out = np.nanstd(windows, axis=-1, ddof=ddof)
+    out[counts < max(min_periods, ddof + 1)] = np.nan
+    return out
+
+
+def rolling_max(x, window):
+    """Highest value of the trailing ``window`` bars (NaN until the window is full)."""
+    with np.errstate(invalid='ignore'):
+        return _windows(x, window).max(axis=-1)
+
+
+def rolling_min(x, window):
+    """Lowest value of the trailing ``window`` bars (NaN until the window is full)."""
+    with np.errstate(invalid='ignore'):
+        return _windows(x, window).min(axis=-1)
+
+
+def ema(x, span):
+    """Exponential mean with ``adjust=False`` (pandas ewm(span).mean()), seeded at each column's first value."""
+    alpha = 2.0 / (span + 1.0)
+    out = np.full_like(x, np.nan)
+    prev = np.full(x.shape[1:], np.nan)
+    for i in range(len(x)):
+        row = x[i]
+        blended = alpha * row + (1 - alpha) * prev
+        prev = np.where(np.isnan(prev), row, np.where(np.isnan(row), prev, blended))
+        out[i] = prev
+    return out
+
+
+def gains_losses(x):
+    """Per-bar gains and losses (both >= 0) as the RSI definitions use them.
+
+    The first bar of each series contributes 0 (not NaN), exactly like
+    ``Series.diff().where(...)``; rows before a series starts stay NaN.
+    """
+    delta = x - shift(x)
+    with np.errstate(invalid='ignore'):
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+    missing = np.isnan(x)
+    gain[missing] = np.nan
+    loss[missing] = np.nan
+    return gain, loss
+
+
+def rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def rsi(x, period=14):
+    """RSI from rolling-mean gains/losses, same definition as StockScreener.calculate_rsi."""
+    gain, loss = gains_losses(x)
+    return rsi_from_averages(sma(gain, period), sma(loss, period))
+
+
+def macd(x, fast=12, slow=26, signal=9):
+    """Returns (macd, signal_line, histogram)."""
+    line = ema(x, fast) - ema(x, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(x, window=20, num_std=2, min_periods=None):
+    """Returns (middle, upper, lower) bands."""
+    middle = sma(x, window, min_periods)
+    std = rolling_std(x, window, min_periods)
+    return middle, middle + num_std * std, middle - num_std * std
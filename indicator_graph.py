@@ -0,0 +1,93 @@
+import re
+
+import numpy as np
+
+import indicator_engine as ie
+
+# Fixed nodes: name -> (dependencies, function of the dependency values)
+NODES = {
+    'DIFF': (['Close'], lambda close: close - ie.shift(close)),
+    'GAIN': (['Close'], lambda close: ie.gains_losses(close)[0]),
+    'LOSS': (['Close'], lambda close: ie.gains_losses(close)[1]),
+    'MACD': (['EMA12', 'EMA26'], lambda fast, slow: fast - slow),
+    'Signal_Line': (['MACD'], lambda macd: ie.ema(macd, 9)),
+    'MACD_Hist': (['MACD', 'Signal_Line'], lambda macd, signal: macd - signal),
+    'Upper_Band': (['MA20', 'STD20'], lambda mid, std: mid + std * 2),
+    'Lower_Band': (['MA20', 'STD20'], lambda mid, std: mid - std * 2),
+    'RSI': (['RSI14'], lambda rsi: rsi),
+}
+
+# Parametric nodes: regex on the name -> builder(period) returning (dependencies, function)
+PATTERNS = [
+    (r'SMA(\d+)', lambda n: (['Close'], lambda close: ie.sma(close, n))),
+    # Adaptive window (min_periods=1) as the analyzer's Bollinger middle band uses it
+    (r'MA(\d+)', lambda n: (['Close'], lambda close: ie.sma(close, n, min_periods=1))),
+    (r'STD(\d+)', lambda n: (['Close'], lambda close: ie.rolling_std(close, n, min_periods=1))),
+    (r'EMA(\d+)', lambda n: (['Close'], lambda close: ie.ema(close, n))),
+    (r'VOL_SMA(\d+)', lambda n: (['Volume'], lambda volume: ie.sma(volume, n))),
+    (r'AVG_GAIN(\d+)', lambda n: (['GAIN'], lambda gain: ie.sma(gain, n))),
+    (r'AVG_LOSS(\d+)', lambda n: (['LOSS'], lambda loss: ie.sma(loss, n))),
+    (r'RSI(\d+)', lambda n: ([f'AVG_GAIN{n}', f'AVG_LOSS{n}'], ie.rsi_from_averages)),
+]
+
+
+def resolve(name):
+    """(dependencies, function) for an indicator name; KeyError if unknown."""
+    if name in NODES:
+        return NODES[name]
+    for pattern, build in PATTERNS:
+        match = re.fullmatch(pattern, name)
+        if match:
+            return build(int(match.group(1)))
+    raise KeyError(f"Unknown indicator {name!r}")
+
+
+class IndicatorGraph:
+    """Lazily evaluated indicator DAG over one series or a whole universe panel.
+
+    ``inputs`` maps 'Close'/'Volume' (and any other raw field) to a 1-D
+    array or a (bars x tickers) panel; all node functions work along the
+    time axis so both shapes share one definition. Asking for a node
+    computes its dependencies first and every node at most once, so e.g.
+    MACD_Hist and Signal_Line share EMA12/EMA26/MACD, and RSI14 shares
+    GAIN/LOSS with any other RSI period. ``cached`` values (for example a
+    materialized IndicatorStore block) are used as-is.
+    """
+
+    def __init__(self, inputs, cached=None):
+        self.inputs = inputs
+        self._values = dict(cached or {})
+        self.computed = []
+
+    def get(self, name):
+        if name in self._values:
+            return self._values[name]
+        if name in self.inputs:
+            value = np.asarray(self.inputs[name], dtype='float64')
+        else:
+            deps, fn = resolve(name)
+            value = fn(*[self.get(dep) for dep in deps])
+            self.computed.append(name)
+        self._values[name] = value
+        return value
+
+    __getitem__ = get
+
+    def get_many(self, names):
+        return {name: self.get(name) for name in names}
+
+    def plan(self, names):
+        """Nodes that ``get_many(names)`` would compute, dependencies first."""
+        order, seen = [], set(self._values) | set(self.inputs)
+
+        def visit(name):
+            if name in seen:
+                return
+            seen.add(name)
+            for dep in resolve(name)[0]:
+                visit(dep)
+            order.append(name)
+
+        for name in names:
+            visit(name)
+        return order
@@ -0,0 +1,202 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from bar_store import BAR_STORE, _index_to_epoch
+
+# Parameters of the materialized indicator set; part of the cache key
+INDICATOR_PARAMS = {
+    'bb_window': 20, 'bb_std': 2,
+    'macd': [12, 26, 9],
+    'ema': [20, 50, 200],
+    'rsi': 14,
+}
+
+# Indicator blocks kept per (ticker, interval, params) for different series starts
+MAX_VARIANTS = 4
+
+
+def params_key(params):
+    return hashlib.md5(json.dumps(params, sort_keys=True).encode()).hexdigest()[:10]
+
+
+def indicator_columns(params):
+    """Column order of a materialized block. ``_``-prefixed columns are EWM seeds only."""
+    return (['MA20', 'STD20', 'Upper_Band', 'Lower_Band', 'MACD', 'Signal_Line', 'MACD_Hist']
+            + [f"EMA{span}" for span in params['ema']]
+            + ['RSI', '_MACD_FAST', '_MACD_SLOW'])
+
+
+def _ewm(values, span, seed=None):
+    """adjust=False EWM continued from ``seed`` (the previous output), or started fresh."""
+    if seed is None:
+        return pd.Series(values).ewm(span=span, adjust=False).mean().to_numpy()
+    seeded = pd.Series(np.concatenate([[seed], values]))
+    return seeded.ewm(span=span, adjust=False).mean().to_numpy()[1:]
+
+
+def compute_tail(close, start=0, seed=None, params=INDICATOR_PARAMS):
+    """Indicator values for rows ``close[start:]``.
+
+    Rolling columns are computed over just enough warmup rows before
+    ``start``; EWM columns continue from ``seed``, the cached row at
+    ``start - 1``. With start=0 this is a full computation identical to
+    the original StockAnalyzer.calculate_indicators.
+    """
+    close = np.asarray(close, dtype='float64')
+    n = len(close) - start
+    out = {}
+
+    window = params['bb_window']
+    warm = pd.Series(close[max(0, start - window + 1):])
+    out['MA20'] = warm.rolling(window=window, min_periods=1).mean().to_numpy()[-n:]
+    out['STD20'] = warm.rolling(window=window, min_periods=1).std().to_numpy()[-n:]
+    out['Upper_Band'] = out['MA20'] + (out['STD20'] * params['bb_std'])
+    out['Lower_Band'] = out['MA20'] - (out['STD20'] * params['bb_std'])
+
+    tail = close[start:]
+    fast, slow, signal = params['macd']
+    seed = seed or {}
+    out['_MACD_FAST'] = _ewm(tail, fast, seed.get('_MACD_FAST'))
+    out['_MACD_SLOW'] = _ewm(tail, slow, seed.get('_MACD_SLOW'))
+    out['MACD'] = out['_MACD_FAST'] - out['_MACD_SLOW']
+    out['Signal_Line'] = _ewm(out['MACD'], signal, seed.get('Signal_Line'))
+    out['MACD_Hist'] = out['MACD'] - out['Signal_Line']
+
+    for span in params['ema']:
+        out[f"EMA{span}"] = _ewm(tail, span, seed.get(f"EMA{span}"))
+
+    # Same definition as StockScreener.calculate_rsi
+    period = params['rsi']
+    warm = pd.Series(close[max(0, start - period):])
+    delta = warm.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    out['RSI'] = (100 - (100 / (1 + gain / loss))).to_numpy()[-n:]
+    return out
+
+
+class IndicatorStore:
+    """Materialized indicator columns stored next to the bars in the BarStore.
+
+    A block is keyed by (ticker, interval, parameter hash, first bar) and
+    holds ``[epoch_seconds, Close, *indicator_columns]`` plus a sidecar with
+    the last bar it covers. On a request the cached rows whose timestamp and
+    close still match the frame are reused (a revised last bar simply falls
+    out of that prefix) and only the remaining tail is computed.
+    """
+
+    def __init__(self, bar_store=BAR_STORE, max_variants=MAX_VARIANTS):
+        self.bar_store = bar_store
+        self.max_variants = max_variants
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self.stats = {'hits': 0, 'extended': 0, 'computed': 0}
+
+    def _paths(self, ticker, interval, key, first_ts):
+        folder = os.path.join(self.bar_store.root, interval)
+        stem = os.path.join(folder, f"{ticker}.ind-{key}-{int(first_ts)}")
+        return stem + ".npy", stem + ".json"
+
+    def _lock(self, path):
+        with self._locks_guard:
+            if path not in self._locks:
+                self._locks[path] = threading.Lock()
+            return self._locks[path]
+
+    def _load(self, npy_path, meta_path):
+        if not (os.path.exists(npy_path) and os.path.exists(meta_path)):
+            return None, None
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            return np.load(npy_path), meta
+        except Exception:
+            return None, None
+
+    def _write(self, npy_path, meta_path, block, meta):
+        os.makedirs(os.path.dirname(npy_path), exist_ok=True)
+        tmp_path = npy_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.asfortranarray(block))
+        os.replace(tmp_path, npy_path)
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def _prune(self, ticker, interval, key):
+        folder = os.path.join(self.bar_store.root, interval)
+        blocks = sorted(glob.glob(os.path.join(folder, f"{glob.escape(ticker)}.ind-{key}-*.npy")),
+                        key=os.path.getmtime, reverse=True)
+        for npy_path in blocks[self.max_variants:]:
+            for path in (npy_path, npy_path[:-4] + ".json"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _reusable_rows(block, meta, columns, epochs, close):
+        """Length of the stored prefix whose bars still match the frame."""
+        if block is None or meta.get('columns') != columns:
+            return 0
+        k = min(len(epochs), len(block))
+        same = (block[:k, 0] == epochs[:k]) & (block[:k, 1] == close[:k])
+        return k if same.all() else int(np.argmin(same))
+
+    def peek(self, ticker, interval, df, params=INDICATOR_PARAMS):
+        """Stored indicator columns for ``df`` if they are fully current, else None (never computes)."""
+        if df is None or df.empty:
+            return None
+        columns = indicator_columns(params)
+        epochs = _index_to_epoch(df.index)
+        close = df['Close'].to_numpy(dtype='float64')
+        npy_path, meta_path = self._paths(ticker, interval, params_key(params), epochs[0])
+        block, meta = self._load(npy_path, meta_path)
+        if self._reusable_rows(block, meta, columns, epochs, close) != len(df):
+            return None
+        self.stats['hits'] += 1
+        return pd.DataFrame(block[:len(df), 2:], index=df.index, columns=columns)
+
+    def get(self, ticker, interval, df, params=INDICATOR_PARAMS):
+        """Indicator columns for ``df`` (indexed like it), computing only what isn't stored yet."""
+        columns = indicator_columns(params)
+        if df is None or df.empty:
+            return pd.DataFrame(columns=columns)
+
+        epochs = _index_to_epoch(df.index)
+        close = df['Close'].to_numpy(dtype='float64')
+        key = params_key(params)
+        npy_path, meta_path = self._paths(ticker, interval, key, epochs[0])
+
+        with self._lock(npy_path):
+            block, meta = self._load(npy_path, meta_path)
+            keep = self._reusable_rows(block, meta, columns, epochs, close)
+
+            if block is not None and keep == len(df):
+                self.stats['hits'] += 1
+                values = block[:keep, 2:]
+            else:
+                seed = dict(zip(columns, block[keep - 1, 2:])) if keep else None
+                tail = compute_tail(close, keep, seed, params)
+                new = np.column_stack([epochs[keep:], close[keep:]] + [tail[c] for c in columns])
+                block = np.vstack([block[:keep], new]) if keep else new
+                self.stats['extended' if keep else 'computed'] += 1
+                self._write(npy_path, meta_path, block, {
+                    'params': params, 'columns': columns, 'rows': len(block),
+                    'last_ts': float(block[-1, 0]), 'last_close': float(block[-1, 1]),
+                })
+                values = block[:, 2:]
+
+        if not keep:
+            self._prune(ticker, interval, key)
+        return pd.DataFrame(values, index=df.index, columns=columns)
+
+
+INDICATOR_STORE = IndicatorStore()
@@ -0,0 +1,84 @@
+import json
+import os
+import threading
+import time
+
+# Seconds before a cached payload is refetched
+TTL = {
+    'info': 24 * 3600,   # fundamentals barely move intraday
+    'news': 15 * 60,
+}
+
+
+class InfoCache:
+    """Per-ticker cache for fundamentals and news, kept in memory and on disk.
+
+    Entries live in ``<root>/<kind>/<ticker>.json`` so every dashboard
+    session, the bot and later restarts share them. ``stats`` counts memory
+    hits, disk hits and misses per kind.
+    """
+
+    def __init__(self, root='info_cache', ttl=None):
+        base_path = os.path.dirname(os.path.abspath(__file__))
+        self.root = os.path.join(base_path, root)
+        self.ttl = dict(TTL, **(ttl or {}))
+        self._memory = {}
+        self._lock = threading.Lock()
+        self.stats = {kind: {'hits': 0, 'disk_hits': 0, 'misses': 0} for kind in self.ttl}
+
+    def _path(self, kind, ticker):
+        return os.path.join(self.root, kind, f"{ticker}.json")
+
+    def _fresh(self, kind, entry):
+        return entry is not None and time.time() - entry['fetched_at'] < self.ttl[kind]
+
+    def _read_disk(self, kind, ticker):
+        path = self._path(kind, ticker)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def _write_disk(self, kind, ticker, entry):
+        path = self._path(kind, ticker)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(entry, f, default=str)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Info cache write failed for {ticker}: {e}")
+
+    def get(self, kind, ticker, fetch):
+        """Returns the cached ``kind`` payload for ticker, calling ``fetch()`` when stale."""
+        key = (kind, ticker)
+        with self._lock:
+            entry = self._memory.get(key)
+            if self._fresh(kind, entry):
+                self.stats[kind]['hits'] += 1
+                return entry['payload']
+
+        entry = self._read_disk(kind, ticker)
+        if self._fresh(kind, entry):
+            with self._lock:
+                self._memory[key] = entry
+                self.stats[kind]['disk_hits'] += 1
+            return entry['payload']
+
+        with self._lock:
+            self.stats[kind]['misses'] += 1
+        payload = fetch()
+        # Empty answers are usually transient upstream failures, don't pin them for a day
+        if payload:
+            entry = {'fetched_at': time.time(), 'payload': payload}
+            with self._lock:
+                self._memory[key] = entry
+            self._write_disk(kind, ticker, entry)
+        return payload
+
+
+INFO_CACHE = InfoCache()
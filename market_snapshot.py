@@ -0,0 +1,192 @@
+import json
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Binary snapshot next to the JSON export (market_cache.json)
+SNAPSHOT_PATH = 'market_snapshot.bin'
+
+MAGIC = b'STKSNAP\x00'
+FORMAT_VERSION = 1
+
+# magic, format version, reserved, generation, created (epoch s), rows, meta length
+HEADER = struct.Struct('<8sHHQdII')
+
+# Column name -> dtype, in file order
+FIELDS = (('price', '<f8'), ('change_1d', '<f8'), ('change_5d', '<f8'), ('change_30d', '<f8'), ('volume', '<i8'))
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _resolve(path):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+
+
+class Snapshot:
+    """Universe stats held as columns: ``tickers`` plus one array per field.
+
+    ``generation`` identifies the write that produced it (the header
+    field), so a reader can tell a new snapshot from one already parsed.
+    """
+
+    def __init__(self, tickers, columns, last_updated, generation=0):
+        self.tickers = list(tickers)
+        self.columns = columns
+        self.last_updated = last_updated
+        self.generation = generation
+        self._ranking = None
+
+    def __len__(self):
+        return len(self.tickers)
+
+    @classmethod
+    def from_rows(cls, rows, last_updated=None, generation=0):
+        rows = list(rows)
+        columns = {name: np.array([row.get(name, 0) for row in rows], dtype=dtype) for name, dtype in FIELDS}
+        return cls([row['ticker'] for row in rows], columns, last_updated or datetime.now().isoformat(), generation)
+
+    def rows(self):
+        """Stats as the ``all_stats`` list of dicts."""
+        lists = {name: self.columns[name].tolist() for name, _ in FIELDS}
+        return [dict(ticker=t, **{name: lists[name][i] for name, _ in FIELDS}) for i, t in enumerate(self.tickers)]
+
+    def by_ticker(self):
+        return {row['ticker']: row for row in self.rows()}
+
+    def ranking(self):
+        """StatsRanking over the rows (built once per snapshot)."""
+        if self._ranking is None:
+            from fetch_market_data import StatsRanking
+            self._ranking = StatsRanking(self.rows())
+        return self._ranking
+
+    def top(self, field, n):
+        return self.ranking().top(field, n)
+
+
+def write_snapshot(snapshot, path=SNAPSHOT_PATH):
+    """Writes ``snapshot`` atomically (temp file + rename) with a fresh generation; returns it."""
+    path = _resolve(path)
+    generation = time.time_ns()
+    meta = json.dumps({
+        'last_updated': snapshot.last_updated,
+        'fields': [list(f) for f in FIELDS],
+        'tickers': "\n".join(snapshot.tickers),
+    }, separators=(',', ':')).encode('utf-8')
+    # Columns start 8-byte aligned so they can be viewed in place
+    padding = -(HEADER.size + len(meta)) % 8
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, generation, time.time(), len(snapshot), len(meta)))
+        f.write(meta)
+        f.write(b'\x00' * padding)
+        for name, dtype in FIELDS:
+            f.write(np.ascontiguousarray(snapshot.columns[name], dtype=dtype).tobytes())
+    os.replace(tmp_path, path)
+    snapshot.generation = generation
+    return generation
+
+
+def read_header(path=SNAPSHOT_PATH):
+    """(format version, generation, created, rows) from the first bytes of a snapshot file."""
+    with open(_resolve(path), "rb") as f:
+        raw = f.read(HEADER.size)
+    if len(raw) < HEADER.size:
+        raise SnapshotError("Truncated snapshot header")
+    magic, version, _, generation, created, rows, _ = HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise SnapshotError("Not a market snapshot")
+    return version, generation, created, rows
+
+
+def read_snapshot(path=SNAPSHOT_PATH):
+    with open(_resolve(path), "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise SnapshotError("Truncated snapshot header")
+    magic, version, _, generation, _, rows, meta_len = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SnapshotError("Not a market snapshot")
+    if version > FORMAT_VERSION:
+        raise SnapshotError(f"Snapshot format {version} is newer than supported ({FORMAT_VERSION})")
+    meta = json.loads(data[HEADER.size:HEADER.size + meta_len].decode('utf-8'))
+    offset = HEADER.size + meta_len
+    offset += -offset % 8
+    columns = {}
+    for name, dtype in meta['fields']:
+        size = rows * np.dtype(dtype).itemsize
+        if offset + size > len(data):
+            raise SnapshotError("Truncated snapshot columns")
+        columns[name] = np.frombuffer(data, dtype=dtype, count=rows, offset=offset)
+        offset += size
+    tickers = meta['tickers'].split("\n") if rows else []
+    return Snapshot(tickers, columns, meta['last_updated'], generation)
+
+
+def write_json_export(snapshot, cache_path, top_n=20):
+    """Compact market_cache.json (same keys as before) for older readers, written atomically."""
+    cache_data = {
+        "last_updated": snapshot.last_updated,
+        "top_gainers_1d": snapshot.top('change_1d', top_n),
+        "top_gainers_30d": snapshot.top('change_30d', top_n),
+        "top_active_volume": snapshot.top('volume', top_n),
+        "all_stats": snapshot.rows(),
+    }
+    path = _resolve(cache_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache_data, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def load_snapshot(path=SNAPSHOT_PATH, json_path='market_cache.json'):
+    """Latest snapshot, parsed at most once per generation; None if there is none.
+
+    Only the header is read when the generation is unchanged. Without a
+    binary snapshot the JSON export is read instead, re-parsed only when
+    its modification time changes.
+    """
+    try:
+        _, generation, _, _ = read_header(path)
+        key, reader = ('bin', _resolve(path)), read_snapshot
+        version = generation
+    except FileNotFoundError:
+        json_full = _resolve(json_path)
+        try:
+            version = os.stat(json_full).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        key, reader = ('json', json_full), _read_json_snapshot
+    except (OSError, SnapshotError) as e:
+        print(f"Could not read market snapshot header: {e}")
+        return None
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    try:
+        snapshot = reader(key[1])
+    except Exception as e:
+        print(f"Could not read market snapshot: {e}")
+        return None
+    with _cache_lock:
+        # A newer file may have replaced the one whose header was read
+        _cache[key] = (snapshot.generation if key[0] == 'bin' else version, snapshot)
+    return snapshot
+
+
+def _read_json_snapshot(path):
+    with open(path, "r") as f:
+        cache_data = json.load(f)
+    return Snapshot.from_rows(cache_data.get('all_stats', []), cache_data['last_updated'])
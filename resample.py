@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+MARKET_TZ = 'Asia/Kolkata'
+
+# NSE cash session in minutes after midnight IST (09:15 - 15:30)
+SESSION_OPEN = 9 * 60 + 15
+SESSION_CLOSE = 15 * 60 + 30
+
+INTRADAY_MINUTES = {'1m': 1, '2m': 2, '5m': 5, '15m': 15, '30m': 30, '60m': 60, '90m': 90, '1h': 60}
+
+AGG = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+
+def can_resample(source, target):
+    """True if ``target`` bars can be built exactly from ``source`` bars."""
+    if source == target:
+        return True
+    if source in INTRADAY_MINUTES:
+        if target in INTRADAY_MINUTES:
+            return INTRADAY_MINUTES[target] % INTRADAY_MINUTES[source] == 0
+        return target in ('1d', '1wk', '1mo')
+    if source == '1d':
+        return target in ('1wk', '1mo')
+    return False
+
+
+def _aggregate(df, labels, name):
+    out = df.groupby(labels, sort=True).agg(AGG)
+    out.index.name = name
+    return out.dropna(subset=['Close'])
+
+
+def resample_ohlcv(df, interval):
+    """Builds coarser OHLCV bars from finer ones.
+
+    Intraday bins are anchored at the 09:15 IST open (so hourly bars are
+    09:15, 10:15 ... 15:15 like Yahoo's NSE bars) and never straddle the
+    session close or a day boundary; bars outside 09:15-15:30 are dropped.
+    Daily bars are labelled with the naive session date, weekly bars with
+    the Monday of the week, monthly bars with the first of the month, which
+    matches yfinance's own index for those intervals.
+    """
+    if df is None or df.empty:
+        return df
+    df = df[list(AGG)]
+    index = pd.DatetimeIndex(df.index)
+    intraday_source = index.tz is not None
+
+    if interval in INTRADAY_MINUTES:
+        local = index.tz_convert(MARKET_TZ) if intraday_source else index.tz_localize(MARKET_TZ)
+        minute = (local.hour * 60 + local.minute).to_numpy() - SESSION_OPEN
+        in_session = (minute >= 0) & (minute < SESSION_CLOSE - SESSION_OPEN)
+        width = INTRADAY_MINUTES[interval]
+        offsets = pd.to_timedelta((minute // width) * width + SESSION_OPEN, unit='m')
+        labels = local.normalize() + offsets
+        return _aggregate(df[in_session], labels[in_session], 'Datetime')
+
+    days = index.tz_convert(MARKET_TZ).tz_localize(None).normalize() if intraday_source else index.normalize()
+    if interval == '1d':
+        labels = days
+    elif interval == '1wk':
+        labels = days - pd.to_timedelta(days.weekday, unit='D')
+    elif interval == '1mo':
+        labels = days - pd.to_timedelta(days.day - 1, unit='D')
+    else:
+        raise ValueError(f"Cannot resample to interval {interval!r}")
+    return _aggregate(df, np.asarray(labels), 'Date')
@@ -0,0 +1,120 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+# NSE session (IST); bars completed after the close belong to that day
+MARKET_TZ = 'Asia/Kolkata'
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=15)
+SESSION_CLOSE = pd.Timedelta(hours=15, minutes=30)
+
+# During the session scans use live prices, so results roll over with each bar of this size
+SCAN_CACHE_BAR_MINUTES = int(os.environ.get('STOCKPRO_SCAN_CACHE_BAR_MINUTES', 15))
+
+
+def universe_hash(tickers):
+    """Short digest of a ticker universe (order and duplicates don't matter)."""
+    return hashlib.md5("\n".join(sorted(set(tickers))).encode('utf-8')).hexdigest()[:12]
+
+
+def last_completed_bar(now=None, bar_minutes=SCAN_CACHE_BAR_MINUTES):
+    """Label of the newest completed bar: the session date once it has closed,
+    ``<date>T<HH:MM>`` (bar end) during the session.
+
+    Exchange holidays are not known here; on one the label still changes at
+    the usual times, which only costs a cache miss.
+    """
+    now = pd.Timestamp.now(tz=MARKET_TZ) if now is None else pd.Timestamp(now).tz_convert(MARKET_TZ)
+    day = now.normalize()
+    if day.weekday() < 5:
+        if now >= day + SESSION_CLOSE:
+            return day.date().isoformat()
+        elapsed = now - (day + SESSION_OPEN)
+        bar = pd.Timedelta(minutes=bar_minutes)
+        if elapsed >= bar:
+            bar_end = day + SESSION_OPEN + bar * (elapsed // bar)
+            return bar_end.strftime('%Y-%m-%dT%H:%M')
+    # Before the first bar or on a weekend: the previous weekday's close
+    day -= pd.Timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= pd.Timedelta(days=1)
+    return day.date().isoformat()
+
+
+class ScanCache:
+    """Finished scan results shared across sessions and processes.
+
+    Entries live in ``<root>/<strategy>-<universe hash>-<bar>.json``; the
+    bar is part of the key, so a new completed bar makes older entries
+    unreachable and they are removed on the next write. Results are
+    stored for the ``limit`` they were scanned with and serve any request
+    for that many or fewer.
+    """
+
+    def __init__(self, root='scan_cache'):
+        base_path = os.path.dirname(os.path.abspath(__file__))
+        self.root = os.path.join(base_path, root)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0}
+
+    def _prefix(self, strategy, tickers):
+        slug = hashlib.md5(strategy.encode('utf-8')).hexdigest()[:8]
+        return f"{slug}-{universe_hash(tickers)}"
+
+    def _path(self, strategy, tickers, bar):
+        return os.path.join(self.root, f"{self._prefix(strategy, tickers)}-{bar.replace(':', '')}.json")
+
+    def lock(self, strategy, tickers):
+        """In-process lock for one (strategy, universe), so concurrent identical scans run once."""
+        key = self._prefix(strategy, tickers)
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, strategy, tickers, limit, bar=None):
+        """Cached entry (dict with 'results', 'counts', 'bar', 'created') or None."""
+        path = self._path(strategy, tickers, bar or last_completed_bar())
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            entry = None
+        except Exception as e:
+            print(f"Scan cache read error: {e}")
+            entry = None
+        if entry is None or entry['limit'] < limit:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        entry['results'] = entry['results'][:limit]
+        return entry
+
+    def put(self, strategy, tickers, limit, results, counts=None, bar=None):
+        bar = bar or last_completed_bar()
+        path = self._path(strategy, tickers, bar)
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({'strategy': strategy, 'universe': universe_hash(tickers), 'bar': bar,
+                           'limit': limit, 'created': time.time(), 'results': results, 'counts': counts},
+                          f, default=float)
+            os.replace(tmp_path, path)
+            self.stats['stored'] += 1
+        except Exception as e:
+            print(f"Scan cache write error: {e}")
+            return
+        # Entries for older bars can't be hit any more
+        for old in glob.glob(os.path.join(self.root, f"{self._prefix(strategy, tickers)}-*.json")):
+            if old != path:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+
+SCAN_CACHE = ScanCache(os.environ.get('STOCKPRO_SCAN_CACHE', 'scan_cache'))
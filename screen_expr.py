@@ -0,0 +1,345 @@
+import re
+
+import numpy as np
+
+import indicator_engine as ie
+
+# Series fields of the universe panel; ``price`` is the live (latest session) price
+FIELDS = {'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume', 'vol': 'Volume'}
+SCALARS = ('price',)
+
+# Function name -> series it runs on when none is given, e.g. sma(50) vs sma(vol, 20)
+FUNCTIONS = {'sma': 'close', 'ema': 'close', 'rsi': 'close', 'std': 'close',
+             'max': 'close', 'min': 'close', 'change': 'close'}
+
+COMPARE = {'>': np.greater, '<': np.less, '>=': np.greater_equal, '<=': np.less_equal,
+           '==': np.equal, '!=': np.not_equal}
+ARITH = {'+': np.add, '-': np.subtract, '*': np.multiply, '/': np.divide}
+
+_TOKEN = re.compile(r"\s*(?:(\d+\.?\d*|\.\d+)|([A-Za-z_]\w*)|(>=|<=|==|!=|[-+*/()<>,]))")
+
+
+class ScreenSyntaxError(ValueError):
+    pass
+
+
+def tokenize(text, with_positions=False):
+    """[(kind, value)] tokens of ``text``; with ``with_positions`` also each token's offset."""
+    tokens, positions, pos = [], [], 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if not match:
+            pos += len(text[pos:]) - len(text[pos:].lstrip())
+            raise ScreenSyntaxError(f"Unexpected character {text[pos]!r} at position {pos}")
+        number, name, op = match.groups()
+        positions.append(match.start(match.lastindex))
+        if number is not None:
+            tokens.append(('num', float(number)))
+        elif name is not None:
+            tokens.append(('name', name.lower()))
+        else:
+            tokens.append(('op', op))
+        pos = match.end()
+    return (tokens, positions) if with_positions else tokens
+
+
+class _Parser:
+    """Recursive-descent parser producing nested tuples (hashable, so equal subtrees are equal keys).
+
+    Grammar::
+
+        expr       := and_expr ('or' and_expr)*
+        and_expr   := not_expr ('and' not_expr)*
+        not_expr   := 'not' not_expr | comparison
+        comparison := arith ('between' arith 'and' arith | (CMP arith)*)
+        arith      := term (('+' | '-') term)*
+        term       := unary (('*' | '/') unary)*
+        unary      := '-' unary | NUMBER | FIELD | FUNC '(' [FIELD ','] NUMBER ')' | '(' expr ')'
+
+    Chained comparisons mean what they do in Python: ``a > b > c`` is
+    ``a > b and b > c``.
+    """
+
+    def __init__(self, tokens, positions=None, length=0):
+        self.tokens = tokens
+        self.positions = positions
+        self.length = length
+        self.pos = 0
+
+    def error(self, message):
+        """ScreenSyntaxError pointing at the current token (or the end of the screen)."""
+        if self.positions is None:
+            return ScreenSyntaxError(message)
+        at = self.positions[self.pos] if self.pos < len(self.positions) else self.length
+        return ScreenSyntaxError(f"{message} at position {at}")
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, kind=None, value=None):
+        token = self.peek()
+        if token[0] is None or (kind and token[0] != kind) or (value is not None and token[1] != value):
+            expected = value or kind or 'more input'
+            found = 'end of screen' if token[0] is None else repr(token[1])
+            raise self.error(f"Expected {expected!r} but found {found}")
+        self.pos += 1
+        return token
+
+    def accept(self, kind, value):
+        if self.peek() == (kind, value):
+            self.pos += 1
+            return True
+        return False
+
+    def parse(self):
+        node = self.expr()
+        if self.peek()[0] is not None:
+            raise self.error(f"Unexpected {self.peek()[1]!r}")
+        return node
+
+    def expr(self):
+        node = self.and_expr()
+        while self.accept('name', 'or'):
+            node = ('or', node, self.and_expr())
+        return node
+
+    def and_expr(self):
+        node = self.not_expr()
+        while self.accept('name', 'and'):
+            node = ('and', node, self.not_expr())
+        return node
+
+    def not_expr(self):
+        if self.accept('name', 'not'):
+            return ('not', self.not_expr())
+        return self.comparison()
+
+    def comparison(self):
+        left = self.arith()
+        if self.accept('name', 'between'):
+            low = self.arith()
+            self.take('name', 'and')
+            high = self.arith()
+            return ('and', ('cmp', '>=', left, low), ('cmp', '<=', left, high))
+        node = None
+        while self.peek()[0] == 'op' and self.peek()[1] in COMPARE:
+            op = self.take()[1]
+            right = self.arith()
+            cmp = ('cmp', op, left, right)
+            node = cmp if node is None else ('and', node, cmp)
+            left = right
+        return left if node is None else node
+
+    def arith(self):
+        node = self.term()
+        while self.peek()[0] == 'op' and self.peek()[1] in '+-':
+            node = ('arith', self.take()[1], node, self.term())
+        return node
+
+    def term(self):
+        node = self.unary()
+        while self.peek()[0] == 'op' and self.peek()[1] in '*/':
+            node = ('arith', self.take()[1], node, self.unary())
+        return node
+
+    def unary(self):
+        kind, value = self.peek()
+        if self.accept('op', '-'):
+            return ('arith', '-', ('num', 0.0), self.unary())
+        if kind == 'num':
+            self.pos += 1
+            return ('num', value)
+        if self.accept('op', '('):
+            node = self.expr()
+            self.take('op', ')')
+            return node
+        if kind == 'name':
+            self.pos += 1
+            if value in FUNCTIONS:
+                return self.call(value)
+            if value in FIELDS:
+                return ('field', FIELDS[value])
+            if value in SCALARS:
+                return ('scalar', value)
+            self.pos -= 1
+            raise self.error(f"Unknown name {value!r}")
+        raise self.error("Unexpected end of screen" if kind is None else f"Unexpected {value!r}")
+
+    def call(self, func):
+        self.take('op', '(')
+        series = ('field', FIELDS[FUNCTIONS[func]])
+        if self.peek()[0] == 'name':
+            if self.peek()[1] not in FIELDS:
+                raise self.error(f"{func}() takes a series field, not {self.peek()[1]!r}")
+            name = self.take()[1]
+            series = ('field', FIELDS[name])
+            self.take('op', ',')
+        if self.peek()[0] == 'num' and (self.peek()[1] < 1 or self.peek()[1] != int(self.peek()[1])):
+            raise self.error(f"{func}() period must be a positive whole number")
+        period = self.take('num')[1]
+        self.take('op', ')')
+        return ('call', func, series, int(period))
+
+
+class ScreenPlan:
+    """A parsed screen flattened into unique steps (common subexpressions evaluated once)."""
+
+    def __init__(self, text):
+        self.text = text
+        tokens, positions = tokenize(text, with_positions=True)
+        self.root = _Parser(tokens, positions, len(text.strip())).parse()
+        self.steps = []
+        seen = set()
+
+        def visit(node):
+            if node in seen:
+                return
+            for child in node[1:]:
+                if isinstance(child, tuple):
+                    visit(child)
+            seen.add(node)
+            self.steps.append(node)
+
+        visit(self.root)
+        if self.root[0] not in ('cmp', 'and', 'or', 'not'):
+            raise ScreenSyntaxError("A screen must be a condition, e.g. 'rsi(14) < 30'")
+        self.lead = _lead_comparison(self.root)
+
+    @property
+    def calls(self):
+        """Indicator calls in the plan, for display."""
+        return [step for step in self.steps if step[0] == 'call']
+
+    def evaluate(self, features):
+        """Boolean mask over ``features.tickers``, the last value of every indicator call and
+        the margin (%) of the lead comparison per ticker (None without one)."""
+        values = {}
+        for step in self.steps:
+            values[step] = _evaluate_step(step, values, features)
+        shape = (len(features.tickers),)
+        mask = np.broadcast_to(_last(np.asarray(values[self.root])), shape)
+        latest = {label(call): _last(values[call]) for call in self.calls}
+        margin = None
+        if self.lead is not None:
+            op, left, right = self.lead[1:]
+            a, b = _last(values[left]), _last(values[right])
+            with np.errstate(invalid='ignore', divide='ignore'):
+                margin = np.broadcast_to((a - b if op[0] == '>' else b - a) / np.abs(b) * 100, shape)
+        return mask, latest, margin
+
+
+def _lead_comparison(node):
+    """First ordering comparison (>, >=, <, <=) reading the screen left to right, outside any 'not'."""
+    if node[0] == 'cmp':
+        return node if node[1] in ('>', '>=', '<', '<=') else None
+    if node[0] in ('and', 'or'):
+        return _lead_comparison(node[1]) or _lead_comparison(node[2])
+    return None
+
+
+def _last(value):
+    return value[-1] if np.ndim(value) == 2 else value
+
+
+def _evaluate_step(step, values, features):
+    kind = step[0]
+    if kind == 'num':
+        return np.float64(step[1])
+    if kind == 'field':
+        return features.panel[step[1]]
+    if kind == 'scalar':
+        return features[step[1]]
+    if kind == 'call':
+        return _call(step, values[step[2]], features)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if kind == 'arith':
+            return ARITH[step[1]](values[step[2]], values[step[3]])
+        if kind == 'cmp':
+            return COMPARE[step[1]](values[step[2]], values[step[3]])
+    if kind == 'and':
+        return np.logical_and(values[step[1]], values[step[2]])
+    if kind == 'or':
+        return np.logical_or(values[step[1]], values[step[2]])
+    if kind == 'not':
+        return np.logical_not(values[step[1]])
+    raise ScreenSyntaxError(f"Cannot evaluate {kind!r}")
+
+
+# Calls the shared IndicatorGraph already knows, so strategies and screens reuse them
+_GRAPH_NAMES = {('sma', 'Close'): 'SMA{}', ('ema', 'Close'): 'EMA{}', ('rsi', 'Close'): 'RSI{}',
+                ('sma', 'Volume'): 'VOL_SMA{}'}
+
+
+def _call(step, series, features):
+    _, func, (_, field), period = step
+    graph_name = _GRAPH_NAMES.get((func, field))
+    if graph_name:
+        return features.graph[graph_name.format(period)]
+    if func == 'rsi':
+        return ie.rsi(series, period)
+    if func == 'ema':
+        return ie.ema(series, period)
+    if func == 'sma':
+        return ie.sma(series, period)
+    if func == 'std':
+        return ie.rolling_std(series, period)
+    if func == 'max':
+        return ie.rolling_max(series, period)
+    if func == 'min':
+        return ie.rolling_min(series, period)
+    if func == 'change':
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (series / ie.shift(series, period) - 1) * 100
+    raise ScreenSyntaxError(f"Unknown function {func!r}")
+
+
+def label(node):
+    """Readable text for a plan node, e.g. ``sma(volume, 20)``."""
+    kind = node[0]
+    if kind == 'num':
+        return f"{node[1]:g}"
+    if kind == 'field':
+        return node[1].lower()
+    if kind == 'scalar':
+        return node[1]
+    if kind == 'call':
+        field = node[2][1].lower()
+        default = FIELDS[FUNCTIONS[node[1]]].lower()
+        return f"{node[1]}({node[3]})" if field == default else f"{node[1]}({field}, {node[3]})"
+    if kind in ('arith', 'cmp'):
+        return f"({label(node[2])} {node[1]} {label(node[3])})"
+    if kind == 'not':
+        return f"not {label(node[1])}"
+    return f"({label(node[1])} {kind} {label(node[2])})"
+
+
+def compile_screen(text):
+    """Parses ``text`` into a ScreenPlan, raising ScreenSyntaxError with a readable message."""
+    if not text or not text.strip():
+        raise ScreenSyntaxError("Empty screen")
+    return ScreenPlan(text)
+
+
+def run_screen(plan, features, limit=None):
+    """Candidates matching ``plan`` (a ScreenPlan or text) over StrategyFeatures.
+
+    ``score`` is how far (%) each match clears the screen's lead comparison,
+    e.g. the distance above sma(50) in ``close > sma(50) and ...``; results
+    are ranked by it. Screens without an ordering comparison score 0 and
+    keep universe order.
+    """
+    if isinstance(plan, str):
+        plan = compile_screen(plan)
+    if not len(features):
+        return []
+    mask, latest, margin = plan.evaluate(features)
+    prices = features['price']
+    results = []
+    for j in np.flatnonzero(mask):
+        reasons = [f"{name} = {np.broadcast_to(value, mask.shape)[j]:,.2f}" for name, value in latest.items()]
+        score = float(margin[j]) if margin is not None and np.isfinite(margin[j]) else 0.0
+        results.append({'ticker': features.tickers[j], 'score': round(score, 2),
+                        'current_price': float(prices[j]), 'reasons': reasons})
+    results.sort(key=lambda x: x['score'], reverse=True)
+    return results[:limit] if limit else results
@@ -0,0 +1,273 @@
+import asyncio
+import atexit
+import heapq
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+# Scoring processes for universe scans (0 scores inline in the calling thread)
+SCAN_PROCESSES = int(os.environ.get('STOCKPRO_SCAN_PROCESSES', os.cpu_count() or 1))
+
+# Concurrent chunk downloads feeding the scoring stage
+SCAN_IO_WORKERS = int(os.environ.get('STOCKPRO_SCAN_IO_WORKERS', 4))
+
+_DONE = object()
+
+# Scoring pool shared by every scan in this process (see scoring_pool)
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def chunked(items, size):
+    items = list(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def progress_chunk_size(total, updates=10, low=5, high=50):
+    """Chunk size giving roughly ``updates`` progress steps, kept within batch-friendly bounds."""
+    return max(low, min(high, -(-total // updates)))
+
+
+class TopK:
+    """Running top-``k`` of scored items in a bounded min-heap.
+
+    Equal keys keep the item pushed first, so the result matches a stable
+    descending sort of everything pushed.
+    """
+
+    def __init__(self, k, key):
+        self.k = k
+        self.key = key
+        self._heap = []
+        self._seq = itertools.count()
+
+    def push(self, item):
+        entry = (self.key(item), -next(self._seq), item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def extend(self, items):
+        for item in items:
+            self.push(item)
+
+    def items(self):
+        return [entry[2] for entry in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
+
+
+async def aiter_updates(updates):
+    """Async iterator over a blocking update generator (each step runs in a worker thread)."""
+    done = object()
+    while True:
+        update = await asyncio.to_thread(next, updates, done)
+        if update is done:
+            return
+        yield update
+
+
+class BackgroundScan:
+    """Runs an update generator (e.g. iter_multibagger_candidates) on a daemon thread.
+
+    ``latest`` always holds the most recent update, so a caller can wait a
+    bounded time, show what has been found so far and pick up the refined
+    results later while the scan keeps going.
+    """
+
+    def __init__(self, updates):
+        self.latest = None
+        self.error = None
+        self.started = time.monotonic()
+        self.finished = threading.Event()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(updates,), daemon=True)
+        self._thread.start()
+
+    def _run(self, updates):
+        try:
+            for update in updates:
+                self.latest = update
+                if self._cancel.is_set():
+                    break
+        except Exception as e:
+            print(f"Background scan failed: {e}")
+            self.error = e
+        finally:
+            updates.close()
+            self.finished.set()
+
+    def wait(self, timeout=None):
+        """Latest update once the scan finishes or ``timeout`` seconds pass, whichever is first."""
+        self.finished.wait(timeout)
+        return self.latest
+
+    def cancel(self):
+        """Stops the scan after its current chunk; ``latest`` keeps the partial results."""
+        self._cancel.set()
+
+    @property
+    def done(self):
+        return self.finished.is_set()
+
+    @property
+    def coverage(self):
+        return self.latest.get('coverage', 0.0) if self.latest else 0.0
+
+
+def scoring_pool(workers):
+    """Process pool for chunk scoring, created on first use and reused by later scans.
+
+    Workers are started with forkserver (spawn where unavailable): the
+    dashboard process is multithreaded, and forking it while another
+    thread holds a lock (scheduler, I/O, bot) can deadlock the child. A
+    request for more workers than the pool has replaces it; work already
+    submitted to the old pool still finishes.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None and (workers > _pool_workers or getattr(_pool, '_broken', False)):
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None:
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+            _pool_workers = workers
+        return _pool
+
+
+@atexit.register
+def shutdown_scoring_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def iter_pipeline(chunks, load, score, io_workers=None, cpu_workers=None, max_pending=None, stats=None):
+    """Runs ``score(chunk, load(chunk))`` for every chunk through two stages.
+
+    The I/O stage is ``io_workers`` threads calling ``load``; loaded chunks
+    wait in a bounded queue (``max_pending``) so downloads pause when
+    scoring falls behind instead of piling frames up in memory. The CPU
+    stage scores chunks on the shared scoring_pool of ``cpu_workers``
+    processes, so pandas/NumPy work is not serialized on the GIL; ``score``
+    must therefore be picklable (a module-level function or a partial).
+
+    Yields ``(chunk, result)`` as each chunk finishes, in completion order.
+    A chunk whose load or score fails yields ``(chunk, None)``.
+    """
+    io_workers = max(1, SCAN_IO_WORKERS if io_workers is None else io_workers)
+    cpu_workers = SCAN_PROCESSES if cpu_workers is None else cpu_workers
+    max_pending = max_pending or 2 * max(cpu_workers, 1)
+    stats = stats if stats is not None else {}
+    stats.update({'loaded': 0, 'scored': 0, 'failed': 0, 'io_s': 0.0, 'io_blocked_s': 0.0})
+
+    pending = iter(list(chunks))
+    pending_lock = threading.Lock()
+    stats_lock = threading.Lock()
+    loaded = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+
+    def put(item):
+        started = time.monotonic()
+        while not stop.is_set():
+            try:
+                loaded.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        with stats_lock:
+            stats['io_blocked_s'] += time.monotonic() - started
+
+    def io_worker():
+        while not stop.is_set():
+            with pending_lock:
+                chunk = next(pending, None)
+            if chunk is None:
+                break
+            started = time.monotonic()
+            try:
+                data = load(chunk)
+            except Exception as e:
+                print(f"Scan load failed for {len(chunk)} tickers: {e}")
+                data = None
+            with stats_lock:
+                stats['io_s'] += time.monotonic() - started
+            put((chunk, data))
+        put(_DONE)
+
+    pool = None
+    if cpu_workers > 0:
+        try:
+            pool = scoring_pool(cpu_workers)
+        except Exception as e:
+            print(f"Process pool unavailable, scoring inline: {e}")
+
+    io_threads = ThreadPoolExecutor(max_workers=io_workers)
+    for _ in range(io_workers):
+        io_threads.submit(io_worker)
+
+    inflight = {}
+    io_done = 0
+    try:
+        while io_done < io_workers or inflight:
+            # Hand loaded chunks to the scoring stage while it has room
+            while io_done < io_workers and len(inflight) < max_pending:
+                try:
+                    item = loaded.get(timeout=0.05 if inflight else None)
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    io_done += 1
+                    continue
+                chunk, data = item
+                stats['loaded'] += 1
+                if data is None:
+                    stats['failed'] += 1
+                    yield chunk, None
+                elif pool is None:
+                    try:
+                        result = score(chunk, data)
+                        stats['scored'] += 1
+                    except Exception as e:
+                        print(f"Scan scoring failed for {len(chunk)} tickers: {e}")
+                        result = None
+                        stats['failed'] += 1
+                    yield chunk, result
+                else:
+                    inflight[pool.submit(score, chunk, data)] = chunk
+
+            if inflight:
+                done, _ = wait(inflight, timeout=0.05, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = inflight.pop(future)
+                    try:
+                        result = future.result()
+                        stats['scored'] += 1
+                    except Exception as e:
+                        print(f"Scan scoring failed for {len(chunk)} tickers: {e}")
+                        result = None
+                        stats['failed'] += 1
+                    yield chunk, result
+    finally:
+        # Also reached when the consumer stops iterating early
+        stop.set()
+        io_threads.shutdown(wait=False)
+        # The pool is shared; only this scan's queued chunks are dropped
+        for future in inflight:
+            future.cancel()
+
+
+def run_pipeline(chunks, load, score, **kwargs):
+    """Collects iter_pipeline into one list (results are assumed to be lists)."""
+    results = []
+    for _, result in iter_pipeline(chunks, load, score, **kwargs):
+        if result:
+            results.extend(result)
+    return results
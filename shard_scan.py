@@ -0,0 +1,265 @@
+import argparse
+import glob
+import json
+import os
+import socket
+import time
+import uuid
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from fetch_market_data import MarketDataFetcher
+from screen_pipeline import TopK
+from stock_screener import StockScreener
+
+# Local shard worker processes; each does its own downloads and scoring under its
+# own STOCKPRO_FETCH_RATE budget, so the total request rate scales with this too
+SHARD_WORKERS = int(os.environ.get('STOCKPRO_SHARD_WORKERS', os.cpu_count() or 1))
+
+# A claimed shard with no result after this long is handed to another worker
+SHARD_LEASE_SECONDS = float(os.environ.get('STOCKPRO_SHARD_LEASE_SECONDS', 900))
+
+# Scan kind -> default number of results, as the single-process screener returns
+SCAN_KINDS = {'multibagger': 10, 'market': 5}
+
+
+def shard_of(ticker, shards):
+    """Shard index of ``ticker``; crc32 rather than hash() so every process and machine agrees."""
+    return zlib.crc32(ticker.encode('utf-8')) % shards
+
+
+def split_universe(tickers, shards):
+    parts = [[] for _ in range(shards)]
+    for ticker in tickers:
+        parts[shard_of(ticker, shards)].append(ticker)
+    return parts
+
+
+def load_universe():
+    """All symbols from ticker_db.json (the Total Market universe)."""
+    return MarketDataFetcher().symbols
+
+
+def make_jobs(kind, tickers, shards, limit=None, strategy="Strong Formula"):
+    if kind not in SCAN_KINDS:
+        raise ValueError(f"Unknown scan kind {kind!r}")
+    limit = limit or SCAN_KINDS[kind]
+    return [{'kind': kind, 'shard': i, 'shards': shards, 'tickers': part, 'limit': limit, 'strategy': strategy}
+            for i, part in enumerate(split_universe(tickers, shards)) if part]
+
+
+def scan_shard(job):
+    """Runs one shard job and returns its top-k (picklable process entry point)."""
+    screener = StockScreener(job['tickers'])
+    if job['kind'] == 'multibagger':
+        # The shard process is the unit of parallelism, so score inline
+        return screener.get_multibagger_candidates(job['limit'], job['strategy'], cpu_workers=0)
+    top = []
+    for update in screener.iter_screen_market(limit=job['limit']):
+        top = update['top']
+    return top
+
+
+def merge_top(shard_results, limit):
+    """Global top ``limit`` by score from the per-shard top-k lists."""
+    top = TopK(limit, key=lambda x: x['score'])
+    for results in shard_results:
+        top.extend(results or [])
+    return top.items()
+
+
+def run_local(kind, tickers=None, shards=None, workers=None, limit=None, strategy="Strong Formula"):
+    """Scans ``tickers`` (default: whole universe) as shards on local worker processes.
+
+    Every shard keeps its own top-k, so the merged result equals the
+    single-process scan. A failed shard is reported and left out.
+    """
+    tickers = load_universe() if tickers is None else list(tickers)
+    workers = workers or SHARD_WORKERS
+    jobs = make_jobs(kind, tickers, shards or workers, limit, strategy)
+    limit = limit or SCAN_KINDS[kind]
+    if workers <= 1:
+        return merge_top([scan_shard(job) for job in jobs], limit)
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(scan_shard, job): job for job in jobs}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"Shard {futures[future]['shard']} failed: {e}")
+    return merge_top(results, limit)
+
+
+def _write_json(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        # NumPy scalars in screener results
+        json.dump(data, f, default=float)
+    os.replace(tmp, path)
+
+
+class ShardDirectory:
+    """Shard queue in a directory shared between machines (NFS, SMB, synced folder).
+
+    Layout per scan: ``<root>/<scan_id>/manifest.json`` plus one
+    ``shard-NNN.job.json`` per shard. A worker claims a job by renaming it
+    to ``shard-NNN.<lease>.claimed.json`` (rename is atomic, so exactly one
+    worker wins) and publishes ``shard-NNN.result.json`` when done. Claims
+    older than SHARD_LEASE_SECONDS without a result go back to the queue.
+    The lease token is unique per claim, so a late worker or a second
+    requeuer can only ever touch the claim it saw, never a newer one.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def submit(self, kind, tickers=None, shards=16, limit=None, strategy="Strong Formula"):
+        tickers = load_universe() if tickers is None else list(tickers)
+        jobs = make_jobs(kind, tickers, shards, limit, strategy)
+        scan_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        scan_dir = os.path.join(self.root, scan_id)
+        os.makedirs(scan_dir)
+        for job in jobs:
+            _write_json(os.path.join(scan_dir, f"shard-{job['shard']:03d}.job.json"), job)
+        _write_json(os.path.join(scan_dir, 'manifest.json'), {
+            'kind': kind, 'strategy': strategy, 'limit': jobs[0]['limit'] if jobs else limit,
+            'shards': [job['shard'] for job in jobs], 'tickers': len(tickers), 'created': time.time(),
+        })
+        return scan_id
+
+    def _requeue_expired(self, scan_dir):
+        for claimed in glob.glob(os.path.join(scan_dir, 'shard-*.claimed.json')):
+            shard = os.path.join(scan_dir, os.path.basename(claimed).split('.')[0])
+            try:
+                if time.time() - os.path.getmtime(claimed) <= SHARD_LEASE_SECONDS:
+                    continue
+                if os.path.exists(f"{shard}.result.json"):
+                    # Finished; the worker stopped before dropping its claim
+                    os.remove(claimed)
+                else:
+                    os.rename(claimed, f"{shard}.job.json")
+            except OSError:
+                # Already requeued or completed by someone else
+                continue
+
+    def claim(self):
+        """(scan_dir, job) for the next unclaimed shard, or None when the queue is empty.
+
+        ``job['lease']`` names this claim; pass the job back to ``complete``.
+        """
+        lease = f"{socket.gethostname().replace('.', '_')}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        for scan_dir in sorted(glob.glob(os.path.join(self.root, '*', ''))):
+            self._requeue_expired(scan_dir)
+            for path in sorted(glob.glob(os.path.join(scan_dir, 'shard-*.job.json'))):
+                claimed = path.replace('.job.json', f'.{lease}.claimed.json')
+                try:
+                    os.rename(path, claimed)
+                    # Lease starts now, not when the job was written
+                    os.utime(claimed)
+                    with open(claimed, "r") as f:
+                        return scan_dir, dict(json.load(f), lease=lease)
+                except (OSError, ValueError):
+                    continue
+        return None
+
+    def complete(self, scan_dir, job, results):
+        name = os.path.join(scan_dir, f"shard-{job['shard']:03d}")
+        _write_json(f"{name}.result.json", {'host': socket.gethostname(), 'results': results})
+        try:
+            # Only our own claim; if it expired and was claimed again, the new lease stays
+            os.remove(f"{name}.{job['lease']}.claimed.json")
+        except (OSError, KeyError):
+            pass
+
+    def work(self, poll=2.0, once=False):
+        """Worker loop: claims and runs shards; with ``once``, returns when the queue is empty."""
+        while True:
+            claimed = self.claim()
+            if claimed is None:
+                if once:
+                    return
+                time.sleep(poll)
+                continue
+            scan_dir, job = claimed
+            print(f"Scanning shard {job['shard']} of {os.path.basename(os.path.normpath(scan_dir))} "
+                  f"({len(job['tickers'])} tickers)")
+            try:
+                self.complete(scan_dir, job, scan_shard(job))
+            except Exception as e:
+                # Claim expires and the shard is retried elsewhere
+                print(f"Shard {job['shard']} failed: {e}")
+
+    def collect(self, scan_id, timeout=None, poll=2.0):
+        """(merged top-k, fraction of shards finished); waits up to ``timeout`` for all shards."""
+        scan_dir = os.path.join(self.root, scan_id)
+        with open(os.path.join(scan_dir, 'manifest.json'), "r") as f:
+            manifest = json.load(f)
+        started = time.monotonic()
+        while True:
+            paths = glob.glob(os.path.join(scan_dir, 'shard-*.result.json'))
+            if len(paths) >= len(manifest['shards']) or (timeout is not None and time.monotonic() - started >= timeout):
+                break
+            time.sleep(poll)
+        results = []
+        for path in paths:
+            with open(path, "r") as f:
+                results.append(json.load(f)['results'])
+        coverage = len(paths) / len(manifest['shards']) if manifest['shards'] else 1.0
+        return merge_top(results, manifest['limit']), coverage
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sharded universe scans')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def scan_args(p):
+        p.add_argument('--kind', choices=sorted(SCAN_KINDS), default='multibagger')
+        p.add_argument('--strategy', default='Strong Formula')
+        p.add_argument('--limit', type=int, default=None)
+        p.add_argument('--shards', type=int, default=None)
+
+    local = sub.add_parser('local', help='Scan on local worker processes')
+    scan_args(local)
+    local.add_argument('--workers', type=int, default=None)
+
+    submit = sub.add_parser('submit', help='Queue a scan in a shared directory')
+    scan_args(submit)
+    submit.add_argument('--dir', required=True)
+
+    work = sub.add_parser('work', help='Run queued shards from a shared directory')
+    work.add_argument('--dir', required=True)
+    work.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+
+    collect = sub.add_parser('collect', help='Merge the results of a queued scan')
+    collect.add_argument('scan_id')
+    collect.add_argument('--dir', required=True)
+    collect.add_argument('--timeout', type=float, default=None)
+
+    args = parser.parse_args()
+    if args.command == 'local':
+        started = time.time()
+        top = run_local(args.kind, shards=args.shards, workers=args.workers, limit=args.limit, strategy=args.strategy)
+        coverage = 1.0
+        print(f"Scan finished in {time.time() - started:.1f}s")
+    elif args.command == 'submit':
+        print(ShardDirectory(args.dir).submit(args.kind, shards=args.shards or 16, limit=args.limit,
+                                              strategy=args.strategy))
+        return
+    elif args.command == 'work':
+        ShardDirectory(args.dir).work(once=args.once)
+        return
+    else:
+        top, coverage = ShardDirectory(args.dir).collect(args.scan_id, timeout=args.timeout)
+
+    if coverage < 1:
+        print(f"Partial result: {coverage:.0%} of shards finished")
+    for i, item in enumerate(top, 1):
+        price = item.get('current_price', item.get('price'))
+        print(f"{i:2d}. {item['ticker']:<16} score {item['score']:>3}  price {price:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
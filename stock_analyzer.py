@@ -1,9 +1,17 @@
 
-import yfinance as yf
 import pandas as pd
 from datetime import timedelta, date
 from sklearn.linear_model import LinearRegression
 import numpy as np
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from bar_store import load_bars
+from data_provider import get_provider
+from fetch_scheduler import current_priority, set_fetch_priority
+from indicator_graph import IndicatorGraph
+from indicator_store import INDICATOR_PARAMS, INDICATOR_STORE, indicator_columns
+from info_cache import INFO_CACHE
+from resample import resample_ohlcv
 
 # Try to import heavy ML libraries at module level for better performance
 try:
@@ -16,6 +24,16 @@ try:
 except ImportError:
     XGBRegressor = None
 
+# Indicator columns added to StockAnalyzer.data (RSI stays in .indicators)
+ANALYZER_COLUMNS = ['MA20', 'STD20', 'Upper_Band', 'Lower_Band', 'MACD', 'Signal_Line', 'MACD_Hist',
+                    'EMA20', 'EMA50', 'EMA200']
+
+# Columns the indicator store materializes (the rest come from the graph)
+STORED_COLUMNS = {c for c in indicator_columns(INDICATOR_PARAMS) if not c.startswith('_')}
+
+# Seconds each Deep Analyzer stage may take before the pipeline moves on without it
+PIPELINE_TIMEOUTS = {'daily': 20, 'chart': 20, 'fundamentals': 10, 'news': 5}
+
 class StockAnalyzer:
     def __init__(self, ticker):
         self.ticker = ticker
@@ -23,6 +41,7 @@ class StockAnalyzer:
         self.model = None
         self.info = {}
         self.news = []
+        self.indicators = None
 
     def fetch_data(self, start=None, end=None, interval='1d'):
         """Fetches historical data.
@@ -41,55 +60,71 @@ class StockAnalyzer:
             
         self.interval = interval
         
-        # Download data
-        # yfinance expects date objects or strings
-        self.data = yf.download(self.ticker, start=start, end=end, interval=interval, progress=False, auto_adjust=True)
-        
-        # --- FIX: yfinance MultiIndex columns ---
-        if isinstance(self.data.columns, pd.MultiIndex):
-            self.data.columns = self.data.columns.droplevel('Ticker')
-            
-        self.data = self.data.loc[:, ~self.data.columns.duplicated()].copy()
+        # Read through the shared bar store (downloads only on a miss)
+        return self.set_data(load_bars(self.ticker, start, end, interval=interval), interval)
+
+    def set_data(self, df, interval='1d', indicators=None):
+        """Uses an already loaded OHLCV frame as this analyzer's data.
+
+        ``indicators`` is passed to calculate_indicators as ``only``; an empty
+        list skips them so views can compute what they display later.
+        """
+        self.interval = interval
+        self.data = df.copy() if df is not None else pd.DataFrame()
+        self.indicators = None
         
         if self.data.empty:
             print(f"No data found for {self.ticker}")
             return False
             
         print(f"Successfully fetched {len(self.data)} rows of data.")
-        self.calculate_indicators()
+        if indicators is None or indicators:
+            self.calculate_indicators(only=indicators)
         return True
 
-    def calculate_indicators(self):
-        """Calculates advanced technical indicators (MACD, Bollinger Bands)."""
+    def calculate_indicators(self, only=None):
+        """Calculates advanced technical indicators (MACD, Bollinger Bands, EMAs, RSI).
+
+        Without ``only`` the full analyzer set is materialized through the
+        indicator store. With ``only`` (e.g. ['MACD_Hist']) just those columns
+        are added: ones the store materializes are read through it (so it
+        fills and extends like the full path), anything else is resolved on
+        the indicator graph on top of them.
+        """
         if self.data is None or len(self.data) < 5:
             return
 
         df = self.data
-        # 1. Bollinger Bands (20-day, but adaptive)
-        df['MA20'] = df['Close'].rolling(window=20, min_periods=1).mean()
-        df['STD20'] = df['Close'].rolling(window=20, min_periods=1).std()
-        df['Upper_Band'] = df['MA20'] + (df['STD20'] * 2)
-        df['Lower_Band'] = df['MA20'] - (df['STD20'] * 2)
-
-        # 2. MACD (12, 26, 9)
-        exp1 = df['Close'].ewm(span=12, adjust=False).mean()
-        exp2 = df['Close'].ewm(span=26, adjust=False).mean()
-        df['MACD'] = exp1 - exp2
-        df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
-        df['MACD_Hist'] = df['MACD'] - df['Signal_Line']
-
-        # 3. EMAs
-        df['EMA20'] = df['Close'].ewm(span=20, adjust=False).mean()
-        df['EMA50'] = df['Close'].ewm(span=50, adjust=False).mean()
-        df['EMA200'] = df['Close'].ewm(span=200, adjust=False).mean()
+        interval = getattr(self, 'interval', '1d')
+        if only is None:
+            # Bollinger Bands (20, adaptive), MACD (12, 26, 9), EMAs and RSI are
+            # materialized next to the bars; only bars new since the last call are computed
+            self.indicators = INDICATOR_STORE.get(self.ticker, interval, df)
+            columns = ANALYZER_COLUMNS
+        else:
+            previous = self.indicators
+            if previous is not None and not previous.index.equals(df.index):
+                previous = None
+            stored = None
+            if set(only) & STORED_COLUMNS:
+                stored = INDICATOR_STORE.get(self.ticker, interval, df)
+            cached = {}
+            for frame in (previous, stored):
+                if frame is not None:
+                    cached.update({c: frame[c].to_numpy() for c in frame.columns})
+            graph = IndicatorGraph({'Close': df['Close'].to_numpy(), 'Volume': df['Volume'].to_numpy()}, cached)
+            base = previous if previous is not None else pd.DataFrame(index=df.index)
+            self.indicators = base.assign(**graph.get_many(only))
+            columns = [c for c in only if c != 'RSI']
+        for col in columns:
+            df[col] = self.indicators[col]
         
         self.data = df
 
     def fetch_fundamentals(self):
-        """Fetches fundamental data using yfinance.info."""
+        """Fetches fundamental data (yfinance .info keys), cached for a day."""
         try:
-            tick = yf.Ticker(self.ticker)
-            info = tick.info
+            info = INFO_CACHE.get('info', self.ticker, lambda: get_provider().info(self.ticker))
             self.info = {
                 'name': info.get('longName', self.ticker),
                 'pe': info.get('trailingPE', 0),
@@ -107,10 +142,10 @@ class StockAnalyzer:
             return False
 
     def get_news(self):
-        """Fetches recent news for the ticker."""
+        """Fetches recent news for the ticker, cached for 15 minutes."""
         try:
-            tick = yf.Ticker(self.ticker)
-            self.news = tick.news[:5] # Top 5 news items
+            news = INFO_CACHE.get('news', self.ticker, lambda: get_provider().news(self.ticker))
+            self.news = news[:5] # Top 5 news items
             return self.news
         except:
             return []
@@ -359,20 +394,21 @@ class StockAnalyzer:
         if beta > 1.5: cons.append(f"High Volatility: Beta of {beta:.2f} suggests significant price swings.")
         elif 0 < beta < 0.8: pros.append(f"Low Volatility: Beta of {beta:.2f} suggests a defensive, stable stock.")
 
-        # Technical Pros/Cons
+        # Technical Pros/Cons (only the indicators used here are resolved)
+        if self.indicators is None or len(self.indicators) != len(df) \
+                or not {'EMA200', 'RSI'} <= set(self.indicators.columns):
+            self.calculate_indicators(only=['EMA200', 'RSI'])
         cur_price = df['Close'].iloc[-1]
         if 'EMA200' in df.columns:
             ema200 = df['EMA200'].iloc[-1]
             if cur_price > ema200: pros.append("Bullish Trend: Trading above the 200-day EMA.")
             else: cons.append("Bearish Trend: Trading below the 200-day EMA.")
 
-        # RSI logic (Calculate if not present)
-        if 'RSI' not in df.columns:
-            from stock_screener import StockScreener
-            screener = StockScreener([]) # Empty for helper
-            df['RSI'] = screener.calculate_rsi(df['Close'])
+        # RSI logic
+        if self.indicators is None or 'RSI' not in self.indicators:
+            return pros, cons
             
-        rsi = df['RSI'].iloc[-1]
+        rsi = self.indicators['RSI'].iloc[-1]
         if not np.isnan(rsi):
             if rsi < 35: pros.append(f"Oversold Condition: RSI ({rsi:.0f}) suggests a potential bounce.")
             elif rsi > 75: cons.append(f"Overbought Condition: RSI ({rsi:.0f}) suggests a possible correction.")
@@ -380,6 +416,77 @@ class StockAnalyzer:
 
         return pros, cons
 
+def run_deep_analysis(ticker, start, end, interval='1d', ai_days=365 * 5, timeouts=None):
+    """Runs the Deep Analyzer fetches concurrently.
+
+    The 5-year daily series for the AI models, the chart series,
+    fundamentals and news are independent, so they are started together
+    and each is awaited up to its PIPELINE_TIMEOUTS budget. Daily/weekly
+    charts inside the 5-year window are cut from the daily series instead
+    of being downloaded a second time.
+
+    Returns (analyzer, ai_analyzer, status). ``analyzer`` is None when no
+    chart data arrived; ``status`` maps each stage to 'ok', 'derived',
+    'timeout' or 'error'.
+    """
+    timeouts = dict(PIPELINE_TIMEOUTS, **(timeouts or {}))
+    analyzer = StockAnalyzer(ticker)
+    ai_analyzer = StockAnalyzer(ticker)
+    ai_start = end - timedelta(days=ai_days)
+    derive_chart = interval in ('1d', '1wk') and start >= ai_start
+    priority = current_priority()
+
+    def stage(fn):
+        def run():
+            set_fetch_priority(priority)
+            return fn()
+        return run
+
+    executor = ThreadPoolExecutor(max_workers=4)
+    futures = {
+        'daily': executor.submit(stage(lambda: load_bars(ticker, ai_start, end, interval='1d'))),
+        'fundamentals': executor.submit(stage(analyzer.fetch_fundamentals)),
+        'news': executor.submit(stage(analyzer.get_news)),
+    }
+    if not derive_chart:
+        futures['chart'] = executor.submit(stage(lambda: load_bars(ticker, start, end, interval=interval)))
+
+    started = time.monotonic()
+    results, status = {}, {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result(timeout=max(0, started + timeouts[name] - time.monotonic()))
+            status[name] = 'ok'
+        except FutureTimeout:
+            status[name] = 'timeout'
+        except Exception as e:
+            print(f"Deep analysis stage '{name}' failed for {ticker}: {e}")
+            status[name] = 'error'
+    # Late stages finish in the background and still warm the caches
+    executor.shutdown(wait=False)
+
+    daily = results.get('daily')
+    if daily is not None:
+        # The models work on returns; chart indicators are resolved per toggle by the view
+        ai_analyzer.set_data(daily, '1d', indicators=[])
+
+    if derive_chart:
+        chart = None
+        if daily is not None and not daily.empty:
+            first = pd.Timestamp(start)
+            if interval == '1wk':
+                first -= pd.Timedelta(days=first.weekday())
+            chart = daily[daily.index >= first]
+            chart = resample_ohlcv(chart, '1wk') if interval == '1wk' else chart
+        status['chart'] = 'derived' if chart is not None else status['daily']
+    else:
+        chart = results.get('chart')
+
+    if chart is None or not analyzer.set_data(chart, interval, indicators=[]):
+        return None, ai_analyzer, status
+    return analyzer, ai_analyzer, status
+
+
 if __name__ == "__main__":
     # Simple test
     analyzer = StockAnalyzer("GOOGL")
@@ -1,29 +1,37 @@
 
-import yfinance as yf
 import pandas as pd
 import numpy as np
-from datetime import date, timedelta
-from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from bar_store import load_bars, load_bars_many
+from fetch_scheduler import BACKGROUND, fetch_priority
+import indicator_engine as ie
+from indicator_graph import IndicatorGraph
+from functools import partial
+from strategies import StrategyFeatures, get_strategy, prefilter, score_chunk
+from fetch_market_data import StatsRanking, load_universe_stats, row_stats, snapshot_is_current, stats_from_bar_store
+from screen_pipeline import BackgroundScan, TopK, chunked, iter_pipeline, progress_chunk_size
+from screen_expr import compile_screen, run_screen
+from scan_cache import SCAN_CACHE
+from market_snapshot import load_snapshot
+
+# Tickers per download/scoring chunk in universe scans
+SCAN_CHUNK_SIZE = 100
 
 class StockScreener:
     def __init__(self, tickers):
         self.tickers = tickers
+        # Per-stage counts of the last multibagger scan
+        self.scan_counts = {}
 
     def fetch_history(self, ticker):
         """Fetches 6 months of history for a single ticker."""
         end_date = date.today() + timedelta(days=1) 
         start_date = end_date - timedelta(days=200) 
         try:
-            df = yf.download(ticker, start=start_date, end=end_date, progress=False, auto_adjust=True)
+            df = load_bars(ticker, start_date, end_date, interval='1d')
             if df.empty or len(df) < 60:
                 return None
             
-            # --- FIX: yfinance MultiIndex columns ---
-            if isinstance(df.columns, pd.MultiIndex):
-                df.columns = df.columns.droplevel('Ticker')
-            
-            df = df.loc[:, ~df.columns.duplicated()].copy()
-            
             required = ['Open', 'High', 'Low', 'Close', 'Volume']
             if not all(c in df.columns for c in required):
                 return None
@@ -33,6 +41,17 @@ class StockScreener:
             print(f"Error fetching {ticker}: {e}")
             return None
 
+    def fetch_history_many(self, tickers):
+        """Fetches 6 months of history for many tickers in batched requests."""
+        end_date = date.today() + timedelta(days=1) 
+        start_date = end_date - timedelta(days=200) 
+        try:
+            frames = load_bars_many(tickers, start_date, end_date, interval='1d')
+        except Exception as e:
+            print(f"Batch history error: {e}")
+            return {}
+        return {t: df for t, df in frames.items() if len(df) >= 60}
+
     def calculate_rsi(self, series, period=14):
         """Calculate RSI manually."""
         delta = series.diff()
@@ -106,24 +125,65 @@ class StockScreener:
             'change_pct': ((current_price - df['Close'].iloc[-2]) / df['Close'].iloc[-2]) * 100
         }
 
+    def score_panel(self, frames, tickers=None):
+        """Vectorized calculate_score for every ticker in ``frames`` at once.
+
+        Builds one (bars x tickers) panel and evaluates the indicators as
+        whole-array operations; results match calculate_score row for row
+        (same order as self.tickers) and the frames are left untouched.
+        """
+        # 50-bar SMA is the longest lookback, older bars can't change the result
+        panel = ie.Panel.from_frames(frames, tickers or self.tickers, fields=('Close', 'Volume'), rows=51)
+        if not len(panel):
+            return []
+        close, volume = panel['Close'], panel['Volume']
+        graph = IndicatorGraph(panel.fields)
+
+        current_rsi = graph['RSI14'][-1]
+        sma_20 = graph['SMA20'][-1]
+        sma_50 = graph['SMA50'][-1]
+        vol_sma = graph['VOL_SMA20'][-1]
+        current_price, prev_close, current_vol = close[-1], close[-2], volume[-1]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            trend = current_price > sma_20
+            golden = sma_20 > sma_50
+            healthy = (current_rsi >= 40) & (current_rsi <= 70)
+            overbought = current_rsi > 70
+            vol_ratio = np.where(vol_sma > 0, current_vol / vol_sma, 1.0)
+            change_pct = ((current_price - prev_close) / prev_close) * 100
+
+        score = (20 * trend + 20 * golden
+                 + np.where(healthy, 30, np.where(overbought, 10, 5))
+                 + np.where(vol_ratio > 1.5, 30, np.where(vol_ratio > 1.0, 20, 0)))
+
+        results = []
+        for j in np.flatnonzero(~np.isnan(current_rsi) & ~np.isnan(sma_50)):
+            reasons = []
+            if trend[j]: reasons.append("Price > 20d Avg")
+            if golden[j]: reasons.append("Golden Trend")
+            if healthy[j]: reasons.append(f"Healthy RSI ({current_rsi[j]:.0f})")
+            elif overbought[j]: reasons.append("Overbought")
+            if vol_ratio[j] > 1.5: reasons.append(f"Vol Spike ({vol_ratio[j]:.1f}x)")
+            results.append({
+                'ticker': panel.tickers[j],
+                'price': current_price[j],
+                'score': int(score[j]),
+                'reasons': ", ".join(reasons),
+                'rsi': current_rsi[j],
+                'change_pct': change_pct[j]
+            })
+        return results
+
     def fetch_hourly_history(self, ticker):
         """Fetches 5 days of hourly history for a single ticker."""
         end_date = date.today() + timedelta(days=1) 
         start_date = end_date - timedelta(days=5) 
         try:
-            df = yf.download(ticker, start=start_date, end=end_date, interval='1h', progress=False, auto_adjust=True)
+            df = load_bars(ticker, start_date, end_date, interval='1h')
             if df.empty or len(df) < 20:
                 return None
             
-            # --- FIX: yfinance returns MultiIndex columns like ('Close', 'TICKER') ---
-            # We need to completely flatten to simple column names
-            if isinstance(df.columns, pd.MultiIndex):
-                # Drop the Ticker level, keep only Price level
-                df.columns = df.columns.droplevel('Ticker')
-            
-            # If any resulting columns are duplicated (shouldn't be), drop dups
-            df = df.loc[:, ~df.columns.duplicated()].copy()
-            
             # Verify we have what we need
             if 'Close' not in df.columns or 'Volume' not in df.columns:
                 print(f"Missing Close/Volume for {ticker}")
@@ -134,6 +194,17 @@ class StockScreener:
             print(f"Hourly fetch error {ticker}: {e}")
             return None
 
+    def fetch_hourly_history_many(self, tickers):
+        """Fetches 5 days of hourly history for many tickers in batched requests."""
+        end_date = date.today() + timedelta(days=1) 
+        start_date = end_date - timedelta(days=5) 
+        try:
+            frames = load_bars_many(tickers, start_date, end_date, interval='1h')
+        except Exception as e:
+            print(f"Batch hourly fetch error: {e}")
+            return {}
+        return {t: df for t, df in frames.items() if len(df) >= 20}
+
     def calculate_intraday_score(self, ticker, df):
         """Calculates score for Intraday Scalping (1-2 Hr)."""
         # We need recent data
@@ -145,11 +216,12 @@ class StockScreener:
         df['Vol_SMA_10'] = df['Volume'].rolling(window=10).mean()
         
         current_price = df['Close'].iloc[-1]
-        last_hourly_change = (current_price - df['Close'].iloc[-2]) / df['Close'].iloc[-2] * 100
-        current_rsi = df['RSI'].iloc[-1]
-        current_vol = df['Volume'].iloc[-1]
-        vol_avg = df['Vol_SMA_10'].iloc[-1]
-        sma_20 = df['SMA_20'].iloc[-1]
+        return self.intraday_verdict(ticker, current_price, df['Close'].iloc[-2], df['RSI'].iloc[-1],
+                                     df['SMA_20'].iloc[-1], df['Vol_SMA_10'].iloc[-1], df['Volume'].iloc[-1])
+
+    def intraday_verdict(self, ticker, current_price, prev_close, current_rsi, sma_20, vol_avg, current_vol):
+        """Scalping score from the latest indicator values (shared by the batch and streaming paths)."""
+        last_hourly_change = (current_price - prev_close) / prev_close * 100
         
         if pd.isna(current_rsi) or pd.isna(vol_avg) or vol_avg == 0:
             return None
@@ -202,138 +274,343 @@ class StockScreener:
             'vol_ratio': vol_ratio
         }
 
+    def score_intraday_panel(self, frames, tickers=None):
+        """Vectorized calculate_intraday_score for every ticker in ``frames``."""
+        panel = ie.Panel.from_frames(frames, tickers or self.tickers, fields=('Close', 'Volume'), rows=21)
+        if not len(panel):
+            return []
+        close, volume = panel['Close'], panel['Volume']
+        graph = IndicatorGraph(panel.fields)
+
+        current_rsi = graph['RSI14'][-1]
+        sma_20 = graph['SMA20'][-1]
+        vol_avg = graph['VOL_SMA10'][-1]
+        current_price, prev_close, current_vol = close[-1], close[-2], volume[-1]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            last_hourly_change = (current_price - prev_close) / prev_close * 100
+            vol_ratio = current_vol / vol_avg
+            momentum = (current_rsi >= 45) & (current_rsi <= 85)
+            above_sma = current_price > sma_20
+            green = last_hourly_change > 0
+
+        score = (np.where(vol_ratio > 1.5, 30, np.where(vol_ratio > 1.1, 15, 0))
+                 + 25 * momentum + 20 * above_sma + 20 * green)
+        keep = ~np.isnan(current_rsi) & ~np.isnan(vol_avg) & (vol_avg != 0) & (score >= 35)
+
+        results = []
+        for j in np.flatnonzero(keep):
+            reasons = []
+            if vol_ratio[j] > 1.5: reasons.append(f"🔥 Vol Burst ({vol_ratio[j]:.1f}x)")
+            elif vol_ratio[j] > 1.1: reasons.append(f"Rising Vol ({vol_ratio[j]:.1f}x)")
+            if momentum[j]: reasons.append(f"Momentum ({current_rsi[j]:.0f})")
+            if above_sma[j]: reasons.append("Uptrend")
+            if green[j]: reasons.append(f"Appreciating (+{last_hourly_change[j]:.2f}%)")
+            results.append({
+                'ticker': panel.tickers[j],
+                'price': current_price[j],
+                'score': int(score[j]),
+                'reasons': ", ".join(reasons),
+                'last_hour_change': last_hourly_change[j],
+                'vol_ratio': vol_ratio[j]
+            })
+        return results
+
+    def iter_screen_intraday(self, limit=5, chunk_size=None):
+        """Generator version of screen_intraday.
+
+        Yields after every chunk of tickers is fetched and scored:
+        ``{'done', 'total', 'results', 'top'}`` with the chunk's results and
+        the running top ``limit`` so far.
+        """
+        total = len(self.tickers)
+        top = TopK(limit, key=lambda x: (x['score'], x['last_hour_change']))
+        done = 0
+        for chunk in chunked(self.tickers, chunk_size or progress_chunk_size(total)):
+            # Batched download; frames are split per ticker and cross-checked against mixing
+            frames = self.fetch_hourly_history_many(chunk)
+            results = self.score_intraday_panel(frames, tickers=chunk)
+            top.extend(results)
+            done += len(chunk)
+            yield {'done': done, 'total': total, 'results': results, 'top': top.items()}
+
     def screen_intraday(self):
         """Scans for Intraday Scalping opportunities."""
+        top = []
+        # Sorted by Score (Desc) then by Last Hour Change
+        for update in self.iter_screen_intraday(limit=5):
+            top = update['top']
+        return top
+
+    def screen_intraday_streaming(self, book):
+        """screen_intraday using the persistent per-ticker indicator state in ``book``.
+
+        Each call only folds the hourly bars closed since the previous call
+        into the streaming indicators (see streaming_indicators.IndicatorBook),
+        then checkpoints the state to disk. Tickers with a checkpoint read
+        just the bars from it onwards out of the bar store (which itself only
+        downloads the new tail); the full lookback is read only for tickers
+        whose state has to be rebuilt.
+        """
         results = []
-        
-        # Sequential calls to avoid yfinance data mixing bug
+        frames = {}
+        known = [t for t in self.tickers if t in book.states and book.states[t].last_ts is not None]
+        if known:
+            since = pd.Timestamp(min(book.states[t].last_ts for t in known), unit='s', tz='UTC')
+            try:
+                frames = load_bars_many(known, since, date.today() + timedelta(days=1), interval='1h')
+            except Exception as e:
+                print(f"Batch hourly fetch error: {e}")
+        rebuild = [t for t in self.tickers if not book.continues(t, frames.get(t))]
+        if rebuild:
+            frames.update(self.fetch_hourly_history_many(rebuild))
         for ticker in self.tickers:
-            df = self.fetch_hourly_history(ticker)
-            if df is not None:
-                stats = self.calculate_intraday_score(ticker, df)
+            values = book.advance(ticker, frames.get(ticker))
+            if values and not pd.isna(values['prev_close']):
+                stats = self.intraday_verdict(ticker, **values)
                 if stats:
                     results.append(stats)
+        book.save()
         
-        # Sort by Score (Desc) then by Last Hour Change
         results.sort(key=lambda x: (x['score'], x['last_hour_change']), reverse=True)
         
         return results[:5]
 
+    def iter_screen_market(self, limit=5, chunk_size=None):
+        """Generator version of screen_market; yields progress like iter_screen_intraday."""
+        total = len(self.tickers)
+        top = TopK(limit, key=lambda x: x['score'])
+        done = 0
+        for chunk in chunked(self.tickers, chunk_size or progress_chunk_size(total)):
+            frames = self.fetch_history_many(chunk)
+            # Whole chunk scored as one panel
+            results = self.score_panel(frames, tickers=chunk)
+            top.extend(results)
+            done += len(chunk)
+            yield {'done': done, 'total': total, 'results': results, 'top': top.items()}
+
     def screen_market(self):
         """Scans all tickers and returns top 5."""
-        results = []
-        
-        # Sequential calls to avoid yfinance data mixing bug
-        for ticker in self.tickers:
-            df = self.fetch_history(ticker)
-            if df is not None:
-                stats = self.calculate_score(ticker, df)
-                if stats:
-                    results.append(stats)
-        
-        # Sort by Score (Desc)
-        results.sort(key=lambda x: x['score'], reverse=True)
-        
-        return results[:5]
+        top = []
+        for update in self.iter_screen_market(limit=5):
+            top = update['top']
+        return top
 
-    def get_market_stars(self, limit_tickers=None):
-        """Finds the 'Stars of the Day' (4) and 'Stars of the Month' (2)."""
+    def get_market_stars(self, limit_tickers=None, live=False):
+        """Finds the 'Stars of the Day' (4) and 'Stars of the Month' (2).
+
+        Ranks daily bars in the bar store that are current or newer than the
+        last market snapshot, then that snapshot (even if stale) for the
+        rest; stale stored bars are only used for tickers the snapshot
+        lacks. Nothing is downloaded unless ``live`` is set. Changes are
+        defined as in the snapshot (1d, and since the start of a one-month
+        window).
+        """
         tickers_to_scan = limit_tickers if limit_tickers else self.tickers
-        all_day = []
-        all_month = []
-        
-        for ticker in tickers_to_scan:
-            df = self.fetch_history(ticker)
-            if df is not None and len(df) > 22:
-                # 1D Change
-                c_1d = ((df['Close'].iloc[-1] - df['Close'].iloc[-2]) / df['Close'].iloc[-2]) * 100
-                all_day.append({'ticker': ticker, 'price': df['Close'].iloc[-1], 'change': c_1d})
-                
-                # 30D Change
-                c_30d = ((df['Close'].iloc[-1] - df['Close'].iloc[-22]) / df['Close'].iloc[-22]) * 100
-                all_month.append({'ticker': ticker, 'price': df['Close'].iloc[-1], 'change': c_30d})
-        
-        # Sort and take top N
-        all_day.sort(key=lambda x: x['change'], reverse=True)
-        all_month.sort(key=lambda x: x['change'], reverse=True)
+        snapshot = load_snapshot()
+        stats, taken = {}, 0.0
+        if snapshot is not None:
+            stats = snapshot.by_ticker()
+            try:
+                taken = datetime.fromisoformat(snapshot.last_updated).timestamp()
+            except (TypeError, ValueError):
+                pass
+        rows = stats_from_bar_store(tickers_to_scan, fresh_after=taken)
+        missing = set(tickers_to_scan) - {row['ticker'] for row in rows}
+        rows += [stats[t] for t in tickers_to_scan if t in missing and t in stats]
+        missing -= set(stats)
+        if missing and live:
+            end_date = date.today() + timedelta(days=1)
+            frames = load_bars_many(sorted(missing), end_date - timedelta(days=31), end_date, interval='1d')
+            rows += [row for row in (row_stats(t, df) for t, df in frames.items()) if row is not None]
+        elif missing:
+            rows += stats_from_bar_store([t for t in tickers_to_scan if t in missing])
         
-        return all_day[:4], all_month[:2]
+        # Top N selection without sorting the whole universe
+        ranking = StatsRanking(rows)
+        all_day = [{'ticker': r['ticker'], 'price': r['price'], 'change': r['change_1d']} for r in ranking.top('change_1d', 4)]
+        all_month = [{'ticker': r['ticker'], 'price': r['price'], 'change': r['change_30d']} for r in ranking.top('change_30d', 2)]
+        return all_day, all_month
+
+    def fetch_multibagger_inputs(self, tickers):
+        """Daily history plus latest-session price/volume for a multibagger scan.
+
+        Returns (hist_frames, prices, day_volumes); tickers with under 100
+        daily bars or no intraday data are left out.
+        """
+        end_date = date.today() + timedelta(days=1)
+        with fetch_priority(BACKGROUND):
+            # 1. Historical data for indicators (batched)
+            hist = load_bars_many(tickers, end_date - timedelta(days=366), end_date, interval='1d')
+            hist = {t: df for t, df in hist.items() if len(df) >= 100}
+            # 2. LATEST price separately (unadjusted to match NSE), like period="1d": only from
+            # each ticker's last daily session on (the store extends it on later scans)
+            sessions = {}
+            for ticker, df in hist.items():
+                sessions.setdefault(df.index[-1].date(), []).append(ticker)
+            latest = {}
+            for session, group in sessions.items():
+                latest.update(load_bars_many(group, session, end_date, interval='1m', adjusted=False))
+
+        prices, day_volumes = {}, {}
+        for ticker, df in latest.items():
+            if df.empty:
+                continue
+            session = df[df.index.date == df.index[-1].date()]
+            prices[ticker] = float(session['Close'].iloc[-1])
+            day_volumes[ticker] = float(session['Volume'].sum())
+        return {t: hist[t] for t in prices}, prices, day_volumes
 
-    def get_multibagger_candidates(self, limit=10, strategy="Strong Formula"):
-        """Scans for potential multibaggers using selected strategy heuristic."""
+    def iter_multibagger_candidates(self, limit=10, strategy="Strong Formula", snapshot=None, cpu_workers=None):
+        """Generator version of get_multibagger_candidates.
+
+        Strategies are vectorized rule sets from ``strategies.STRATEGIES``
+        evaluated over chunks of the universe panel; unknown names
+        (e.g. "Strong Formula (Default)") use Strong Formula. Chunks are
+        downloaded and scored concurrently (see screen_pipeline) and an
+        update is yielded as each chunk completes.
+
+        Before any history is downloaded, the strategy's prefilter prunes
+        the universe on the market snapshot (``snapshot`` maps ticker ->
+        stats, default load_universe_stats(); pass {} to skip). Conditions
+        on price moves only apply to the default snapshot once it covers
+        the session being priced; a passed ``snapshot`` is trusted to. Stage
+        counts are kept in ``self.scan_counts`` and in each update.
+        ``cpu_workers`` is passed to iter_pipeline (0 scores inline).
+
+        Survivors are scanned most liquid first (snapshot traded value),
+        so a scan cut short has already covered the names that matter most;
+        ``coverage`` in each update is the fraction of the universe decided
+        so far (pruned or scored). A scan that runs to completion with every
+        chunk scored is stored in SCAN_CACHE for the current bar.
+        """
         import random
-        results = []
         
-        # Shuffle tickers to remove alphabetical bias (A... Z)
-        scan_list = list(self.tickers)
+        current = True
+        if snapshot is None:
+            snapshot = load_universe_stats()
+            current = snapshot_is_current()
+        pruned = {}
+        scan_list = prefilter(strategy, self.tickers, snapshot, pruned, current)
+        counts = {
+            'universe': len(self.tickers),
+            'in_snapshot': sum(1 for t in self.tickers if t in snapshot),
+            'snapshot_pruned': pruned,
+            'history_requested': len(scan_list),
+            'history_pruned': 0,
+            'scored': 0,
+            'failed': 0,
+            'candidates': 0,
+        }
+        self.scan_counts = dict(counts)
+        
+        # Shuffle tickers to remove alphabetical bias (A... Z) among equal scores
         random.shuffle(scan_list)
+        # Stable sort keeps the shuffle among equal (and unknown) liquidity
+        scan_list.sort(key=lambda t: self._liquidity(snapshot.get(t)), reverse=True)
         
-        def process_ticker(ticker):
-            try:
-                # 1. Fetch historical data for indicators
-                hist_df = yf.download(ticker, period="1y", progress=False, auto_adjust=True, threads=False)
-                if hist_df is None or hist_df.empty or len(hist_df) < 100: return None
-                
-                # 2. Fetch LATEST price separately (disable auto-adjust for display price to match NSE)
-                latest_data = yf.download(ticker, period="1d", interval="1m", progress=False, auto_adjust=False, threads=False)
-                if latest_data.empty: return None
-                
-                # Flatten columns if MultiIndex
-                if isinstance(hist_df.columns, pd.MultiIndex): hist_df.columns = hist_df.columns.droplevel('Ticker')
-                if isinstance(latest_data.columns, pd.MultiIndex): latest_data.columns = latest_data.columns.droplevel('Ticker')
-                
-                cur_p = float(latest_data['Close'].iloc[-1])
-                close_hist = hist_df['Close']
-                
-                score = 50 # Base
-                reasons = []
-                
-                # --- Strategy Modules ---
-                if strategy == "CAN SLIM (William O'Neil)":
-                    hi_52 = close_hist.max()
-                    dist_hi = (hi_52 - cur_p) / hi_52
-                    ma50 = close_hist.rolling(window=50).mean().iloc[-1]
-                    ma200 = close_hist.rolling(window=200).mean().iloc[-1]
-                    if cur_p > ma50 > ma200 and dist_hi < 0.20:
-                        score += 40
-                        reasons.append("Institutional Breakout Trend")
-                    else: score -= 20
-                    
-                elif strategy == "Minervini Trend Template":
-                    ma50 = close_hist.rolling(window=50).mean().iloc[-1]
-                    ma150 = close_hist.rolling(window=150).mean().iloc[-1]
-                    ma200 = close_hist.rolling(window=200).mean().iloc[-1]
-                    if cur_p > ma50 > ma150 > ma200:
-                        score += 45
-                        reasons.append("Perfect Stage-2 Alignment")
-                    else: score -= 30
-                    
-                elif strategy == "Low-Cap Moonshot (Beta)":
-                    v_sma = hist_df['Volume'].rolling(window=20).mean().iloc[-1]
-                    v_ratio = latest_data['Volume'].sum() / v_sma if v_sma > 0 else 1.0
-                    if v_ratio > 2.0:
-                        score += 50
-                        reasons.append("High Volume Accumulation")
-                    else: score -= 10
-
-                else: # Strong Formula
-                    ma20 = close_hist.rolling(window=20).mean().iloc[-1]
-                    ma50 = close_hist.rolling(window=50).mean().iloc[-1]
-                    if cur_p > ma20 > ma50:
-                        score += 20
-                        reasons.append("Strong Price Action")
-                    
-                    rsi = self.calculate_rsi(close_hist).iloc[-1]
-                    if 40 < rsi < 70: 
-                        score += 20
-                        reasons.append("Healthy RSI Structure")
+        # Tickers each loaded chunk dropped (short history or no latest session); chunks
+        # are loaded ahead of scoring, so this is only counted once the chunk is consumed
+        chunk_pruned = {}
 
-                return {'ticker': ticker, 'score': score, 'current_price': cur_p, 'reasons': reasons}
-            except:
-                return None
+        def load(chunk):
+            data = self.fetch_multibagger_inputs(chunk)
+            chunk_pruned[tuple(chunk)] = len(chunk) - len(data[0])
+            return data
 
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            raw_results = list(executor.map(process_ticker, scan_list))
-            
-        results = [r for r in raw_results if r is not None and r['score'] >= 60]
-        return sorted(results, key=lambda x: x['score'], reverse=True)[:limit]
+        total = len(scan_list)
+        top = TopK(limit, key=lambda x: x['score'])
+        done = 0
+        # Downloads (I/O threads) feed chunk scoring on worker processes
+        score = partial(score_chunk, strategy)
+        chunks = chunked(scan_list, SCAN_CHUNK_SIZE)
+        complete = True
+        for chunk, results in iter_pipeline(chunks, load, score, cpu_workers=cpu_workers):
+            complete = complete and results is not None
+            pruned_here = chunk_pruned.pop(tuple(chunk), None)
+            if pruned_here is None:
+                # The download itself failed
+                counts['failed'] += len(chunk)
+            else:
+                counts['history_pruned'] += pruned_here
+                counts['failed' if results is None else 'scored'] += len(chunk) - pruned_here
+            results = results or []
+            top.extend(results)
+            done += len(chunk)
+            counts['candidates'] += len(results)
+            # Consumers get a snapshot of the counts, never the dict this scan keeps updating
+            self.scan_counts = dict(counts)
+            coverage = (counts['universe'] - total + done) / counts['universe']
+            yield {'done': done, 'total': total, 'results': results, 'top': top.items(),
+                   'counts': dict(counts), 'coverage': coverage}
+        if complete:
+            SCAN_CACHE.put(get_strategy(strategy).name, self.tickers, limit, top.items(), counts)
+
+    def cached_multibagger_candidates(self, limit=10, strategy="Strong Formula"):
+        """Results of an identical finished scan on the current bar, or None."""
+        entry = SCAN_CACHE.get(get_strategy(strategy).name, self.tickers, limit)
+        if entry is None:
+            return None
+        self.scan_counts = entry['counts'] or {}
+        return entry['results']
+
+    @staticmethod
+    def _liquidity(stats):
+        """Traded value from a snapshot row; 0 when unknown."""
+        if not stats:
+            return 0.0
+        try:
+            value = float(stats.get('price') or 0) * float(stats.get('volume') or 0)
+        except (TypeError, ValueError):
+            return 0.0
+        return value if value == value else 0.0
+
+    def start_multibagger_scan(self, limit=10, strategy="Strong Formula", snapshot=None):
+        """Starts iter_multibagger_candidates in the background and returns its BackgroundScan.
+
+        ``scan.wait(deadline)`` gives the best candidates found within the
+        deadline (see ``coverage``) while the scan keeps refining them.
+        """
+        return BackgroundScan(self.iter_multibagger_candidates(limit, strategy, snapshot))
+
+    def get_multibagger_candidates(self, limit=10, strategy="Strong Formula", snapshot=None, deadline=None,
+                                   cpu_workers=None):
+        """Scans for potential multibaggers using selected strategy heuristic.
+
+        Identical scans on the current bar are served from SCAN_CACHE. With
+        a ``deadline`` (seconds) the best candidates found so far are
+        returned when it passes; the scan itself carries on in the background.
+        """
+        cached = self.cached_multibagger_candidates(limit, strategy)
+        if cached is not None:
+            return cached
+        if deadline is not None:
+            update = self.start_multibagger_scan(limit, strategy, snapshot).wait(deadline)
+            return update['top'] if update else []
+        # Identical scans in other threads (e.g. other dashboard sessions) wait and then hit the cache
+        with SCAN_CACHE.lock(get_strategy(strategy).name, self.tickers):
+            cached = self.cached_multibagger_candidates(limit, strategy)
+            if cached is not None:
+                return cached
+            top = []
+            for update in self.iter_multibagger_candidates(limit, strategy, snapshot, cpu_workers):
+                top = update['top']
+            return top
+
+    def universe_features(self):
+        """StrategyFeatures for self.tickers; build once and reuse across strategies and screens."""
+        hist, prices, day_volumes = self.fetch_multibagger_inputs(list(self.tickers))
+        return StrategyFeatures(hist, prices, day_volumes, tickers=self.tickers)
+
+    def run_custom_screen(self, expression, features=None, limit=25):
+        """Evaluates a user screen such as ``close > sma(50) and rsi(14) < 70``.
+
+        ``expression`` may also be an already compiled ScreenPlan. Raises
+        screen_expr.ScreenSyntaxError for malformed expressions (before any
+        data is loaded). Pass ``features`` to reuse an already built panel.
+        Matches are ranked by their margin on the lead comparison.
+        """
+        plan = compile_screen(expression) if isinstance(expression, str) else expression
+        if features is None:
+            features = self.universe_features()
+        return run_screen(plan, features, limit=limit)
@@ -0,0 +1,195 @@
+import numpy as np
+
+import indicator_engine as ie
+from indicator_graph import IndicatorGraph
+
+
+class Rule:
+    """One vectorized condition: adds ``points`` where it holds, ``otherwise`` where it doesn't."""
+
+    def __init__(self, condition, points, reason=None, otherwise=0):
+        self.condition = condition
+        self.points = points
+        self.reason = reason
+        self.otherwise = otherwise
+
+
+class Strategy:
+    """A named set of rules scored from a common base over the whole universe.
+
+    ``prefilter`` holds (label, condition) pairs over the market snapshot
+    columns (see SNAPSHOT_FIELDS); each must be a necessary condition for
+    reaching ``threshold``, so pruning on them never drops a candidate.
+    The rules compare against the live price and session volume, so these
+    conditions only hold when the snapshot describes that same session
+    (see ``prefilter``).
+    """
+
+    def __init__(self, name, rules, base=50, threshold=60, prefilter=None):
+        self.name = name
+        self.rules = rules
+        self.base = base
+        self.threshold = threshold
+        self.prefilter = prefilter or []
+
+
+STRATEGIES = {}
+
+
+def register(strategy):
+    STRATEGIES[strategy.name] = strategy
+    return strategy
+
+
+def get_strategy(name):
+    """Registered strategy by name; unknown names (e.g. "Strong Formula (Default)") use Strong Formula."""
+    return STRATEGIES.get(name, STRATEGIES["Strong Formula"])
+
+
+# Columns of the market_cache.json ``all_stats`` snapshot usable by prefilters
+SNAPSHOT_FIELDS = ('price', 'change_1d', 'change_5d', 'change_30d', 'volume')
+
+# Applied to every strategy: no snapshot price means no tradable listing
+_BASE_PREFILTER = [("no snapshot price", lambda s: s['price'] > 0)]
+
+
+class StrategyFeatures:
+    """Universe features shared by every strategy evaluated on it.
+
+    Wraps an IndicatorGraph over the daily history panel (right-aligned,
+    so row -1 is each ticker's last daily bar) and exposes the latest row
+    of any graph node, plus the live inputs: ``price`` (latest unadjusted
+    price), ``day_volume`` (volume traded in the latest session) and
+    ``HI_52`` (highest daily close in the history). Each feature is
+    computed once no matter how many strategies use it.
+    """
+
+    def __init__(self, hist_frames, prices, day_volumes, tickers=None):
+        first = next(iter(hist_frames.values()), None)
+        fields = [f for f in ('Open', 'High', 'Low', 'Close', 'Volume') if first is None or f in first.columns]
+        self.panel = ie.Panel.from_frames(hist_frames, tickers, fields=fields)
+        self.tickers = self.panel.tickers
+        self.graph = IndicatorGraph(self.panel.fields)
+        self._values = {
+            'price': np.array([prices[t] for t in self.tickers], dtype='float64'),
+            'day_volume': np.array([day_volumes.get(t, np.nan) for t in self.tickers], dtype='float64'),
+        }
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def __getitem__(self, name):
+        if name not in self._values:
+            if name == 'HI_52':
+                with np.errstate(invalid='ignore'):
+                    self._values[name] = np.nanmax(self.panel['Close'], axis=0)
+            else:
+                self._values[name] = self.graph[name][-1]
+        return self._values[name]
+
+
+def evaluate(strategy, features):
+    """(scores, reasons) for every ticker of ``features`` under ``strategy``."""
+    scores = np.full(len(features), strategy.base)
+    hits = []
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for rule in strategy.rules:
+            mask = np.asarray(rule.condition(features), dtype=bool)
+            scores = scores + np.where(mask, rule.points, rule.otherwise)
+            hits.append(mask)
+    reasons = [[rule.reason for rule, mask in zip(strategy.rules, hits) if rule.reason and mask[j]]
+               for j in range(len(features))]
+    return scores, reasons
+
+
+def run_strategy(strategy, features):
+    """Candidate dicts (ticker, score, current_price, reasons) at or above the strategy threshold."""
+    if isinstance(strategy, str):
+        strategy = STRATEGIES[strategy]
+    if not len(features):
+        return []
+    scores, reasons = evaluate(strategy, features)
+    prices = features['price']
+    return [{'ticker': features.tickers[j], 'score': int(scores[j]),
+             'current_price': float(prices[j]), 'reasons': reasons[j]}
+            for j in np.flatnonzero(scores >= strategy.threshold)]
+
+
+def run_strategies(features, names=None):
+    """Runs several strategies over the same features, sharing every indicator."""
+    return {name: run_strategy(STRATEGIES[name], features) for name in (names or STRATEGIES)}
+
+
+def score_chunk(strategy_name, tickers, data):
+    """Process-pool entry point: runs one strategy over a loaded chunk.
+
+    ``data`` is (hist_frames, prices, day_volumes) as returned by
+    StockScreener.fetch_multibagger_inputs. Unknown names use Strong Formula.
+    """
+    hist_frames, prices, day_volumes = data
+    features = StrategyFeatures(hist_frames, prices, day_volumes, tickers=tickers)
+    return run_strategy(get_strategy(strategy_name), features)
+
+
+def prefilter(strategy, tickers, stats, counts=None, current=True):
+    """Tickers that can still pass ``strategy`` according to the snapshot ``stats``.
+
+    ``stats`` maps ticker -> snapshot row (see load_universe_stats). Tickers
+    without a row are kept, since nothing is known about them. ``current``
+    says the rows describe the session the scan prices from (see
+    fetch_market_data.snapshot_is_current); otherwise only the base
+    prefilter applies, since the strategy's own conditions compare the
+    snapshot against the live price. ``counts`` receives the number pruned
+    by each prefilter condition applied.
+    """
+    if isinstance(strategy, str):
+        strategy = get_strategy(strategy)
+    tickers = list(tickers)
+    counts = counts if counts is not None else {}
+    known = np.array([t in stats for t in tickers], dtype=bool)
+    columns = {field: np.array([stats[t].get(field, np.nan) if t in stats else np.nan for t in tickers],
+                               dtype='float64')
+               for field in SNAPSHOT_FIELDS}
+    keep = np.ones(len(tickers), dtype=bool)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for reason, condition in _BASE_PREFILTER + (strategy.prefilter if current else []):
+            passed = np.asarray(condition(columns), dtype=bool) | ~known
+            counts[reason] = int((keep & ~passed).sum())
+            keep &= passed
+    return [t for t, k in zip(tickers, keep) if k]
+
+
+def _volume_ratio(f):
+    v_sma = f['VOL_SMA20']
+    return np.where(v_sma > 0, f['day_volume'] / v_sma, 1.0)
+
+
+# Strong Formula passes on either rule alone, and Minervini's stage-2 alignment
+# depends on 50-200 day averages that 1/5/30 day changes don't bound, so neither
+# has a snapshot condition that is necessary for reaching its threshold.
+register(Strategy("Strong Formula", [
+    Rule(lambda f: (f['price'] > f['SMA20']) & (f['SMA20'] > f['SMA50']), 20, "Strong Price Action"),
+    Rule(lambda f: (f['RSI14'] > 40) & (f['RSI14'] < 70), 20, "Healthy RSI Structure"),
+]))
+
+def _within_20pct_of_recent_closes(s):
+    # Closes 1/5/30 days ago are at most the 52-week high, so when the snapshot's
+    # last close is the live price, a drop of 20% or more from any of them
+    # already rules out "within 20% of the high"
+    return (s['change_1d'] > -20) & (s['change_5d'] > -20) & (s['change_30d'] > -20)
+
+
+register(Strategy("CAN SLIM (William O'Neil)", [
+    Rule(lambda f: (f['price'] > f['SMA50']) & (f['SMA50'] > f['SMA200'])
+         & ((f['HI_52'] - f['price']) / f['HI_52'] < 0.20),
+         40, "Institutional Breakout Trend", otherwise=-20),
+], prefilter=[("over 20% below a recent close", _within_20pct_of_recent_closes)]))
+
+register(Strategy("Minervini Trend Template", [
+    Rule(lambda f: (f['price'] > f['SMA50']) & (f['SMA50'] > f['SMA150']) & (f['SMA150'] > f['SMA200']),
+         45, "Perfect Stage-2 Alignment", otherwise=-30),
+]))
+
+register(Strategy("Low-Cap Moonshot (Beta)", [
+    Rule(lambda f: _volume_ratio(f) > 2.0, 50, "High Volume Accumulation", otherwise=-10),
+], prefilter=[("no volume in the session", lambda s: s['volume'] > 0)]))
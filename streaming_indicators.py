@@ -0,0 +1,250 @@
+import json
+import os
+
+import numpy as np
+
+from bar_store import _index_to_epoch
+
+
+class RollingWindow:
+    """Fixed-size ring buffer with running sum and sum of squares.
+
+    ``update`` is O(1). The running sums are reset to exactly 0 whenever
+    the window holds only zeros, so a flat stretch gives the same 0 that
+    pandas' rolling mean does instead of a floating point residue.
+    """
+
+    def __init__(self, window, values=()):
+        self.window = window
+        self.count = 0
+        self._buf = [0.0] * window
+        self._pos = 0
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._nonzero = 0
+        for value in values:
+            self.update(value)
+
+    @property
+    def full(self):
+        return self.count == self.window
+
+    def _oldest(self):
+        return self._buf[self._pos] if self.full else 0.0
+
+    def update(self, x):
+        x = float(x)
+        old = self._oldest()
+        self._sum += x - old
+        self._sumsq += x * x - old * old
+        self._nonzero += (x != 0) - (old != 0)
+        if not self._nonzero:
+            self._sum = self._sumsq = 0.0
+        self._buf[self._pos] = x
+        self._pos = (self._pos + 1) % self.window
+        self.count = min(self.count + 1, self.window)
+
+    @property
+    def mean(self):
+        return self._sum / self.window if self.full else None
+
+    def peek_mean(self, x):
+        """Mean the window would have after ``update(x)``, without committing x."""
+        if self.count + 1 < self.window:
+            return None
+        total = self._sum - self._oldest() + float(x)
+        if x == 0 and self._nonzero - (self._oldest() != 0) == 0:
+            total = 0.0
+        return total / self.window
+
+    def std(self, ddof=1):
+        if not self.full or self.window <= ddof:
+            return None
+        var = (self._sumsq - self._sum * self._sum / self.window) / (self.window - ddof)
+        return max(var, 0.0) ** 0.5
+
+    def values(self):
+        """Buffered values, oldest first."""
+        if not self.full:
+            return self._buf[:self.count]
+        return self._buf[self._pos:] + self._buf[:self._pos]
+
+    def to_dict(self):
+        return {'window': self.window, 'values': self.values()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['window'], data['values'])
+
+
+def _rsi(avg_gain, avg_loss):
+    if avg_gain is None or avg_loss is None:
+        return None
+    if avg_loss == 0:
+        # gain/0 is +inf -> 100, 0/0 is undefined (pandas gives NaN)
+        return 100.0 if avg_gain > 0 else None
+    return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+class RollingRSI:
+    """RSI over simple rolling means of gains/losses, as StockScreener.calculate_rsi computes it.
+
+    The first bar counts as a zero change, exactly like ``Series.diff().where(...)``.
+    """
+
+    def __init__(self, period=14, prev=None, gains=None, losses=None):
+        self.period = period
+        self.prev = prev
+        self.gains = gains or RollingWindow(period)
+        self.losses = losses or RollingWindow(period)
+
+    def _change(self, x):
+        change = 0.0 if self.prev is None else float(x) - self.prev
+        return max(change, 0.0), max(-change, 0.0)
+
+    def peek(self, x):
+        gain, loss = self._change(x)
+        return _rsi(self.gains.peek_mean(gain), self.losses.peek_mean(loss))
+
+    def update(self, x):
+        gain, loss = self._change(x)
+        self.gains.update(gain)
+        self.losses.update(loss)
+        self.prev = float(x)
+
+    @property
+    def value(self):
+        return _rsi(self.gains.mean, self.losses.mean)
+
+    def to_dict(self):
+        return {'period': self.period, 'prev': self.prev,
+                'gains': self.gains.to_dict(), 'losses': self.losses.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['period'], data['prev'],
+                   RollingWindow.from_dict(data['gains']), RollingWindow.from_dict(data['losses']))
+
+
+class IntradayState:
+    """Streaming inputs of StockScreener.calculate_intraday_score for one ticker.
+
+    Only closed bars are committed; the bar still forming is evaluated with
+    ``peek`` so its later revisions never corrupt the running state.
+    """
+
+    def __init__(self, last_ts=None, last_close=None, rsi=None, sma_20=None, vol_10=None):
+        self.last_ts = last_ts
+        self.last_close = last_close
+        self.rsi = rsi or RollingRSI(14)
+        self.sma_20 = sma_20 or RollingWindow(20)
+        self.vol_10 = vol_10 or RollingWindow(10)
+
+    def commit(self, ts, close, volume):
+        self.rsi.update(close)
+        self.sma_20.update(close)
+        self.vol_10.update(volume)
+        self.last_ts = ts
+        self.last_close = float(close)
+
+    def peek(self, close, volume):
+        """Indicator values as if the forming bar (close, volume) were the latest one.
+
+        Not-yet-defined indicators come back as NaN, like the pandas path.
+        """
+        values = {
+            'current_price': float(close),
+            'prev_close': self.last_close,
+            'current_rsi': self.rsi.peek(close),
+            'sma_20': self.sma_20.peek_mean(close),
+            'vol_avg': self.vol_10.peek_mean(volume),
+            'current_vol': float(volume),
+        }
+        return {k: float('nan') if v is None else v for k, v in values.items()}
+
+    def to_dict(self):
+        return {'last_ts': self.last_ts, 'last_close': self.last_close, 'rsi': self.rsi.to_dict(),
+                'sma_20': self.sma_20.to_dict(), 'vol_10': self.vol_10.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['last_ts'], data['last_close'], RollingRSI.from_dict(data['rsi']),
+                   RollingWindow.from_dict(data['sma_20']), RollingWindow.from_dict(data['vol_10']))
+
+
+class IndicatorBook:
+    """Per-ticker IntradayState kept across bot cycles and checkpointed to JSON.
+
+    ``advance`` commits only the bars closed since the last cycle, so
+    given just the bars from the checkpointed one onwards (see
+    ``continues``) the per-cycle cost is O(new bars) rather than
+    O(lookback). If the ticker's bars no longer line up with the checkpoint
+    (first run, a gap longer than the fetched history, revised data) the
+    state is rebuilt from the frame once.
+    """
+
+    def __init__(self, path="indicator_state.json"):
+        # Relative paths live next to this module, not in whatever directory the bot was started from
+        self.path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+        self.states = {}
+        self.stats = {'committed': 0, 'rebuilt': 0}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                self.states = {t: IntradayState.from_dict(d) for t, d in json.load(f).items()}
+        except Exception as e:
+            print(f"Error loading indicator state: {e}")
+            self.states = {}
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({t: s.to_dict() for t, s in self.states.items()}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error saving indicator state: {e}")
+
+    @staticmethod
+    def _resume(state, epochs, closes, closed):
+        """Index of the first closed bar after the checkpoint, or None if the bars don't continue it."""
+        if state is None or state.last_ts is None:
+            return None
+        i = int(np.searchsorted(epochs[:closed], state.last_ts))
+        # The checkpointed bar must be there and not have been revised since we committed it
+        if i >= closed or epochs[i] != state.last_ts or closes[i] != state.last_close:
+            return None
+        return i + 1
+
+    def continues(self, ticker, df):
+        """True if ``df`` reaches back to the ticker's checkpointed bar, so ``advance`` needs no rebuild."""
+        if df is None or len(df) < 2:
+            return False
+        closes = df['Close'].to_numpy(dtype='float64')
+        return self._resume(self.states.get(ticker), _index_to_epoch(df.index), closes, len(df) - 1) is not None
+
+    def advance(self, ticker, df):
+        """Commits newly closed bars of ``df`` and returns the peeked values for its last bar."""
+        if df is None or len(df) < 2:
+            return None
+        epochs = _index_to_epoch(df.index)
+        closes = df['Close'].to_numpy(dtype='float64')
+        volumes = df['Volume'].to_numpy(dtype='float64')
+        closed = len(df) - 1  # the last bar may still be forming
+
+        state = self.states.get(ticker)
+        start = self._resume(state, epochs, closes, closed)
+        if start is None:
+            state = IntradayState()
+            start = 0
+            self.stats['rebuilt'] += 1
+
+        for i in range(start, closed):
+            state.commit(int(epochs[i]), closes[i], volumes[i])
+        self.stats['committed'] += closed - start
+        self.states[ticker] = state
+        return state.peek(closes[-1], volumes[-1])
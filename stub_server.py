@@ -0,0 +1,225 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+# Exchange metadata reported in every served chart
+STUB_TZ = 'Asia/Kolkata'
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=15)
+
+
+def build_chart(symbol, df, interval='1d', tz=STUB_TZ):
+    """v8 chart response for an OHLCV frame (naive daily index = exchange-local dates)."""
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is None:
+        index = index.tz_localize(tz)
+        if interval[-1] not in 'mh':
+            # Daily bars are stamped at the session open, as Yahoo does
+            index = index + SESSION_OPEN
+    timestamps = (index.tz_convert('UTC') - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+
+    def column(name):
+        values = df[name].to_numpy(dtype='float64')
+        if np.isnan(values).any():
+            return [None if np.isnan(v) else float(v) for v in values]
+        return values.tolist()
+
+    return {'chart': {'result': [{
+        'meta': {'symbol': symbol, 'currency': 'INR', 'exchangeTimezoneName': tz, 'dataGranularity': interval},
+        'timestamp': np.asarray(timestamps, dtype='int64').tolist(),
+        'indicators': {'quote': [{'open': column('Open'), 'high': column('High'), 'low': column('Low'),
+                                  'close': column('Close'), 'volume': column('Volume')}],
+                       'adjclose': [{'adjclose': column('Close')}]},
+    }], 'error': None}}
+
+
+def _between(payload, period1, period2):
+    """Copy of a chart response keeping bars with period1 <= timestamp < period2."""
+    result = dict(payload['chart']['result'][0])
+    ts = np.asarray(result.get('timestamp') or [], dtype='int64')
+    keep = np.flatnonzero((ts >= period1) & (ts < period2))
+    indicators = result['indicators']
+    result['timestamp'] = ts[keep].tolist()
+    result['indicators'] = {
+        'quote': [{k: [v[i] for i in keep] for k, v in indicators['quote'][0].items()}],
+        'adjclose': [{'adjclose': [indicators['adjclose'][0]['adjclose'][i] for i in keep]}]
+        if indicators.get('adjclose') else [],
+    }
+    return {'chart': {'result': [result], 'error': None}}
+
+
+class ChartStub:
+    """Answers chart requests from recordings, for offline benchmarks and tests.
+
+    Sources, in order: ``<root>/chart/<symbol>.json`` (a recorded chart
+    response), ``<root>/<interval>/<symbol>.csv`` (ReplayProvider/
+    RecordingProvider layout) and, with ``synthetic``, a deterministic daily
+    random walk for any symbol. ``latency`` (seconds, +-50% jitter) and
+    ``fail_rate`` (fraction of 503 answers) emulate a real upstream.
+    """
+
+    def __init__(self, root=None, synthetic=False, latency=0.0, fail_rate=0.0, seed=0):
+        self.root = root
+        self.synthetic = synthetic
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._charts = {}
+        self.stats = {'requests': 0, 'served': 0, 'failed': 0, 'missing': 0}
+
+    def _recorded(self, symbol, interval):
+        key = (symbol, interval)
+        if key not in self._charts:
+            payload = None
+            if self.root:
+                chart_path = os.path.join(self.root, 'chart', f"{symbol}.json")
+                csv_path = os.path.join(self.root, interval, f"{symbol}.csv")
+                if interval == '1d' and os.path.exists(chart_path):
+                    with open(chart_path, "r") as f:
+                        payload = json.load(f)
+                elif os.path.exists(csv_path):
+                    df = pd.read_csv(csv_path, index_col=0)
+                    df.index = pd.to_datetime(df.index, utc=interval[-1] in 'mh')
+                    payload = build_chart(symbol, df, interval)
+            if payload is None and self.synthetic and interval == '1d':
+                payload = build_chart(symbol, synthetic_bars(symbol), interval)
+            self._charts[key] = payload
+        return self._charts[key]
+
+    def chart(self, symbol, period1, period2, interval='1d'):
+        """(HTTP status, payload or None)."""
+        with self._lock:
+            self.stats['requests'] += 1
+            fail = self._random.random() < self.fail_rate
+            delay = self.latency * self._random.uniform(0.5, 1.5)
+        if delay:
+            time.sleep(delay)
+        if fail:
+            with self._lock:
+                self.stats['failed'] += 1
+            return 503, None
+        payload = self._recorded(symbol, interval)
+        with self._lock:
+            self.stats['served' if payload else 'missing'] += 1
+        if payload is None:
+            return 404, None
+        return 200, _between(payload, period1, period2)
+
+
+def synthetic_bars(symbol, years=3):
+    """Deterministic (per symbol) daily random walk over the last ``years`` up to today."""
+    rng = np.random.default_rng(zlib.crc32(symbol.encode('utf-8')))
+    today = pd.Timestamp.today().normalize()
+    index = pd.bdate_range(today - pd.DateOffset(years=years), today)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, len(index))))
+    spread = close * rng.uniform(0.002, 0.02, len(index))
+    return pd.DataFrame({
+        'Open': close - spread * rng.uniform(-1, 1, len(index)), 'High': close + spread,
+        'Low': close - spread, 'Close': close, 'Volume': rng.integers(10_000, 5_000_000, len(index)).astype('float64'),
+    }, index=index)
+
+
+def make_handler(stub):
+    class ChartHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            prefix = '/v8/finance/chart/'
+            if not url.path.startswith(prefix):
+                return self._reply(404, {'chart': {'result': None, 'error': {'code': 'Not Found'}}})
+            query = parse_qs(url.query)
+            try:
+                period1 = int(query.get('period1', ['0'])[0])
+                period2 = int(query.get('period2', [str(int(time.time()) + 86400)])[0])
+            except ValueError:
+                return self._reply(400, {'chart': {'result': None, 'error': {'code': 'Bad Request'}}})
+            status, payload = stub.chart(url.path[len(prefix):], period1, period2, query.get('interval', ['1d'])[0])
+            self._reply(status, payload or {'chart': {'result': None, 'error': {'code': str(status)}}})
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ChartHandler
+
+
+def start_stub(stub, host='127.0.0.1', port=0):
+    """Serves ``stub`` on a daemon thread; returns (server, base_url). Port 0 picks a free one."""
+    server = ThreadingHTTPServer((host, port), make_handler(stub))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def run_benchmark(stub, concurrency=None, chunk_concurrency=None, symbols=None):
+    """Universe refresh (one month of daily bars per symbol) against the stub, into a throwaway bar store."""
+    from async_fetcher import AsyncChartFetcher, load_bars_many_async
+    from bar_store import BarStore
+    from datetime import date, timedelta
+    from fetch_market_data import MarketDataFetcher
+
+    symbols = symbols or MarketDataFetcher().symbols
+    server, base_url = start_stub(stub)
+    try:
+        fetcher = AsyncChartFetcher(base_url=base_url, concurrency=concurrency,
+                                    chunk_concurrency=chunk_concurrency, throttle=False)
+        end_date = date.today() + timedelta(days=1)
+        with tempfile.TemporaryDirectory() as root:
+            frames = load_bars_many_async(symbols, end_date - timedelta(days=31), end_date, '1d',
+                                          store=BarStore(root), fetcher=fetcher)
+        summary = fetcher.summary()
+        summary['frames'] = len(frames)
+        return summary
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local chart API stub for offline fetch tests and benchmarks')
+    parser.add_argument('--root', default=None, help='Recordings directory (chart/*.json or <interval>/*.csv)')
+    parser.add_argument('--synthetic', action='store_true', help='Serve a random walk for unrecorded symbols')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds per response (+-50%% jitter)')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--bench', action='store_true', help='Run a universe refresh against the stub and exit')
+    parser.add_argument('--concurrency', type=int, default=None)
+    parser.add_argument('--chunk-concurrency', type=int, default=None)
+    args = parser.parse_args()
+
+    stub = ChartStub(args.root, args.synthetic, args.latency, args.fail_rate)
+    if args.bench:
+        summary = run_benchmark(stub, args.concurrency, args.chunk_concurrency)
+        for key, value in summary.items():
+            print(f"{key:>14}: {value:.3f}" if isinstance(value, float) else f"{key:>14}: {value}")
+        print(f"{'stub':>14}: {stub.stats}")
+        return
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(stub))
+    print(f"Chart stub on http://{args.host}:{args.port} (STOCKPRO_CHART_URL)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
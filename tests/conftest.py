@@ -0,0 +1,74 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The application modules live flat in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_provider  # noqa: E402
+from data_provider import DataProvider  # noqa: E402
+
+
+def daily_frame(days=60, end=None, start_price=100.0, seed=0):
+    """Deterministic daily OHLCV random walk on business days ending at ``end`` (default today)."""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp(end or pd.Timestamp.today().normalize()), periods=days)
+    close = start_price * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+    index = index.as_unit('ns')
+    index.name = 'Date'
+    return pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                         'Volume': rng.integers(1000, 5000, days).astype('float64')}, index=index)
+
+
+class FrameProvider(DataProvider):
+    """Serves slices of fixed frames ({(ticker, interval): frame}) and records every call."""
+
+    def __init__(self, frames=None):
+        self.frames = frames or {}
+        self.calls = []
+
+    def _slice(self, ticker, start, end, interval):
+        df = self.frames.get((ticker, interval))
+        if df is None:
+            return pd.DataFrame(columns=data_provider.OHLCV)
+        index = df.index
+        lo = pd.Timestamp(start) if start is not None else index[0]
+        hi = pd.Timestamp(end) if end is not None else index[-1] + pd.Timedelta(days=1)
+        if index.tz is not None:
+            lo = lo.tz_localize(index.tz) if lo.tzinfo is None else lo
+            hi = hi.tz_localize(index.tz) if hi.tzinfo is None else hi
+        else:
+            lo = lo.tz_localize(None) if lo.tzinfo is not None else lo
+            hi = hi.tz_localize(None) if hi.tzinfo is not None else hi
+        return df[(index >= lo) & (index < hi)].copy()
+
+    def history(self, ticker, start=None, end=None, interval='1d', period=None, auto_adjust=True):
+        self.calls.append(('history', ticker, start, end, interval))
+        return self._slice(ticker, start, end, interval)
+
+    def history_many(self, tickers, start=None, end=None, interval='1d', period=None, auto_adjust=True):
+        tickers = list(tickers)
+        self.calls.append(('history_many', tuple(tickers), start, end, interval))
+        frames = {t: self._slice(t, start, end, interval) for t in tickers}
+        return {t: df for t, df in frames.items() if not df.empty}
+
+    def info(self, ticker):
+        self.calls.append(('info', ticker))
+        return {'symbol': ticker}
+
+    def news(self, ticker):
+        self.calls.append(('news', ticker))
+        return []
+
+
+@pytest.fixture
+def provider():
+    """Installs a FrameProvider as the process-wide provider for one test."""
+    fake = FrameProvider()
+    previous = data_provider._provider
+    data_provider.set_provider(fake)
+    yield fake
+    data_provider.set_provider(previous)
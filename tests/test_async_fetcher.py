@@ -0,0 +1,149 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+import async_fetcher
+from async_fetcher import AsyncChartFetcher, load_bars_many_async
+from bar_store import BarStore
+from stub_server import ChartStub, start_stub
+
+
+class FlakyStub(ChartStub):
+    """Synthetic stub answering the first ``failures`` requests of every symbol with ``status``."""
+
+    def __init__(self, status, failures=1, **kwargs):
+        super().__init__(synthetic=True, **kwargs)
+        self.status = status
+        self.failures = failures
+        self.seen = {}
+
+    def chart(self, symbol, period1, period2, interval='1d'):
+        with self._lock:
+            self.seen[symbol] = self.seen.get(symbol, 0) + 1
+            fail = self.seen[symbol] <= self.failures
+        if fail:
+            with self._lock:
+                self.stats['requests'] += 1
+                self.stats['failed'] += 1
+            return self.status, None
+        return super().chart(symbol, period1, period2, interval)
+
+
+class MissingStub(ChartStub):
+    """Synthetic stub that does not know the symbols in ``missing`` (HTTP 404)."""
+
+    def __init__(self, missing):
+        super().__init__(synthetic=True)
+        self.missing = set(missing)
+
+    def _recorded(self, symbol, interval):
+        return None if symbol in self.missing else super()._recorded(symbol, interval)
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(stub):
+        server, base_url = start_stub(stub)
+        servers.append(server)
+        return base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    """Records backoff delays instead of sleeping them."""
+    delays = []
+    sleep = asyncio.sleep
+
+    async def fake_sleep(delay, *args, **kwargs):
+        delays.append(delay)
+        await sleep(0)
+
+    monkeypatch.setattr(async_fetcher.asyncio, 'sleep', fake_sleep)
+    return delays
+
+
+def month_window():
+    end = date.today() + timedelta(days=1)
+    return end - timedelta(days=31), end
+
+
+def test_chunks_and_summary(serve):
+    stub = ChartStub(synthetic=True)
+    fetcher = AsyncChartFetcher(base_url=serve(stub), concurrency=4, chunk_concurrency=2, throttle=False)
+    symbols = [f"S{i}.NS" for i in range(7)]
+    frames = fetcher.fetch_many(symbols, *month_window(), chunk_size=3)
+
+    assert sorted(frames) == symbols
+    assert all(len(df) > 15 for df in frames.values())
+    assert sorted(c['symbols'] for c in fetcher.metrics['chunks']) == [1, 3, 3]
+    summary = fetcher.summary()
+    assert summary['chunks'] == 3
+    assert summary['symbols'] == summary['ok'] == 7
+    assert summary['failed'] == summary['retries'] == 0
+    assert summary['symbols_per_s'] > 0
+    assert 0 < summary['chunk_p50_s'] <= summary['chunk_p95_s'] <= summary['chunk_max_s']
+    assert stub.stats['requests'] == 7
+
+
+@pytest.mark.parametrize('status', [429, 503])
+def test_retryable_status_is_retried_with_backoff(serve, no_backoff, status):
+    stub = FlakyStub(status, failures=2)
+    fetcher = AsyncChartFetcher(base_url=serve(stub), throttle=False, retries=3)
+    frames = fetcher.fetch_many(['A.NS', 'B.NS'], *month_window())
+
+    assert sorted(frames) == ['A.NS', 'B.NS']
+    assert fetcher.summary()['retries'] == 4
+    assert stub.stats['requests'] == 6
+    # Full jitter: attempt n waits up to BACKOFF_BASE * 2**n
+    assert len(no_backoff) == 4
+    assert all(0 <= d <= async_fetcher.BACKOFF_BASE * 2 for d in no_backoff)
+
+
+def test_retries_give_up(serve, no_backoff):
+    stub = FlakyStub(503, failures=10)
+    fetcher = AsyncChartFetcher(base_url=serve(stub), throttle=False, retries=2)
+    frames = fetcher.fetch_many(['A.NS'], *month_window())
+
+    assert frames == {}
+    assert stub.stats['requests'] == 3
+    assert fetcher.summary()['failed'] == 1
+
+
+def test_not_found_is_not_retried(serve, no_backoff):
+    stub = MissingStub(['GONE.NS'])
+    fetcher = AsyncChartFetcher(base_url=serve(stub), throttle=False)
+    frames = fetcher.fetch_many(['A.NS', 'GONE.NS'], *month_window())
+
+    assert frames['GONE.NS'] is None
+    assert not frames['A.NS'].empty
+    assert stub.stats['requests'] == 2
+    assert no_backoff == []
+    assert fetcher.summary()['failed'] == 1
+
+
+def test_unknown_symbols_are_not_refetched(serve, tmp_path):
+    stub = MissingStub(['GONE1.NS', 'GONE2.NS'])
+    fetcher = AsyncChartFetcher(base_url=serve(stub), throttle=False)
+    store = BarStore(str(tmp_path))
+    symbols = ['A.NS', 'GONE1.NS', 'GONE2.NS']
+
+    first = load_bars_many_async(symbols, *month_window(), store=store, fetcher=fetcher)
+    assert sorted(first) == ['A.NS']
+    assert stub.stats['requests'] == 3
+
+    second = load_bars_many_async(symbols, *month_window(), store=store, fetcher=fetcher)
+    assert sorted(second) == ['A.NS']
+    assert stub.stats['requests'] == 3
+
+
+def test_live_engine_refuses_replay_provider(monkeypatch):
+    monkeypatch.setenv('STOCKPRO_DATA_PROVIDER', 'replay:/tmp/recordings')
+    with pytest.raises(ValueError):
+        AsyncChartFetcher()
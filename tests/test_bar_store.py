@@ -0,0 +1,137 @@
+import time
+from datetime import timedelta
+
+import pandas as pd
+
+from bar_store import BarStore, load_bars, load_bars_many
+from tests.conftest import daily_frame
+
+
+def window(days=30):
+    end = pd.Timestamp.today().normalize() + timedelta(days=1)
+    return end - timedelta(days=days), end
+
+
+def age_fetch(store, ticker, seconds, interval='1d'):
+    """Pretends the last fetch of a series happened ``seconds`` ago."""
+    meta = store.load_meta(ticker, interval)
+    meta['fetched_at'] -= seconds
+    store._write_meta(ticker, interval, meta)
+
+
+def test_plan_requests_full_window_for_unknown_series(tmp_path):
+    store = BarStore(str(tmp_path))
+    start, end = window()
+    assert store.plan('A.NS', '1d', start, end) == (start, end)
+
+
+def test_fresh_series_needs_no_download(tmp_path):
+    store = BarStore(str(tmp_path))
+    start, end = window()
+    df = daily_frame(40)
+    assert store.update('A.NS', '1d', df, start, end)
+    assert store.plan('A.NS', '1d', start, end) is None
+    stored = store.read('A.NS', '1d', start, end)
+    pd.testing.assert_frame_equal(stored, df[df.index >= start], check_freq=False)
+
+
+def test_stale_series_requests_only_the_tail(tmp_path):
+    store = BarStore(str(tmp_path))
+    start, end = window()
+    df = daily_frame(40)
+    store.update('A.NS', '1d', df, start, end)
+    meta = store.load_meta('A.NS', '1d')
+    meta['based_at'] = time.time()
+    store._write_meta('A.NS', '1d', meta)
+    age_fetch(store, 'A.NS', 2 * 3600)
+
+    tail_start, tail_end = store.plan('A.NS', '1d', start + timedelta(days=5), end)
+    # Restarts at the last stored bar so a partial bar is refreshed
+    assert tail_start == df.index[-1]
+    assert tail_end == end
+
+
+def test_update_keeps_history_and_takes_the_tail_as_authoritative(tmp_path):
+    store = BarStore(str(tmp_path))
+    start, end = window()
+    df = daily_frame(40)
+    store.update('A.NS', '1d', df.iloc[:-1], start, end - timedelta(days=1))
+
+    revised = df.iloc[-2:].copy()
+    revised.loc[revised.index[0], 'Close'] = 1.0
+    store.update('A.NS', '1d', revised, revised.index[0], end)
+
+    stored = store.read('A.NS', '1d')
+    assert len(stored) == len(df)
+    assert stored['Close'].iloc[-2] == 1.0
+    assert stored['Close'].iloc[-1] == df['Close'].iloc[-1]
+    assert stored['Close'].iloc[0] == df['Close'].iloc[0]
+    meta = store.load_meta('A.NS', '1d')
+    assert pd.Timestamp(meta['end']) == end
+
+
+def test_empty_download_records_the_fetch(tmp_path):
+    store = BarStore(str(tmp_path))
+    start, end = window()
+    store.update('A.NS', '1d', daily_frame(40), start, end)
+    later = end + timedelta(days=3)
+    assert not store.update('A.NS', '1d', None, end, later)
+    assert pd.Timestamp(store.load_meta('A.NS', '1d')['end']) == later
+    assert store.plan('A.NS', '1d', start, later) is None
+
+
+def test_unknown_symbol_is_tombstoned(tmp_path):
+    store = BarStore(str(tmp_path))
+    start, end = window()
+    assert not store.update('GONE.NS', '1d', None, start, end)
+    assert store.plan('GONE.NS', '1d', start, end) is None
+    assert store.read('GONE.NS', '1d', start, end).empty
+    # Real bars replace the tombstone
+    assert store.update('GONE.NS', '1d', daily_frame(40), start, end)
+    assert len(store.read('GONE.NS', '1d', start, end)) > 15
+
+
+def test_load_bars_downloads_once_then_reads_from_disk(tmp_path, provider):
+    store = BarStore(str(tmp_path))
+    provider.frames[('A.NS', '1d')] = daily_frame(60)
+    start, end = window()
+    first = load_bars('A.NS', start, end, store=store)
+    second = load_bars('A.NS', start, end, store=store)
+    assert len(provider.calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_load_bars_many_batches_only_stale_tickers(tmp_path, provider):
+    store = BarStore(str(tmp_path))
+    for seed, ticker in enumerate(['A.NS', 'B.NS', 'C.NS']):
+        provider.frames[(ticker, '1d')] = daily_frame(60, seed=seed)
+    start, end = window()
+    load_bars('A.NS', start, end, store=store)
+    provider.calls.clear()
+
+    frames = load_bars_many(['A.NS', 'B.NS', 'C.NS', 'GONE.NS'], start, end, store=store)
+    assert sorted(frames) == ['A.NS', 'B.NS', 'C.NS']
+    assert [c[1] for c in provider.calls] == [('B.NS', 'C.NS', 'GONE.NS')]
+
+    provider.calls.clear()
+    load_bars_many(['A.NS', 'B.NS', 'C.NS', 'GONE.NS'], start, end, store=store)
+    assert provider.calls == []
+
+
+def test_weekly_bars_reuse_the_stored_daily_series(tmp_path, provider):
+    store = BarStore(str(tmp_path))
+    provider.frames[('A.NS', '1d')] = daily_frame(120)
+    end = pd.Timestamp.today().normalize() + timedelta(days=1)
+    # A mid-week start rounds down to Monday, which precedes the stored daily start
+    start = end - timedelta(days=60)
+    while start.weekday() in (0, 5, 6):
+        start += timedelta(days=1)
+    load_bars('A.NS', start, end, store=store)
+    provider.calls.clear()
+
+    weekly = load_bars('A.NS', start, end, interval='1wk', store=store)
+    assert provider.calls == []
+    assert (weekly.index.weekday == 0).all()
+    monthly = load_bars('A.NS', start, end, interval='1mo', store=store)
+    assert provider.calls == []
+    assert (monthly.index.day == 1).all()
@@ -0,0 +1,133 @@
+import threading
+import time
+
+import pytest
+
+from data_provider import CoalescingProvider
+from fetch_scheduler import BACKGROUND, INTERACTIVE, TRADING, FetchScheduler, fetch_priority
+from tests.conftest import FrameProvider
+
+
+def drained(rate=20.0, burst=1):
+    scheduler = FetchScheduler(rate=rate, burst=burst)
+    scheduler._tokens = 0.0
+    return scheduler
+
+
+def wait_queued(scheduler, n, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while len(scheduler._queue) < n:
+        assert time.monotonic() < deadline, 'waiters never queued'
+        time.sleep(0.005)
+
+
+def start(target, *args):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_interactive_overtakes_queued_background():
+    scheduler = drained()
+    order = []
+
+    def take(priority, name):
+        scheduler.acquire(priority)
+        order.append(name)
+
+    threads = [start(take, BACKGROUND, 'background'), start(take, TRADING, 'trading')]
+    wait_queued(scheduler, 2)
+    threads.append(start(take, INTERACTIVE, 'interactive'))
+    for thread in threads:
+        thread.join(5)
+    assert order == ['interactive', 'trading', 'background']
+    assert scheduler.stats['granted'] == [1, 1, 1]
+
+
+def test_batch_waits_for_its_whole_cost():
+    scheduler = FetchScheduler(rate=50.0, burst=2)
+    started = time.monotonic()
+    scheduler.acquire(BACKGROUND, cost=6)
+    # 2 tokens in the bucket, the other 4 refill at 50/s
+    assert time.monotonic() - started >= 0.07
+    assert scheduler._tokens < 1
+
+
+def test_interactive_goes_on_a_single_token():
+    scheduler = FetchScheduler(rate=1.0, burst=3)
+    started = time.monotonic()
+    scheduler.acquire(INTERACTIVE, cost=5)
+    assert time.monotonic() - started < 0.5
+    assert scheduler._tokens < 0
+
+
+class SlowProvider(FrameProvider):
+    def __init__(self, delay=0.1):
+        super().__init__()
+        self.delay = delay
+
+    def history(self, ticker, *args, **kwargs):
+        time.sleep(self.delay)
+        return super().history(ticker, *args, **kwargs)
+
+
+def test_coalesced_callers_spend_no_tokens():
+    scheduler = FetchScheduler(rate=1000.0, burst=10)
+    inner = SlowProvider()
+    provider = CoalescingProvider(inner, scheduler)
+    threads = [start(provider.history, 'A.NS') for _ in range(5)]
+    for thread in threads:
+        thread.join(5)
+    assert len(inner.calls) == 1
+    assert sum(scheduler.stats['granted']) == 1
+    assert provider.flight.stats == {'calls': 1, 'shared': 4}
+
+
+def test_interactive_follower_promotes_the_leader():
+    scheduler = drained(rate=10.0)
+    inner = SlowProvider(delay=0)
+    provider = CoalescingProvider(inner, scheduler)
+    order = []
+
+    def trading():
+        scheduler.acquire(TRADING)
+        order.append('trading')
+
+    def background_fetch():
+        with fetch_priority(BACKGROUND):
+            provider.history('A.NS')
+        order.append('coalesced')
+
+    threads = [start(trading)]
+    wait_queued(scheduler, 1)
+    threads.append(start(background_fetch))
+    wait_queued(scheduler, 2)
+    threads.append(start(provider.history, 'A.NS'))
+    for thread in threads:
+        thread.join(5)
+    assert order == ['coalesced', 'trading']
+    assert scheduler.stats['granted'] == [1, 1, 0]
+    assert len(inner.calls) == 1
+
+
+def test_leader_error_reaches_followers():
+    class Failing(SlowProvider):
+        def history(self, ticker, *args, **kwargs):
+            time.sleep(self.delay)
+            raise RuntimeError('upstream down')
+
+    provider = CoalescingProvider(Failing(), FetchScheduler(rate=1000.0, burst=10))
+    errors = []
+
+    def call():
+        try:
+            provider.history('A.NS')
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [start(call) for _ in range(3)]
+    for thread in threads:
+        thread.join(5)
+    assert errors == ['upstream down'] * 3
+    with pytest.raises(RuntimeError):
+        provider.history('A.NS')
@@ -0,0 +1,108 @@
+import json
+
+import numpy as np
+import pytest
+
+from market_snapshot import (FORMAT_VERSION, HEADER, MAGIC, Snapshot, SnapshotError, load_snapshot,
+                             read_header, read_snapshot, write_json_export, write_snapshot)
+
+ROWS = [
+    {'ticker': 'A.NS', 'price': 101.5, 'change_1d': 1.2, 'change_5d': -3.0, 'change_30d': 12.5, 'volume': 120000},
+    {'ticker': 'B.NS', 'price': 55.0, 'change_1d': -0.4, 'change_5d': 2.0, 'change_30d': -8.0, 'volume': 9000},
+    {'ticker': 'C.NS', 'price': 2400.0, 'change_1d': 0.0, 'change_5d': 0.5, 'change_30d': 4.0, 'volume': 3500000},
+]
+
+
+def write(path, rows=ROWS, last_updated='2024-03-05T15:30:00'):
+    snapshot = Snapshot.from_rows(rows, last_updated)
+    write_snapshot(snapshot, str(path))
+    return snapshot
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'snap.bin'
+    written = write(path)
+    snapshot = read_snapshot(str(path))
+    assert snapshot.rows() == ROWS
+    assert snapshot.last_updated == '2024-03-05T15:30:00'
+    assert snapshot.generation == written.generation
+    assert snapshot.columns['volume'].dtype == np.dtype('<i8')
+
+
+def test_header(tmp_path):
+    path = tmp_path / 'snap.bin'
+    written = write(path)
+    version, generation, created, rows = read_header(str(path))
+    assert (version, generation, rows) == (FORMAT_VERSION, written.generation, len(ROWS))
+    assert created > 0
+
+
+def test_empty_snapshot(tmp_path):
+    path = tmp_path / 'snap.bin'
+    write(path, rows=[])
+    snapshot = read_snapshot(str(path))
+    assert len(snapshot) == 0 and snapshot.rows() == []
+
+
+def rewrite_header(path, **fields):
+    data = bytearray(path.read_bytes())
+    magic, version, reserved, generation, created, rows, meta_len = HEADER.unpack_from(data)
+    values = dict(magic=magic, version=version, reserved=reserved, generation=generation,
+                  created=created, rows=rows, meta_len=meta_len)
+    values.update(fields)
+    HEADER.pack_into(data, 0, *values.values())
+    path.write_bytes(bytes(data))
+
+
+def test_newer_format_is_refused(tmp_path):
+    path = tmp_path / 'snap.bin'
+    write(path)
+    rewrite_header(path, version=FORMAT_VERSION + 1)
+    assert read_header(str(path))[0] == FORMAT_VERSION + 1
+    with pytest.raises(SnapshotError, match='newer than supported'):
+        read_snapshot(str(path))
+
+
+def test_foreign_file_is_refused(tmp_path):
+    path = tmp_path / 'snap.bin'
+    write(path)
+    rewrite_header(path, magic=b'NOTSNAP\x00')
+    for reader in (read_header, read_snapshot):
+        with pytest.raises(SnapshotError, match='Not a market snapshot'):
+            reader(str(path))
+
+
+def test_truncated_file_is_refused(tmp_path):
+    path = tmp_path / 'snap.bin'
+    write(path)
+    data = path.read_bytes()
+    path.write_bytes(data[:-8])
+    with pytest.raises(SnapshotError, match='columns'):
+        read_snapshot(str(path))
+    path.write_bytes(data[:HEADER.size - 1])
+    with pytest.raises(SnapshotError, match='header'):
+        read_header(str(path))
+
+
+def test_load_snapshot_parses_once_per_generation(tmp_path):
+    path, json_path = tmp_path / 'snap.bin', tmp_path / 'missing.json'
+    write(path)
+    first = load_snapshot(str(path), str(json_path))
+    assert load_snapshot(str(path), str(json_path)) is first
+
+    write(path, rows=ROWS[:2])
+    second = load_snapshot(str(path), str(json_path))
+    assert second is not first
+    assert second.tickers == ['A.NS', 'B.NS']
+
+
+def test_load_snapshot_falls_back_to_json_export(tmp_path):
+    json_path = tmp_path / 'cache.json'
+    write_json_export(Snapshot.from_rows(ROWS, '2024-03-05T15:30:00'), str(json_path), top_n=2)
+    export = json.loads(json_path.read_text())
+    assert [row['ticker'] for row in export['top_gainers_1d']] == ['A.NS', 'C.NS']
+
+    snapshot = load_snapshot(str(tmp_path / 'none.bin'), str(json_path))
+    assert snapshot.rows() == ROWS
+    assert load_snapshot(str(tmp_path / 'none.bin'), str(json_path)) is snapshot
+    assert load_snapshot(str(tmp_path / 'none.bin'), str(tmp_path / 'none.json')) is None
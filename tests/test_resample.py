@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from resample import MARKET_TZ, can_resample, resample_ohlcv
+
+
+def minute_bars(day='2024-03-05', first='09:00', last='15:40', tz=MARKET_TZ):
+    """One bar per minute; Close counts minutes so aggregates are easy to check."""
+    index = pd.date_range(f'{day} {first}', f'{day} {last}', freq='1min', tz=MARKET_TZ)
+    if tz != MARKET_TZ:
+        index = index.tz_convert(tz)
+    n = len(index)
+    values = np.arange(n, dtype='float64')
+    return pd.DataFrame({'Open': values, 'High': values + 0.5, 'Low': values - 0.5,
+                         'Close': values, 'Volume': np.ones(n)}, index=index)
+
+
+def test_hourly_bins_are_anchored_at_the_open():
+    hourly = resample_ohlcv(minute_bars(), '1h')
+    assert [t.strftime('%H:%M') for t in hourly.index] == \
+        ['09:15', '10:15', '11:15', '12:15', '13:15', '14:15', '15:15']
+    # The last bin stops at the 15:30 close
+    assert hourly['Volume'].tolist() == [60] * 6 + [15]
+    assert hourly.index.name == 'Datetime'
+
+
+def test_out_of_session_bars_are_dropped():
+    df = minute_bars()
+    bars = resample_ohlcv(df, '15m')
+    assert bars['Volume'].sum() == 375
+    first = df.loc[df.index >= pd.Timestamp('2024-03-05 09:15', tz=MARKET_TZ)].iloc[0]
+    assert bars['Open'].iloc[0] == first['Open']
+
+
+def test_ohlc_aggregation():
+    bars = resample_ohlcv(minute_bars(first='09:15', last='09:44'), '30m')
+    assert len(bars) == 1
+    row = bars.iloc[0]
+    assert (row['Open'], row['High'], row['Low'], row['Close'], row['Volume']) == (0, 29.5, -0.5, 29, 30)
+
+
+def test_utc_source_is_binned_in_market_time():
+    local = resample_ohlcv(minute_bars(), '1h')
+    utc = resample_ohlcv(minute_bars(tz='UTC'), '1h')
+    pd.testing.assert_frame_equal(local, utc)
+
+
+def test_daily_bars_use_the_naive_session_date():
+    df = pd.concat([minute_bars('2024-03-04'), minute_bars('2024-03-05')])
+    daily = resample_ohlcv(df, '1d')
+    assert list(daily.index) == [pd.Timestamp('2024-03-04'), pd.Timestamp('2024-03-05')]
+    assert daily.index.tz is None
+
+
+def test_weekly_and_monthly_labels():
+    index = pd.bdate_range('2024-01-24', '2024-02-09')
+    df = pd.DataFrame({'Open': 1.0, 'High': 2.0, 'Low': 0.5, 'Close': 1.5, 'Volume': 10.0}, index=index)
+    weekly = resample_ohlcv(df, '1wk')
+    assert [t.strftime('%Y-%m-%d') for t in weekly.index] == ['2024-01-22', '2024-01-29', '2024-02-05']
+    assert weekly['Volume'].tolist() == [30.0, 50.0, 50.0]
+    monthly = resample_ohlcv(df, '1mo')
+    assert [t.strftime('%Y-%m-%d') for t in monthly.index] == ['2024-01-01', '2024-02-01']
+
+
+def test_unsupported_interval():
+    with pytest.raises(ValueError):
+        resample_ohlcv(minute_bars(), '3d')
+
+
+@pytest.mark.parametrize('source, target, expected', [
+    ('1m', '5m', True), ('5m', '15m', True), ('15m', '60m', True), ('15m', '90m', True),
+    ('2m', '5m', False), ('5m', '1d', True), ('1d', '1wk', True), ('1wk', '1mo', False), ('1d', '1d', True),
+])
+def test_can_resample(source, target, expected):
+    assert can_resample(source, target) is expected
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_screener import StockScreener
+from tests.conftest import daily_frame
+
+
+def universe():
+    frames = {f'S{i}.NS': daily_frame(120, seed=i) for i in range(20)}
+    # Volume spike, overbought run, falling knife, flat prices (no losses) and a short history
+    frames['S0.NS'].iloc[-1, frames['S0.NS'].columns.get_loc('Volume')] *= 10
+    frames['S1.NS']['Close'] = np.linspace(100, 200, 120)
+    frames['S2.NS']['Close'] = np.linspace(200, 100, 120)
+    frames['S3.NS']['Close'] = 100.0
+    frames['S4.NS'] = frames['S4.NS'].iloc[-40:]
+    frames['S5.NS']['Volume'] = 0.0
+    return frames
+
+
+def test_score_panel_matches_calculate_score():
+    frames = universe()
+    screener = StockScreener(list(frames))
+    expected = [screener.calculate_score(t, df.copy()) for t, df in frames.items()]
+    expected = [r for r in expected if r is not None]
+
+    results = screener.score_panel(frames)
+    assert [r['ticker'] for r in results] == [r['ticker'] for r in expected]
+    for got, want in zip(results, expected):
+        assert got['score'] == want['score'], got['ticker']
+        assert got['reasons'] == want['reasons'], got['ticker']
+        for field in ('price', 'rsi', 'change_pct'):
+            assert got[field] == pytest.approx(want[field], rel=1e-9, nan_ok=True), (got['ticker'], field)
+
+
+def test_score_panel_leaves_frames_untouched():
+    frames = universe()
+    before = {t: df.copy() for t, df in frames.items()}
+    StockScreener(list(frames)).score_panel(frames)
+    for ticker, df in frames.items():
+        pd.testing.assert_frame_equal(df, before[ticker])
+
+
+def test_score_panel_follows_requested_tickers():
+    frames = universe()
+    screener = StockScreener(list(frames))
+    picked = ['S9.NS', 'S7.NS', 'MISSING.NS']
+    assert [r['ticker'] for r in screener.score_panel(frames, picked)] == ['S9.NS', 'S7.NS']
+    assert screener.score_panel({}) == []
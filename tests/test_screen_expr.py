@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from screen_expr import ScreenSyntaxError, compile_screen, run_screen
+from strategies import StrategyFeatures
+
+
+def make_features(closes, bars=60):
+    """Universe where each ticker trades flat at 100 and closes its last bar at ``closes[ticker]``."""
+    index = pd.bdate_range('2025-01-01', periods=bars)
+    frames = {}
+    for ticker, last in closes.items():
+        close = np.full(bars, 100.0)
+        close[-1] = last
+        frames[ticker] = pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close,
+                                       'Volume': np.full(bars, 1000.0)}, index=index)
+    return StrategyFeatures(frames, dict(closes), {t: 1000.0 for t in closes})
+
+
+def matches(text, features):
+    mask, _, _ = compile_screen(text).evaluate(features)
+    return [t for t, hit in zip(features.tickers, mask) if hit]
+
+
+def test_arithmetic_precedence():
+    plan = compile_screen("close > 1 + 2 * 3")
+    assert plan.root == ('cmp', '>', ('field', 'Close'),
+                         ('arith', '+', ('num', 1.0), ('arith', '*', ('num', 2.0), ('num', 3.0))))
+    assert compile_screen("close > (1 + 2) * 3").root[3][1] == '*'
+    features = make_features({'A.NS': 6.0, 'B.NS': 8.0})
+    assert matches("close > 1 + 2 * 3", features) == ['B.NS']
+    assert matches("close > 10 - 2 - 1", features) == ['B.NS']
+
+
+def test_and_binds_tighter_than_or_and_not_tighter_than_and():
+    assert compile_screen("close > 1 or close > 2 and close > 3").root[0] == 'or'
+    root = compile_screen("not close > 1 and close > 2").root
+    assert root[0] == 'and' and root[1][0] == 'not'
+
+
+def test_boolean_combinations():
+    features = make_features({'A.NS': 90.0, 'B.NS': 100.0, 'C.NS': 110.0})
+    assert matches("close > 95 and close < 105", features) == ['B.NS']
+    assert matches("close < 95 or close > 105", features) == ['A.NS', 'C.NS']
+    assert matches("not close > 95", features) == ['A.NS']
+    assert matches("not (close < 95 or close > 105)", features) == ['B.NS']
+    assert matches("close between 95 and 110", features) == ['B.NS', 'C.NS']
+    # Chained comparisons mean what they do in Python
+    assert matches("120 > close > 95", features) == ['B.NS', 'C.NS']
+
+
+def test_unknown_names_are_rejected():
+    with pytest.raises(ScreenSyntaxError, match=r"Unknown name 'foo' at position 8"):
+        compile_screen("close > foo")
+    with pytest.raises(ScreenSyntaxError, match=r"sma\(\) takes a series field, not 'price' at position 4"):
+        compile_screen("sma(price, 5) > 1")
+
+
+@pytest.mark.parametrize('text, message', [
+    ("close >", "Unexpected end of screen at position 7"),
+    ("close > sma(50))", "Unexpected ')' at position 15"),
+    ("close $ 3", "Unexpected character '$' at position 6"),
+    ("sma(2.5) > 1", "sma() period must be a positive whole number at position 4"),
+    ("close > sma(50", "Expected ')' but found end of screen at position 14"),
+])
+def test_syntax_errors_report_position(text, message):
+    with pytest.raises(ScreenSyntaxError) as error:
+        compile_screen(text)
+    assert str(error.value) == message
+
+
+def test_screen_must_be_a_condition():
+    with pytest.raises(ScreenSyntaxError, match="must be a condition"):
+        compile_screen("close + 1")
+    with pytest.raises(ScreenSyntaxError, match="Empty screen"):
+        compile_screen("  ")
+
+
+def test_matches_are_ranked_by_margin_on_the_lead_comparison():
+    features = make_features({'A.NS': 101.0, 'B.NS': 130.0, 'C.NS': 90.0, 'D.NS': 110.0})
+    results = run_screen("close > 100 and rsi(14) >= 0", features)
+    assert [r['ticker'] for r in results] == ['B.NS', 'D.NS', 'A.NS']
+    assert [r['score'] for r in results] == [30.0, 10.0, 1.0]
+    assert run_screen("close > 100", features, limit=2)[1]['ticker'] == 'D.NS'
+
+    # "<" ranks the furthest below first
+    below = run_screen("close < 120", features)
+    assert [r['ticker'] for r in below] == ['C.NS', 'A.NS', 'D.NS']
+
+
+def test_screen_without_ordering_comparison_keeps_universe_order():
+    features = make_features({'A.NS': 101.0, 'B.NS': 130.0})
+    results = run_screen("not close < 100", features)
+    assert [r['ticker'] for r in results] == ['A.NS', 'B.NS']
+    assert all(r['score'] == 0.0 for r in results)
+
+
+def test_common_subexpressions_are_evaluated_once():
+    plan = compile_screen("close > sma(20) and sma(20) > sma(50) and close > sma(50)")
+    assert [step for step in plan.steps if step[0] == 'call'] == [
+        ('call', 'sma', ('field', 'Close'), 20), ('call', 'sma', ('field', 'Close'), 50)]
@@ -0,0 +1,102 @@
+import glob
+import os
+import time
+
+import pytest
+
+import shard_scan
+from shard_scan import ShardDirectory, make_jobs, merge_top, shard_of, split_universe
+
+TICKERS = [f'S{i}.NS' for i in range(50)]
+
+
+def expire(path, seconds=3600):
+    old = time.time() - seconds
+    os.utime(path, (old, old))
+
+
+def files(scan_dir, pattern):
+    return sorted(os.path.basename(p) for p in glob.glob(os.path.join(scan_dir, pattern)))
+
+
+@pytest.fixture
+def queue(tmp_path):
+    directory = ShardDirectory(str(tmp_path))
+    scan_id = directory.submit('multibagger', TICKERS, shards=2)
+    return directory, os.path.join(str(tmp_path), scan_id)
+
+
+def test_universe_split_is_stable_and_complete():
+    parts = split_universe(TICKERS, 4)
+    assert sorted(t for part in parts for t in part) == sorted(TICKERS)
+    assert all(shard_of(t, 4) == i for i, part in enumerate(parts) for t in part)
+    jobs = make_jobs('market', TICKERS, 4)
+    assert {job['limit'] for job in jobs} == {5}
+    with pytest.raises(ValueError):
+        make_jobs('unknown', TICKERS, 4)
+
+
+def test_merge_top_keeps_the_global_best():
+    shards = [[{'ticker': 'A', 'score': 90}, {'ticker': 'B', 'score': 60}], [{'ticker': 'C', 'score': 80}], None]
+    assert [r['ticker'] for r in merge_top(shards, 2)] == ['A', 'C']
+
+
+def test_each_claim_gets_its_own_lease(queue):
+    directory, scan_dir = queue
+    (_, first), (_, second) = directory.claim(), directory.claim()
+    assert directory.claim() is None
+    assert first['lease'] != second['lease']
+    assert {first['shard'], second['shard']} == {0, 1}
+    assert files(scan_dir, '*.job.json') == []
+
+
+def test_expired_claim_is_requeued(queue):
+    directory, scan_dir = queue
+    _, job = directory.claim()
+    claim_path = os.path.join(scan_dir, f"shard-{job['shard']:03d}.{job['lease']}.claimed.json")
+    expire(claim_path)
+    _, other = directory.claim()
+    _, retried = directory.claim()
+    assert {other['shard'], retried['shard']} == {0, 1}
+    assert directory.claim() is None
+    assert job['lease'] not in {other['lease'], retried['lease']}
+
+
+def test_late_worker_keeps_the_new_claim(queue):
+    directory, scan_dir = queue
+    _, late = directory.claim()
+    _, other = directory.claim()
+    expire(os.path.join(scan_dir, f"shard-{late['shard']:03d}.{late['lease']}.claimed.json"))
+    _, retry = directory.claim()
+    assert retry['shard'] == late['shard'] and retry['lease'] != late['lease']
+
+    # The first worker finishes after its lease was handed on
+    directory.complete(scan_dir, late, [{'ticker': 'S1.NS', 'score': 70}])
+    assert files(scan_dir, f"shard-{late['shard']:03d}.*.claimed.json") == \
+        [f"shard-{late['shard']:03d}.{retry['lease']}.claimed.json"]
+    # A second pass over the same stale listing finds nothing of its own to requeue
+    directory._requeue_expired(scan_dir)
+    assert files(scan_dir, '*.job.json') == []
+
+    directory.complete(scan_dir, retry, [{'ticker': 'S1.NS', 'score': 70}])
+    directory.complete(scan_dir, other, [{'ticker': 'S2.NS', 'score': 65}])
+    assert files(scan_dir, '*.claimed.json') == []
+    top, coverage = directory.collect(os.path.basename(scan_dir), timeout=0)
+    assert coverage == 1.0
+    assert [r['ticker'] for r in top] == ['S1.NS', 'S2.NS']
+
+
+def test_stale_claim_of_a_finished_shard_is_dropped(queue):
+    directory, scan_dir = queue
+    _, job = directory.claim()
+    directory.complete(scan_dir, dict(job, lease='gone'), [])
+    expire(os.path.join(scan_dir, f"shard-{job['shard']:03d}.{job['lease']}.claimed.json"))
+    directory._requeue_expired(scan_dir)
+    assert files(scan_dir, f"shard-{job['shard']:03d}.*") == [f"shard-{job['shard']:03d}.result.json"]
+
+
+def test_work_runs_every_shard(queue, monkeypatch):
+    directory, scan_dir = queue
+    monkeypatch.setattr(shard_scan, 'scan_shard', lambda job: [{'ticker': job['tickers'][0], 'score': job['shard']}])
+    directory.work(once=True)
+    assert files(scan_dir, 'shard-*') == ['shard-000.result.json', 'shard-001.result.json']
@@ -0,0 +1,117 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from data_provider import CoalescingProvider, SingleFlight
+from tests.conftest import FrameProvider, daily_frame
+
+
+def run_together(n, fn):
+    """Calls ``fn`` from ``n`` threads and returns their results (exceptions included)."""
+    results = [None] * n
+
+    def worker(i):
+        try:
+            results[i] = fn()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def blocking(release, value):
+    """A call that does not finish until ``release`` is set, counting its runs."""
+    runs = []
+
+    def fn():
+        runs.append(1)
+        release.wait(5)
+        if isinstance(value, Exception):
+            raise value
+        return value
+    return fn, runs
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    fn, runs = blocking(release, {'price': 1.0})
+    threading.Timer(0.1, release.set).start()
+    results = run_together(4, lambda: flight.do('k', fn))
+    assert len(runs) == 1
+    assert results == [{'price': 1.0}] * 4
+    assert flight.stats == {'calls': 1, 'shared': 3}
+
+
+def test_waiters_get_private_copies():
+    flight = SingleFlight()
+    release = threading.Event()
+    fn, _ = blocking(release, daily_frame(5))
+    threading.Timer(0.1, release.set).start()
+    first, second = run_together(2, lambda: flight.do('k', fn))
+    first.loc[first.index[0], 'Close'] = -1.0
+    assert second['Close'].iloc[0] != -1.0
+
+
+def test_errors_are_shared_and_not_cached():
+    flight = SingleFlight()
+    release = threading.Event()
+    fn, runs = blocking(release, RuntimeError('boom'))
+    threading.Timer(0.1, release.set).start()
+    results = run_together(3, lambda: flight.do('k', fn))
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(runs) == 1
+    assert flight.do('k', lambda: 'ok') == 'ok'
+
+
+def test_sequential_calls_are_not_coalesced():
+    flight = SingleFlight()
+    assert [flight.do('k', lambda: i) for i in range(3)] == [0, 1, 2]
+    assert flight.stats == {'calls': 3, 'shared': 0}
+
+
+def test_provider_keys_on_arguments():
+    inner = FrameProvider({('A.NS', '1d'): daily_frame(10), ('B.NS', '1d'): daily_frame(10, seed=1)})
+    provider = CoalescingProvider(inner)
+    provider.history('A.NS', interval='1d')
+    provider.history('B.NS', interval='1d')
+    provider.history_many(['A.NS', 'B.NS'], interval='1d')
+    assert len(inner.calls) == 3
+    assert provider.flight.stats['shared'] == 0
+    frame = provider.history('A.NS', interval='1d')
+    pd.testing.assert_frame_equal(frame, inner.frames[('A.NS', '1d')])
+
+
+@pytest.mark.parametrize('priorities, expected', [((2, 0), 0), ((0, 2), 0), ((1, None), 1)])
+def test_call_keeps_most_urgent_priority(priorities, expected):
+    boosts = []
+    flight = SingleFlight(on_boost=lambda: boosts.append(1))
+    release = threading.Event()
+    seen = []
+    joined = threading.Event()
+
+    def leader_fn():
+        joined.wait(5)
+        seen.append(flight.priority('k'))
+        return None
+
+    leader = threading.Thread(target=flight.do, args=('k', leader_fn, priorities[0]), daemon=True)
+    leader.start()
+    while flight.priority('k') is None:
+        release.wait(0.005)
+    follower = threading.Thread(target=flight.do, args=('k', lambda: None, priorities[1]), daemon=True)
+    follower.start()
+    while flight.stats['shared'] < 1:
+        release.wait(0.005)
+    joined.set()
+    leader.join(5)
+    follower.join(5)
+    assert seen == [expected]
+    assert len(boosts) == (1 if expected != priorities[0] else 0)
+    assert flight.priority('k') is None
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fetch_market_data import row_stats, snapshot_is_current
+from market_snapshot import Snapshot
+from strategies import STRATEGIES, StrategyFeatures, prefilter, run_strategy
+from tests.conftest import daily_frame
+
+CAN_SLIM = "CAN SLIM (William O'Neil)"
+MOONSHOT = "Low-Cap Moonshot (Beta)"
+
+
+def universe(n=40):
+    frames = {}
+    for i in range(n):
+        df = daily_frame(260, seed=i)
+        # Every fourth ticker crashes over the last month; some have a dead or a heavy last session
+        if i % 4 == 0:
+            df['Close'] = df['Close'] * np.r_[np.ones(238), np.linspace(1, 0.5, 22)]
+        if i % 7 == 0:
+            df.iloc[-1, df.columns.get_loc('Volume')] = 0.0
+        elif i % 5 == 1:
+            df.iloc[-1, df.columns.get_loc('Volume')] *= 10
+        frames[f'S{i}.NS'] = df
+    return frames
+
+
+def current_snapshot(frames):
+    """Snapshot rows for the same session the scan prices from (as update_cache builds them)."""
+    return {t: row_stats(t, df.iloc[-22:]) for t, df in frames.items()}
+
+
+@pytest.mark.parametrize('name', sorted(STRATEGIES))
+def test_prefilter_never_drops_a_candidate(name):
+    frames = universe()
+    stats = current_snapshot(frames)
+    prices = {t: float(df['Close'].iloc[-1]) for t, df in frames.items()}
+    volumes = {t: float(df['Volume'].iloc[-1]) for t, df in frames.items()}
+    candidates = {c['ticker'] for c in run_strategy(STRATEGIES[name], StrategyFeatures(frames, prices, volumes))}
+    kept = set(prefilter(name, list(frames), stats))
+    assert candidates <= kept
+
+
+def test_prefilters_prune_on_a_current_snapshot():
+    frames = universe()
+    stats = current_snapshot(frames)
+    counts = {}
+    assert len(prefilter(CAN_SLIM, list(frames), stats, counts)) < len(frames)
+    assert counts["over 20% below a recent close"] > 0
+    assert len(prefilter(MOONSHOT, list(frames), stats, counts)) < len(frames)
+    assert counts["no volume in the session"] == 6
+
+
+def test_stale_snapshot_only_applies_the_base_prefilter():
+    frames = universe()
+    stats = current_snapshot(frames)
+    stats['S1.NS'] = dict(stats['S1.NS'], price=0.0)
+    counts = {}
+    kept = prefilter(CAN_SLIM, list(frames), stats, counts, current=False)
+    assert kept == [t for t in frames if t != 'S1.NS']
+    assert counts == {"no snapshot price": 1}
+
+
+def at(text):
+    return pd.Timestamp(text, tz='Asia/Kolkata')
+
+
+def snapshot_taken(text):
+    # last_updated is written in the machine's local time
+    return Snapshot.from_rows([], at(text).to_pydatetime().astimezone().replace(tzinfo=None).isoformat())
+
+
+@pytest.mark.parametrize('taken, now, expected', [
+    ('2024-03-05 15:45', '2024-03-05 18:00', True),    # after the close, same evening
+    ('2024-03-05 15:45', '2024-03-06 08:00', True),    # before the next open
+    ('2024-03-05 15:45', '2024-03-06 10:00', False),   # next session running
+    ('2024-03-05 12:00', '2024-03-05 18:00', False),   # taken mid-session
+    ('2024-03-08 16:00', '2024-03-10 12:00', True),    # Friday's close on a Sunday
+    ('2024-03-07 16:00', '2024-03-10 12:00', False),   # Thursday's close on a Sunday
+])
+def test_snapshot_is_current(taken, now, expected):
+    assert snapshot_is_current(snapshot_taken(taken), now=at(now)) is expected
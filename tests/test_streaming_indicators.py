@@ -0,0 +1,36 @@
+import os
+
+import pandas as pd
+import pytest
+
+import streaming_indicators
+from streaming_indicators import IndicatorBook
+from tests.conftest import daily_frame
+
+
+def hourly(n=40):
+    df = daily_frame(n)
+    df.index = pd.date_range('2024-03-05 09:15', periods=n, freq='h', tz='Asia/Kolkata')
+    return df
+
+
+def test_default_checkpoint_lives_next_to_the_module(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    expected = os.path.join(os.path.dirname(os.path.abspath(streaming_indicators.__file__)), 'indicator_state.json')
+    monkeypatch.setattr(IndicatorBook, 'load', lambda self: None)
+    assert IndicatorBook().path == expected
+    assert IndicatorBook(str(tmp_path / 'state.json')).path == str(tmp_path / 'state.json')
+
+
+def test_checkpoint_resumes_without_rebuild(tmp_path):
+    path = str(tmp_path / 'state.json')
+    df = hourly()
+    book = IndicatorBook(path)
+    assert book.advance('A.NS', df.iloc[:30]) is not None
+    book.save()
+
+    resumed = IndicatorBook(path)
+    assert resumed.continues('A.NS', df)
+    peeked = resumed.advance('A.NS', df)
+    assert resumed.stats == {'committed': 10, 'rebuilt': 0}
+    assert peeked == pytest.approx(IndicatorBook(str(tmp_path / 'fresh.json')).advance('A.NS', df))